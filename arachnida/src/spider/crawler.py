@@ -1,26 +1,60 @@
 from __future__ import annotations
 from collections import deque
+import os, sys
 from .util import CrawlConfig, normalize_url, is_same_host, is_image_url
 from .parse import extract_links_and_images
 from .fetch import fetch_text, download_file
 
+def _link(dest:str, original:str)->bool:
+ """Replace dest by a relative symlink to original (else a hard link); False if neither is possible."""
+ os.remove(dest)
+ try: os.symlink(os.path.relpath(original,os.path.dirname(dest)),dest); return True
+ except OSError: pass
+ try: os.link(original,dest); return True
+ except OSError: return False
+
+def drop_near_duplicate(index, dest:str, cfg:CrawlConfig):
+ """If dest is within cfg.dedup of an indexed image, remove (or link) it and return (original, distance, linked); else index it."""
+ from .phash import dhash
+ h=dhash(dest)
+ if h is None: return None  # undecodable or too small to hash: keep as is
+ hit=index.nearest(h,cfg.dedup)
+ if not hit or not os.path.exists(hit[0]) or os.path.samefile(hit[0],dest):
+  index.add(h,dest,replace=bool(hit)); return None  # a vanished original hands its hash over to dest
+ linked=cfg.dedup_link and _link(dest,hit[0])
+ if not linked and os.path.exists(dest): os.remove(dest)
+ return hit[0],hit[1],linked
+
 def crawl_and_download(cfg:CrawlConfig)->int:
- start=normalize_url(cfg.base_url); visited=set(); q=deque([(start,0)]); downloaded=set(); count=0
- while q:
-  url,depth=q.popleft()
-  if url in visited: continue
-  visited.add(url)
-  html=fetch_text(url)
-  if html is None: continue
-  links,imgs=extract_links_and_images(url,html)
-  for img in imgs:
-   if img in downloaded: continue
-   if not is_image_url(img): continue
-   dest=download_file(img,cfg.out_dir)
-   if dest:
-    print(dest, flush=True); downloaded.add(img); count+=1
-  if cfg.recursive and depth<cfg.max_depth:
-   for link in links:
-    if cfg.same_host_only and not is_same_host(start,link): continue
-    if link not in visited: q.append((link,depth+1))
+ start=normalize_url(cfg.base_url); visited=set(); q=deque([(start,0)]); downloaded=set(); count=0; dups=0; index=None
+ if cfg.dedup is not None:
+  from .phash import HashIndex
+  index=HashIndex(cfg.dedup_index or os.path.join(cfg.out_dir,'.phash.tsv'))
+ try:
+  while q:
+   url,depth=q.popleft()
+   if url in visited: continue
+   visited.add(url)
+   html=fetch_text(url)
+   if html is None: continue
+   links,imgs=extract_links_and_images(url,html)
+   for img in imgs:
+    if img in downloaded: continue
+    if not is_image_url(img): continue
+    dest=download_file(img,cfg.out_dir)
+    if not dest: continue
+    downloaded.add(img)
+    dup=drop_near_duplicate(index,dest,cfg) if index is not None else None
+    if dup:
+     dups+=1; print(f"{dest}: near-duplicate of {dup[0]} (distance {dup[1]}), {'linked' if dup[2] else 'skipped'}", file=sys.stderr, flush=True)
+    else:
+     print(dest, flush=True); count+=1
+   if cfg.recursive and depth<cfg.max_depth:
+    for link in links:
+     if cfg.same_host_only and not is_same_host(start,link): continue
+     if link not in visited: q.append((link,depth+1))
+ finally:
+  if index is not None:
+   index.close()
+   if dups: print(f'spider: {dups} near-duplicate image(s) not stored; index holds {len(index)} hash(es)', file=sys.stderr)
  return count
@@ -0,0 +1,83 @@
+from __future__ import annotations
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+import os
+# Near-duplicate detection: 64-bit dHash of a downscaled grayscale decode, looked up by
+# Hamming distance with multi-index hashing. The hash is cut into BLOCKS 16-bit blocks, one
+# table each. If two hashes are within distance d, then for any radii r_i with
+# sum(r_i + 1) > d, some block i differs in at most r_i bits (pigeonhole). A lookup therefore
+# probes only each block's neighbours within r_i, never the whole index.
+HASH_W,HASH_H=9,8; BLOCKS=4; BLOCK_BITS=16; BLOCK_MASK=(1<<BLOCK_BITS)-1; MIN_SIDE=8
+_popcount=getattr(int,'bit_count',None) or (lambda x: bin(x).count('1'))
+
+def dhash(path:str)->Optional[int]:
+ """dHash of an image file (bit set where a pixel is brighter than its right neighbour); None if unreadable or tiny."""
+ from PIL import Image
+ try:
+  with Image.open(path) as im:
+   if min(im.size)<MIN_SIDE: return None
+   im.draft('L',(HASH_W,HASH_H))  # JPEG: decode at 1/2..1/8 scale straight from the DCT
+   px=im.convert('L').resize((HASH_W,HASH_H),Image.Resampling.BOX).tobytes()
+ except Exception: return None
+ h=0
+ for y in range(HASH_H):
+  row=px[y*HASH_W:(y+1)*HASH_W]
+  for x in range(HASH_W-1): h=(h<<1)|(row[x]>row[x+1])
+ return h
+
+def distance(a:int,b:int)->int:
+ return _popcount(a^b)
+
+def _radii(max_dist:int)->List[int]:
+ """Smallest per-block probe radii with sum(r+1) > max_dist."""
+ extra=max(0,max_dist+1-BLOCKS)
+ return [min(BLOCK_BITS,extra//BLOCKS+(i<extra%BLOCKS)) for i in range(BLOCKS)]
+
+@lru_cache(maxsize=None)
+def _masks(radius:int)->Tuple[int,...]:
+ """All BLOCK_BITS-bit masks with at most radius bits set (0 first)."""
+ out=[0]; layer=[0]
+ for _ in range(radius):
+  layer=[m|1<<b for m in layer for b in range(BLOCK_BITS) if m>>b==0]; out+=layer  # bits added in increasing order: no repeats
+ return tuple(out)
+
+class HashIndex:
+ """64-bit hashes -> file paths with Hamming-radius lookup; persisted as a TSV (hash<TAB>path) when path is set.
+
+ Buckets hold the hashes themselves: probing and distance checks run in map()/chain, not per-item Python."""
+ def __init__(self, path:Optional[str]=None):
+  self.where:Dict[int,str]={}; self.tables:List[Dict[int,List[int]]]=[{} for _ in range(BLOCKS)]
+  self.path=path; self.base=os.path.dirname(os.path.abspath(path)) if path else ''; self.f=None
+  if path and os.path.exists(path):
+   with open(path,encoding='utf-8') as f:
+    for line in f:
+     h,sep,p=line.rstrip('\n').partition('\t')
+     if sep:
+      try: self._add(int(h,16),os.path.join(self.base,p),replace=True)  # later lines are replacements
+      except ValueError: continue  # torn last line of an interrupted crawl
+  if path: os.makedirs(self.base,exist_ok=True); self.f=open(path,'a',encoding='utf-8')
+ def __len__(self)->int: return len(self.where)
+ def _add(self, h:int, path:str, replace:bool=False)->None:
+  if h in self.where:
+   if replace: self.where[h]=path
+   return
+  self.where[h]=path
+  for b,t in enumerate(self.tables): t.setdefault(h>>(b*BLOCK_BITS)&BLOCK_MASK,[]).append(h)
+ def add(self, h:int, path:str, replace:bool=False)->None:
+  """Index h -> path; an existing entry for h is kept unless replace (e.g. its file is gone)."""
+  if self.where.get(h)==path or (h in self.where and not replace): return
+  self._add(h,path,replace)
+  if self.f: self.f.write(f'{h:016x}\t{os.path.relpath(os.path.abspath(path),self.base)}\n'); self.f.flush()
+ def nearest(self, h:int, max_dist:int)->Optional[Tuple[str,int]]:
+  """(path, distance) of the closest indexed hash within max_dist, or None."""
+  if h in self.where: return self.where[h],0
+  cands:List[int]=[]
+  for b,(t,r) in enumerate(zip(self.tables,_radii(max_dist))):
+   key=h>>(b*BLOCK_BITS)&BLOCK_MASK
+   cands.extend(chain.from_iterable(filter(None,map(t.get,map(key.__xor__,_masks(r))))))
+  if not cands: return None
+  ds=list(map(_popcount,map(h.__xor__,cands))); d=min(ds)
+  return (self.where[cands[ds.index(d)]],d) if d<=max_dist else None
+ def close(self)->None:
+  if self.f: self.f.close(); self.f=None
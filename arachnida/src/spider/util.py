@@ -1,5 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from typing import Optional
 from urllib.parse import urlsplit, urlunsplit, urljoin
 IMG_EXTS={'.jpg','.jpeg','.png','.gif','.bmp'}
 
@@ -24,3 +25,6 @@ def sanitize_filename(name:str)->str:
 @dataclass
 class CrawlConfig:
  base_url:str; recursive:bool=False; max_depth:int=5; out_dir:str='data'; same_host_only:bool=True
+ dedup:Optional[int]=None  # max dHash Hamming distance for a near-duplicate; None = exact URL dedup only
+ dedup_index:Optional[str]=None  # persistent hash index (default <out_dir>/.phash.tsv)
+ dedup_link:bool=False  # near-duplicates become symlinks to the first copy instead of being deleted
@@ -0,0 +1,60 @@
+import os, random
+import pytest
+from PIL import Image
+from src.spider.phash import HashIndex, dhash, distance
+from src.spider.crawler import drop_near_duplicate
+from src.spider.util import CrawlConfig
+
+def _brute(index, h, r):
+ best=min((distance(h,k) for k in index.where), default=None)
+ return best if best is not None and best<=r else None
+
+@pytest.mark.parametrize('radius',[0,1,3,4,7,10,16,24])
+def test_nearest_matches_brute_force(radius):
+ rnd=random.Random(radius); index=HashIndex()
+ hashes=[rnd.getrandbits(64) for _ in range(3000)]
+ for i,h in enumerate(hashes): index.add(h,f'{i}.jpg')
+ for _ in range(300):
+  q=rnd.choice(hashes)
+  for b in rnd.sample(range(64),rnd.randint(0,radius+3)): q^=1<<b  # near some entry, or just past the radius
+  if rnd.random()<0.2: q=rnd.getrandbits(64)
+  hit=index.nearest(q,radius); want=_brute(index,q,radius)
+  assert (hit[1] if hit else None)==want
+  if hit: assert distance(q,hashes[int(hit[0].split('.')[0])])==hit[1]
+
+def test_add_keeps_or_replaces_and_persists(tmp_path):
+ path=str(tmp_path/'idx.tsv'); index=HashIndex(path)
+ index.add(5,str(tmp_path/'a.png')); index.add(5,str(tmp_path/'b.png'))
+ assert index.where[5]==str(tmp_path/'a.png')
+ index.add(5,str(tmp_path/'c.png'),replace=True); index.close()
+ again=HashIndex(path); again.close()
+ assert len(again)==1 and again.where[5]==str(tmp_path/'c.png') and again.nearest(5,0)==(str(tmp_path/'c.png'),0)
+
+def _noise(path, seed, shift=0):
+ Image.frombytes('L',(64,64),random.Random(seed).randbytes(64*64)).point(lambda v: min(255,v+shift)).save(path)
+ return path
+
+@pytest.mark.parametrize('link',[False,True])
+def test_drop_near_duplicate(tmp_path, link):
+ cfg=CrawlConfig('http://example.com/',out_dir=str(tmp_path),dedup=4,dedup_link=link)
+ index=HashIndex(str(tmp_path/'.phash.tsv'))
+ a=_noise(str(tmp_path/'a.png'),1); b=_noise(str(tmp_path/'b.png'),1,shift=2); c=_noise(str(tmp_path/'c.png'),2)
+ near=distance(dhash(a),dhash(b)); assert near<=4 and distance(dhash(a),dhash(c))>4
+ assert drop_near_duplicate(index,a,cfg) is None and drop_near_duplicate(index,c,cfg) is None
+ original,d,linked=drop_near_duplicate(index,b,cfg)
+ assert original==a and d==near and linked==link
+ if link: assert os.path.islink(b) and os.path.samefile(b,a)
+ else: assert not os.path.lexists(b)
+ assert len(index)==2
+
+def test_vanished_original_is_replaced(tmp_path):
+ cfg=CrawlConfig('http://example.com/',out_dir=str(tmp_path),dedup=4)
+ index=HashIndex(str(tmp_path/'.phash.tsv'))
+ a=_noise(str(tmp_path/'a.png'),1)
+ assert drop_near_duplicate(index,a,cfg) is None
+ os.rename(a,str(tmp_path/'moved.png'))
+ copy=_noise(str(tmp_path/'copy.png'),1)
+ assert drop_near_duplicate(index,copy,cfg) is None and os.path.exists(copy)
+ assert index.nearest(dhash(copy),0)==(copy,0)
+ index.close(); again=HashIndex(str(tmp_path/'.phash.tsv')); again.close()
+ assert again.nearest(dhash(copy),0)==(copy,0)
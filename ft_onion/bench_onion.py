@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""ft_onion benchmarks: seal/peel throughput, KDF vs cipher time and peak RSS.
+
+Every case (format x layers x size) runs in a fresh interpreter so its ru_maxrss is its own.
+Payloads are generated on the fly and outputs are discarded, so multi-GB sizes need no
+input file; peel reads the sealed data back from a temporary file under --tmpdir.
+
+  ./bench_onion.py                                   # default grid, JSON on stdout
+  ./bench_onion.py --sizes 1K,1M,4G --layers 1,16 --formats oni2 -o bench.json
+  ./bench_onion.py --sizes 64M --layers 4 --ciphers all
+"""
+from __future__ import annotations
+import argparse, io, json, os, platform, resource, subprocess, sys, tempfile, time
+from src.ft_onion import aead
+from src.ft_onion.kdf import Keyring, ScryptParams
+from src.ft_onion.layers import seal_to, peel_to
+from src.ft_onion.stream import seal_stream, peel_stream, read_header, DEFAULT_CHUNK
+
+UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+ONI1_MAX = 1 << 30  # ONI1 holds the whole payload in memory: skip it above this
+DEFAULT_SIZES = '16,64K,1M,64M,1G'
+DEFAULT_LAYERS = '1,2,4,8,16'
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper().rstrip('B')
+    unit = text[-1] if text and text[-1] in UNITS else ''
+    return int(float(text[:len(text) - len(unit)]) * UNITS[unit])
+
+class Payload(io.RawIOBase):
+    """size bytes of incompressible data, produced by repeating one random block."""
+    def __init__(self, size: int, block: int = 1 << 20):
+        self.left = size; self.block = os.urandom(min(block, max(size, 1))); self.pos = 0
+    def readable(self) -> bool: return True
+    def read(self, n: int = -1) -> bytes:
+        n = self.left if n is None or n < 0 else min(n, self.left)
+        out = bytearray()
+        while len(out) < n:
+            take = min(n - len(out), len(self.block) - self.pos)
+            out += self.block[self.pos:self.pos + take]; self.pos = (self.pos + take) % len(self.block)
+        self.left -= n
+        return bytes(out)
+
+class Sink(io.RawIOBase):
+    """Write-only /dev/null that counts bytes."""
+    def __init__(self): self.count = 0
+    def writable(self) -> bool: return True
+    def write(self, b) -> int: self.count += len(b); return len(b)
+
+def run_case(fmt: str, layers: int, size: int, chunk: int, kdf: ScryptParams, tmpdir: str, cipher: str = aead.DEFAULT) -> dict:
+    pws = [f'bench-{i}' for i in range(layers)]
+    ring = Keyring(pws, kdf, batch=True)
+    t = time.perf_counter(); ring.new_layers(); seal_kdf = time.perf_counter() - t
+    fd, path = tempfile.mkstemp(prefix='bench_onion.', dir=tmpdir)
+    try:
+        with os.fdopen(fd, 'wb') as dst:
+            data = Payload(size).read() if fmt == 'oni1' else None  # generated outside the timing
+            t = time.perf_counter()
+            if fmt == 'oni1': seal_to(dst, data, ring, cipher=cipher)
+            else: seal_stream(Payload(size), dst, ring, chunk_size=chunk, cipher=cipher)
+            seal_cipher = time.perf_counter() - t
+            del data
+        sealed = os.path.getsize(path)
+        ring = Keyring(pws, batch=True)
+        with open(path, 'rb') as src:
+            t = time.perf_counter(); ring.open_layers(read_header(src)[2]['layers']); peel_kdf = time.perf_counter() - t
+            src.seek(0); sink = Sink()
+            t = time.perf_counter()
+            if fmt == 'oni1': peel_to(sink, src.read(), ring)
+            else: peel_stream(src, sink, ring)
+            peel_cipher = time.perf_counter() - t
+        if sink.count != size: raise RuntimeError(f'peeled {sink.count} bytes, expected {size}')
+    finally:
+        os.remove(path)
+    mib = size / 2**20
+    return {'format': fmt, 'cipher': cipher, 'layers': layers, 'bytes': size, 'sealed_bytes': sealed,
+            'seal': {'kdf_s': round(seal_kdf, 6), 'cipher_s': round(seal_cipher, 6),
+                     'mib_s': round(mib / seal_cipher, 2) if seal_cipher else None},
+            'peel': {'kdf_s': round(peel_kdf, 6), 'cipher_s': round(peel_cipher, 6),
+                     'mib_s': round(mib / peel_cipher, 2) if peel_cipher else None},
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description='Benchmark ft_onion seal/peel.')
+    p.add_argument('--sizes', default=DEFAULT_SIZES, help=f'payload sizes, K/M/G suffixes (default {DEFAULT_SIZES})')
+    p.add_argument('--layers', default=DEFAULT_LAYERS, help=f'layer counts (default {DEFAULT_LAYERS})')
+    p.add_argument('--formats', default='oni1,oni2', help='oni1 (in memory), oni2 (streaming)')
+    p.add_argument('--ciphers', default=aead.DEFAULT, help=f'layer ciphers to compare, or "all" (default {aead.DEFAULT})')
+    p.add_argument('--chunk', type=int, default=DEFAULT_CHUNK // 1024, metavar='KB', help='ONI2 chunk size in KiB')
+    p.add_argument('--kdf-n', type=int, default=ScryptParams().n, help='scrypt N per layer (default %(default)s)')
+    p.add_argument('--tmpdir', default=None, help='where sealed data is staged for peel')
+    p.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    p.add_argument('--case', help=argparse.SUPPRESS)  # internal: run one case, print its JSON
+    return p.parse_args(argv)
+
+def main(argv=None) -> int:
+    a = parse_args(argv)
+    if a.case:
+        c = json.loads(a.case)
+        print(json.dumps(run_case(c['format'], c['layers'], c['bytes'], a.chunk * 1024, ScryptParams(n=a.kdf_n), a.tmpdir, c['cipher'])))
+        return 0
+    results = []
+    ciphers = aead.available() if a.ciphers == 'all' else a.ciphers.split(',')
+    for fmt, cipher in ((f, c) for f in a.formats.split(',') for c in ciphers):
+        for layers in (int(x) for x in a.layers.split(',')):
+            for size in (parse_size(x) for x in a.sizes.split(',')):
+                if fmt == 'oni1' and size > ONI1_MAX: continue
+                case = json.dumps({'format': fmt, 'cipher': cipher, 'layers': layers, 'bytes': size})
+                cmd = [sys.executable, os.path.abspath(__file__), '--case', case, '--chunk', str(a.chunk), '--kdf-n', str(a.kdf_n)]
+                if a.tmpdir: cmd += ['--tmpdir', a.tmpdir]
+                r = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+                if r.returncode:
+                    results.append({**json.loads(case), 'error': r.stderr.strip().splitlines()[-1] if r.stderr.strip() else 'failed'})
+                else:
+                    results.append(json.loads(r.stdout))
+                res = results[-1]
+                print(f"{fmt} {cipher} L={layers:<2} {size:>12} B  seal {res.get('seal', {}).get('mib_s')} MiB/s  "
+                      f"peel {res.get('peel', {}).get('mib_s')} MiB/s  rss {res.get('peak_rss_kb')} KB", file=sys.stderr)
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+              'kdf': ScryptParams(n=a.kdf_n).to_meta(), 'chunk': a.chunk * 1024, 'results': results}
+    text = json.dumps(report, indent=1)
+    if a.out:
+        with open(a.out, 'w') as f: f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if any('error' in r for r in results) else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
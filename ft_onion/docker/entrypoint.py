@@ -1,8 +1,27 @@
 #!/usr/bin/env python3
+"""Container entrypoint: supervise nginx, sshd and tor on one asyncio loop.
+
+- every child's stdout/stderr is drained continuously (a full pipe would block the child)
+  and re-emitted as "[name] line", rate-limited per child;
+- a child that exits is restarted with exponential backoff (reset once it stayed up);
+- the onion hostname is announced as soon as tor writes it (inotify, polling fallback);
+- SIGTERM/SIGINT stop every child (SIGTERM, then SIGKILL after a grace period).
+"""
 from __future__ import annotations
-import os, subprocess, time, sys, pathlib, pwd, grp
+import argparse, asyncio, ctypes, ctypes.util, grp, os, pwd, signal, sys, time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, TextIO
 
 HS_DIR = "/var/lib/tor/hidden_service"
+LINE_RATE = 200        # log lines per second per child ...
+LINE_BURST = 1000      # ... with this much burst
+MAX_LINE = 8192        # longer lines are split
+BACKOFF_MIN, BACKOFF_MAX = 0.5, 30.0
+STABLE_AFTER = 30.0    # uptime that resets the backoff
+STOP_GRACE = 10.0      # SIGTERM -> SIGKILL
+DRAIN_AFTER_EXIT = 1.0 # output still read after a child exits, if a descendant keeps its stdout open
+POLL_INTERVAL = 0.5    # readiness polling when inotify is unavailable
+
 def ensure_dirs():
     os.makedirs("/var/run/sshd", exist_ok=True)
     os.makedirs("/var/www/html", exist_ok=True)
@@ -15,37 +34,208 @@ def ensure_dirs():
     except Exception:
         pass
 
-def start(cmd, name):
-    print(f"[entrypoint] start {name}: {' '.join(cmd)}", flush=True)
-    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-
-def read_onion():
-    p = pathlib.Path(HS_DIR) / "hostname"
-    for _ in range(120):
-        if p.exists():
-            return p.read_text(encoding="utf-8").strip()
-        time.sleep(1)
-    return None
-
-def main():
-    ensure_dirs()
-    procs = []
-    procs.append(start(["nginx","-g","daemon off;","-c","/etc/nginx/nginx.conf"], "nginx"))
-    procs.append(start(["/usr/sbin/sshd","-D","-e","-f","/etc/ssh/sshd_config","-p","4242"], "sshd"))
-    procs.append(start(["tor","-f","/etc/tor/torrc"], "tor"))
-    onion = read_onion()
-    if onion:
-        print(f"[entrypoint] Hidden service: {onion}", flush=True)
-        print(f"[entrypoint] HTTP: http://{onion}", flush=True)
-        print(f"[entrypoint] SSH: ssh -p 4242 appuser@{onion}", flush=True)
-    else:
-        print("[entrypoint] hidden service hostname not found yet", file=sys.stderr)
-    # keep container alive while children run
+@dataclass
+class Service:
+    name: str
+    cmd: List[str]
+    restart: bool = True
+    ready_file: Optional[str] = None                 # announce readiness when this file has content
+    on_ready: Optional[Callable[[str], None]] = None
+
+class RateLimiter:
+    """Token bucket over log lines; counts what it drops."""
+    def __init__(self, rate: float = LINE_RATE, burst: int = LINE_BURST):
+        self.rate = rate; self.burst = burst; self.tokens = float(burst); self.stamp = time.monotonic(); self.dropped = 0
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate); self.stamp = now
+        if self.tokens >= 1: self.tokens -= 1; return True
+        self.dropped += 1; return False
+
+class Logger:
+    def __init__(self, out: TextIO = sys.stdout): self.out = out
+    def emit(self, name: str, line: str) -> None:
+        self.out.write(f"[{name}] {line}\n"); self.out.flush()
+
+def _inotify():
+    """libc if it has inotify (Linux), else None."""
+    if not sys.platform.startswith("linux"): return None
     try:
-        while any(p.poll() is None for p in procs):
-            time.sleep(1)
-    except KeyboardInterrupt:
-        pass
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        return libc if hasattr(libc, "inotify_init1") else None
+    except OSError:
+        return None
+
+IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x8, 0x80, 0x100
+
+def _has_content(path: str) -> bool:
+    try: return os.path.getsize(path) > 0
+    except OSError: return False
+
+async def wait_for_file(path: str, timeout: Optional[float] = None, use_inotify: bool = True) -> bool:
+    """Wait until path exists and is non-empty: inotify on its directory, else polling."""
+    libc = _inotify() if use_inotify else None
+    fd = -1
+    if libc is not None:
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd >= 0 and libc.inotify_add_watch(fd, os.fsencode(os.path.dirname(path) or "."), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            os.close(fd); fd = -1
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    changed = asyncio.Event()
+    if fd >= 0: loop.add_reader(fd, changed.set)
+    try:
+        while not _has_content(path):  # checked after the watch exists: no missed event
+            left = None if deadline is None else deadline - loop.time()
+            if left is not None and left <= 0: return False
+            if fd < 0:
+                await asyncio.sleep(POLL_INTERVAL if left is None else min(POLL_INTERVAL, left)); continue
+            try: await asyncio.wait_for(changed.wait(), left)
+            except asyncio.TimeoutError: return False
+            changed.clear()
+            try:
+                while os.read(fd, 4096): pass
+            except BlockingIOError: pass
+        return True
+    finally:
+        if fd >= 0: loop.remove_reader(fd); os.close(fd)
+
+class Child:
+    """One supervised service: (re)start, drain output, stop."""
+    def __init__(self, svc: Service, log: Logger, backoff_min: float = BACKOFF_MIN, backoff_max: float = BACKOFF_MAX,
+                 stable_after: float = STABLE_AFTER, stop_grace: float = STOP_GRACE):
+        self.svc = svc; self.log = log; self.limiter = RateLimiter()
+        self.backoff_min = backoff_min; self.backoff_max = backoff_max; self.stable_after = stable_after; self.stop_grace = stop_grace
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.starts = 0; self.stopping = asyncio.Event()
+
+    def say(self, msg: str) -> None:
+        self.log.emit(self.svc.name, f"[supervisor] {msg}")
+
+    async def drain(self, stream: asyncio.StreamReader) -> None:
+        pending = b""
+        while True:
+            data = await stream.read(65536)
+            if not data: break
+            lines = (pending + data).split(b"\n"); pending = lines.pop()
+            while len(pending) > MAX_LINE: lines.append(pending[:MAX_LINE]); pending = pending[MAX_LINE:]
+            for line in lines: self.line(line)
+        if pending: self.line(pending)
+        if self.limiter.dropped:
+            self.say(f"{self.limiter.dropped} log line(s) suppressed (rate limit)"); self.limiter.dropped = 0
+
+    def line(self, raw: bytes) -> None:
+        if not self.limiter.allow(): return
+        if self.limiter.dropped:
+            dropped, self.limiter.dropped = self.limiter.dropped, 0
+            self.say(f"{dropped} log line(s) suppressed (rate limit)")
+        self.log.emit(self.svc.name, raw.decode("utf-8", "replace").rstrip("\r"))
+
+    async def run(self) -> None:
+        backoff = self.backoff_min
+        while not self.stopping.is_set():
+            self.say(f"start: {' '.join(self.svc.cmd)}")
+            started = time.monotonic()
+            # our own pipe rather than PIPE: the exit is seen even while a descendant holds the
+            # write end (Process.wait() would otherwise also wait for the pipe to close)
+            r, w = os.pipe()
+            try:
+                try:
+                    self.proc = await asyncio.create_subprocess_exec(*self.svc.cmd, stdin=asyncio.subprocess.DEVNULL,
+                                                                     stdout=w, stderr=asyncio.subprocess.STDOUT)
+                finally: os.close(w)  # the child has its copy; ours would hide the EOF
+            except OSError as e:
+                os.close(r); self.say(f"cannot start: {e}"); code = None
+            else:
+                self.starts += 1
+                # stop() ran before self.proc was set: stop this one the same way, while draining it
+                late = asyncio.ensure_future(self.terminate(self.proc)) if self.stopping.is_set() else None
+                reader = asyncio.StreamReader()
+                pipe, _ = await asyncio.get_running_loop().connect_read_pipe(
+                    lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(r, "rb", 0))
+                drain = asyncio.ensure_future(self.drain(reader))
+                code = await self.proc.wait()
+                try: await asyncio.wait_for(drain, DRAIN_AFTER_EXIT)
+                except asyncio.TimeoutError: self.say("output pipe still open after exit (held by a descendant), closing it")
+                pipe.close()
+                if late: await late
+                self.say(f"exited with status {code}")
+            if self.stopping.is_set() or not self.svc.restart: break
+            if time.monotonic() - started >= self.stable_after: backoff = self.backoff_min
+            self.say(f"restarting in {backoff:.1f}s")
+            try: await asyncio.wait_for(self.stopping.wait(), backoff)
+            except asyncio.TimeoutError: pass
+            backoff = min(self.backoff_max, backoff * 2)
+
+    async def stop(self) -> None:
+        self.stopping.set()
+        if self.proc is not None: await self.terminate(self.proc)
+
+    async def terminate(self, p: asyncio.subprocess.Process) -> None:
+        """SIGTERM, then SIGKILL if p is still running after stop_grace."""
+        if p.returncode is not None: return
+        try: p.send_signal(signal.SIGTERM)
+        except ProcessLookupError: return
+        try: await asyncio.wait_for(p.wait(), self.stop_grace)
+        except asyncio.TimeoutError:
+            self.say(f"no exit after {self.stop_grace:.0f}s, killing")
+            try: p.kill()
+            except ProcessLookupError: pass
+            await p.wait()
+
+class Supervisor:
+    def __init__(self, services: List[Service], log: Optional[Logger] = None, **child_opts):
+        self.log = log or Logger()
+        self.children = [Child(s, self.log, **child_opts) for s in services]
+        self.stop_event = asyncio.Event()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    async def _ready(self, child: Child) -> None:
+        svc = child.svc
+        if await wait_for_file(svc.ready_file):
+            with open(svc.ready_file, encoding="utf-8") as f: value = f.read().strip()
+            if svc.on_ready: svc.on_ready(value)
+            else: child.say(f"ready: {svc.ready_file}")
+
+    async def run(self) -> int:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try: loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError): pass
+        runs = [asyncio.ensure_future(c.run()) for c in self.children]
+        watchers = [asyncio.ensure_future(self._ready(c)) for c in self.children if c.svc.ready_file]
+        all_done = asyncio.ensure_future(asyncio.gather(*runs))
+        stop = asyncio.ensure_future(self.stop_event.wait())
+        await asyncio.wait([all_done, stop], return_when=asyncio.FIRST_COMPLETED)
+        self.log.emit("entrypoint", "shutting down")
+        await asyncio.gather(*(c.stop() for c in self.children))
+        await all_done
+        for t in watchers + [stop]: t.cancel()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try: loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError): pass
+        return 0
+
+def announce(onion: str) -> None:
+    print(f"[entrypoint] Hidden service: {onion}", flush=True)
+    print(f"[entrypoint] HTTP: http://{onion}", flush=True)
+    print(f"[entrypoint] SSH: ssh -p 4242 appuser@{onion}", flush=True)
+
+def default_services(hs_dir: str = HS_DIR) -> List[Service]:
+    return [
+        Service("nginx", ["nginx", "-g", "daemon off;", "-c", "/etc/nginx/nginx.conf"]),
+        Service("sshd", ["/usr/sbin/sshd", "-D", "-e", "-f", "/etc/ssh/sshd_config", "-p", "4242"]),
+        Service("tor", ["tor", "-f", "/etc/tor/torrc"], ready_file=os.path.join(hs_dir, "hostname"), on_ready=announce),
+    ]
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Supervise nginx, sshd and tor.")
+    p.add_argument("--hs-dir", default=HS_DIR, help="tor HiddenServiceDir (default %(default)s)")
+    a = p.parse_args(argv)
+    if a.hs_dir == HS_DIR: ensure_dirs()
+    return asyncio.run(Supervisor(default_services(a.hs_dir)).run())
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""HTTP load generator for the hidden-service nginx, talking to it directly (no tor).
+
+  loadtest.py                                        # http://127.0.0.1/ , 2000 requests, 32 connections
+  loadtest.py -n 20000 -c 64 --path / --path /healthz --gzip --json
+  docker exec ft_onion python3 /usr/local/bin/loadtest.py -n 20000 -c 64
+
+Keep-alive HTTP/1.1 over asyncio streams; reports requests/s, latency percentiles,
+bytes per request (body and on the wire) and status counts, per path and overall.
+"""
+from __future__ import annotations
+import argparse, asyncio, json, math, sys, time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+MAX_HEADER = 64 * 1024
+
+class HttpError(Exception):
+    pass
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values: return 0.0
+    idx = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)  # nearest-rank
+    return sorted_values[min(idx, len(sorted_values) - 1)]
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], int, int]:
+    """(status, headers, body bytes, wire bytes); the body is read and discarded."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    if len(head) > MAX_HEADER: raise HttpError("response header too large")
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"): raise HttpError(f"bad status line: {lines[0]!r}")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1); headers[k.strip().lower()] = v.strip()
+    if parts[0] == "HTTP/1.0": headers.setdefault("connection", "close")  # 1.0 closes unless asked not to
+    wire = len(head); body = 0
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await reader.readuntil(b"\r\n"); wire += len(size_line)
+            size = int(size_line.split(b";")[0], 16)
+            data = await reader.readexactly(size + 2); wire += len(data); body += size
+            if size == 0: break
+    elif "content-length" in headers:
+        size = int(headers["content-length"])
+        await reader.readexactly(size); wire += size; body = size
+    elif parts[1] not in ("204", "304"):
+        raise HttpError("response without length (connection-delimited bodies unsupported)")
+    return int(parts[1]), headers, body, wire
+
+def build_request(host: str, path: str, gzip: bool, keepalive: bool) -> bytes:
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}", "User-Agent: ft_onion-loadtest",
+             f"Connection: {'keep-alive' if keepalive else 'close'}"]
+    if gzip: lines.append("Accept-Encoding: gzip")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("ascii")
+
+async def load_test(url: str = "http://127.0.0.1/", paths: Optional[List[str]] = None, total: int = 2000,
+                    concurrency: int = 32, gzip: bool = False, keepalive: bool = True, timeout: float = 10.0) -> dict:
+    """Send total GETs (round-robin over paths) over concurrency connections; return the report."""
+    if total <= 0 or concurrency <= 0: raise ValueError("total and concurrency must be positive")
+    u = urlsplit(url)
+    if u.scheme != "http": raise ValueError("only http:// URLs are supported")
+    host, port = u.hostname or "127.0.0.1", u.port or 80
+    paths = paths or [u.path or "/"]
+    reqs = {p: build_request(u.netloc or host, p, gzip, keepalive) for p in paths}
+    stats = {p: {"lat": [], "body": 0, "wire": 0, "status": Counter(), "errors": 0, "gzip": 0} for p in paths}
+    counter = iter(range(total))
+    connects = 0
+
+    async def worker() -> None:
+        nonlocal connects
+        reader = writer = None
+        try:
+            for i in counter:
+                path = paths[i % len(paths)]; s = stats[path]
+                start = time.perf_counter()
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, limit=MAX_HEADER), timeout)
+                        connects += 1
+                    writer.write(reqs[path])
+                    status, headers, body, wire = await asyncio.wait_for(read_response(reader), timeout)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, HttpError, ValueError):
+                    s["errors"] += 1
+                    if writer is not None: writer.close()
+                    reader = writer = None; continue
+                s["lat"].append(time.perf_counter() - start); s["body"] += body; s["wire"] += wire
+                s["status"][status] += 1
+                if headers.get("content-encoding") == "gzip": s["gzip"] += 1
+                if not keepalive or headers.get("connection", "").lower() == "close":
+                    writer.close(); reader = writer = None
+        finally:
+            if writer is not None: writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - started
+
+    def summary(entries: List[dict]) -> dict:
+        lat = sorted(x for e in entries for x in e["lat"]); n = len(lat)
+        status = sum((e["status"] for e in entries), Counter())
+        return {"requests": n, "errors": sum(e["errors"] for e in entries),
+                "rps": round(n / elapsed, 1) if elapsed else 0.0,
+                "p50_ms": round(percentile(lat, 50) * 1000, 3), "p90_ms": round(percentile(lat, 90) * 1000, 3),
+                "p99_ms": round(percentile(lat, 99) * 1000, 3), "max_ms": round(lat[-1] * 1000, 3) if lat else 0.0,
+                "body_bytes_per_req": round(sum(e["body"] for e in entries) / n, 1) if n else 0.0,
+                "wire_bytes_per_req": round(sum(e["wire"] for e in entries) / n, 1) if n else 0.0,
+                "gzip_responses": sum(e["gzip"] for e in entries),
+                "status": {str(k): v for k, v in sorted(status.items())}}
+    return {"url": url, "concurrency": min(concurrency, total), "keepalive": keepalive, "gzip": gzip,
+            "seconds": round(elapsed, 4), "connections": connects,
+            "total": summary(list(stats.values())), "paths": {p: summary([s]) for p, s in stats.items()}}
+
+def _print(report: dict) -> None:
+    print(f"{report['url']}: {report['total']['requests']} requests, {report['concurrency']} connections "
+          f"({report['connections']} opened), {report['seconds']}s")
+    for name, s in [("total", report["total"])] + list(report["paths"].items()):
+        print(f"  {name:<12} {s['rps']:>9} req/s  p50 {s['p50_ms']} ms  p90 {s['p90_ms']} ms  p99 {s['p99_ms']} ms  "
+              f"{s['wire_bytes_per_req']} B/req on the wire ({s['body_bytes_per_req']} body)  "
+              f"status {s['status']}  errors {s['errors']}")
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="HTTP load generator for the ft_onion nginx.")
+    p.add_argument("--url", default="http://127.0.0.1/", help="base URL (default %(default)s)")
+    p.add_argument("--path", dest="paths", action="append", help="path to request, repeatable (default: URL path); e.g. --path / --path /healthz")
+    p.add_argument("-n", dest="total", type=int, default=2000, help="total requests (default %(default)s)")
+    p.add_argument("-c", dest="concurrency", type=int, default=32, help="parallel connections (default %(default)s)")
+    p.add_argument("--gzip", action="store_true", help="send Accept-Encoding: gzip")
+    p.add_argument("--no-keepalive", dest="keepalive", action="store_false", help="one connection per request")
+    p.add_argument("--timeout", type=float, default=10.0, help="per-request timeout in seconds")
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    a = p.parse_args(argv)
+    try:
+        report = asyncio.run(load_test(a.url, a.paths, a.total, a.concurrency, a.gzip, a.keepalive, a.timeout))
+    except ValueError as e:
+        print(f"loadtest: error: {e}", file=sys.stderr); return 2
+    if a.json: print(json.dumps(report))
+    else: _print(report)
+    return 0 if report["total"]["errors"] == 0 and report["total"]["requests"] else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,40 +1,129 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import argparse, sys, getpass
-from src.ft_onion.layers import seal, peel
-from src.ft_onion.io import read_bytes, write_bytes
+import argparse, io, sys, getpass, time
+from src.ft_onion.kdf import calibrate, Keyring, DEFAULT_TARGET_MS, DEFAULT_MAX_MEM_MB
+from src.ft_onion import compress
 
-def parse_pw_list(arg: str) -> list[str]:
+# --help must not load the cipher modules (or cryptography): their names and the chunk size are
+# repeated here, and main() imports layers/stream/io/aead only once the arguments parsed.
+CIPHER_NAMES = ('aes-256-gcm', 'chacha20-poly1305', 'aes-256-gcm-siv')  # aead.CIPHERS
+DEFAULT_CIPHER = 'aes-256-gcm'  # aead.DEFAULT
+DEFAULT_CHUNK = 1 << 20  # stream.DEFAULT_CHUNK
+
+def parse_pw_list(arg: str, label: str = 'passphrase') -> list[str]:
     if arg == '-':
         pws=[]; i=1
         while True:
-            pw = getpass.getpass(f'passphrase {i} (empty to finish): ')
+            pw = getpass.getpass(f'{label} {i} (empty to finish): ')
             if not pw: break
             pws.append(pw); i+=1
         if not pws: raise SystemExit("ft_onion: no passphrases given")
         return pws
     return [p for p in (s.strip() for s in arg.split(',')) if p]
 
+def positive(kind):
+    """argparse type: a number of kind greater than zero."""
+    def convert(text: str):
+        try: value = kind(text)
+        except ValueError: raise argparse.ArgumentTypeError(f'invalid number: {text!r}') from None
+        if not value > 0: raise argparse.ArgumentTypeError(f'must be positive: {text}')
+        return value
+    return convert
+
 def make_parser():
-    p = argparse.ArgumentParser(prog='ft_onion', add_help=False, description='Layered onion encryption/decryption (AES-256-GCM).')
+    p = argparse.ArgumentParser(prog='ft_onion', add_help=False, description='Layered onion encryption/decryption (AES-256-GCM, ChaCha20-Poly1305, AES-GCM-SIV).')
     g = p.add_mutually_exclusive_group(required=True)
     g.add_argument('-e','--encrypt', action='store_true', help='encrypt mode')
     g.add_argument('-d','--decrypt', action='store_true', help='decrypt mode')
+    g.add_argument('-r','--rekey', action='store_true', help='re-encrypt -i into -o with calibrated scrypt cost (and -n keys); plaintext stays in memory')
     p.add_argument('-k','--keys', metavar='K1,K2,... or -', required=True, help='comma-separated passphrases; or "-" to prompt securely')
-    p.add_argument('-i','--in', dest='inp', required=True, help='input file')
-    p.add_argument('-o','--out', dest='out', required=True, help='output file')
+    p.add_argument('-n','--new-keys', metavar='K1,K2,... or -', help='new passphrases for --rekey (default: same as -k)')
+    p.add_argument('-i','--in', dest='inp', default='-', help='input file (default "-" = stdin; encrypting stdin writes ONI2)')
+    p.add_argument('-o','--out', dest='out', default='-', help='output file (default "-" = stdout)')
+    p.add_argument('-s','--stream', action='store_true', help='write the chunked ONI2 format (constant memory, no size limit); decrypt detects it')
+    p.add_argument('--chunk', type=int, default=DEFAULT_CHUNK//1024, metavar='KB', help=f'ONI2 chunk size in KiB (default {DEFAULT_CHUNK//1024})')
+    p.add_argument('-j','--jobs', type=int, metavar='N', help='process ONI2 chunks (with --batch: files) on N worker processes (0 = all CPUs); implies -s without --batch')
+    p.add_argument('-b','--batch', action='store_true', help='-i and -o are directories: one scrypt run per layer for all files, per-file HKDF subkeys; writes OUT/manifest.json')
+    p.add_argument('-c','--cipher', metavar='NAME[,NAME...]', help=f'layer cipher(s): {", ".join(CIPHER_NAMES)} or auto (fastest here, benchmark cached); one, or one per layer (default {DEFAULT_CIPHER})')
+    p.add_argument('-z','--compress', metavar='ALGO', help=f'compress before the innermost layer: {", ".join(compress.names())}')
+    p.add_argument('--level', type=int, metavar='N', help='compression level (default: zlib/lzma 6, zstd 3)')
+    p.add_argument('--range', metavar='OFFSET:LEN', help='with -d: decrypt only plaintext bytes OFFSET..OFFSET+LEN of an ONI2 file (LEN empty = to the end)')
+    p.add_argument('--stats', action='store_true', help='print throughput to stderr')
+    p.add_argument('--kdf-ms', type=positive(float), metavar='MS', help=f'calibrate scrypt to ~MS per layer key (default for --rekey: {DEFAULT_TARGET_MS})')
+    p.add_argument('--kdf-mem', type=positive(int), metavar='MB', help=f'scrypt memory ceiling for calibration (default {DEFAULT_MAX_MEM_MB})')
     p.add_argument('-h','--help', action='help', help='show help and exit')
     return p
 
+def _size_hint(a, src, pws) -> int | None:
+    """Expected output size, so the output file can be preallocated in one extent."""
+    from src.ft_onion.io import input_size
+    from src.ft_onion.aead import TAG
+    size = input_size(src)
+    if size is None or a.decrypt or a.rekey: return size
+    if a.compress: return None
+    chunks = size // (a.chunk*1024) + 1 if a.stream or a.jobs is not None else 1
+    return size + TAG*len(pws)*chunks + 4096
+
 def main(argv=None)->int:
     a = make_parser().parse_args(argv)
+    from src.ft_onion.layers import seal_to, peel_to, read_meta
+    from src.ft_onion.stream import seal_stream, peel_stream, peel_range, parse_range, rekey_stream, resolve_jobs, STREAM_MAGIC
+    from src.ft_onion.io import open_input, open_output
+    from src.ft_onion import aead
+    from cryptography.exceptions import InvalidTag
     pws = parse_pw_list(a.keys)
     try:
-        data = read_bytes(a.inp)
-        if a.encrypt: write_bytes(a.out, seal(data, pws))
-        else: write_bytes(a.out, peel(data, pws))
+        kdf = None
+        if a.rekey or a.kdf_ms is not None or a.kdf_mem is not None:
+            kdf = calibrate(DEFAULT_TARGET_MS if a.kdf_ms is None else a.kdf_ms,
+                            DEFAULT_MAX_MEM_MB if a.kdf_mem is None else a.kdf_mem)
+        new_pws = (parse_pw_list(a.new_keys, 'new passphrase') if a.new_keys else pws) if a.rekey else None
+        jobs = resolve_jobs(a.jobs)
+        cipher = None if a.decrypt else aead.resolve(a.cipher, len(new_pws or pws))
+        if a.compress and not a.decrypt: compress.check_level(compress.get(a.compress), a.level)
+        if a.encrypt and a.inp == '-': a.stream = True  # a pipe may be endless: stream it
+        if a.batch:
+            if a.rekey: raise ValueError("--batch supports -e and -d only")
+            if '-' in (a.inp, a.out): raise ValueError("--batch needs -i and -o directories")
+            from src.ft_onion.batch import run_batch
+            entries, summary = run_batch(a.inp, a.out, Keyring(pws, kdf, batch=True), a.decrypt, a.stream, a.chunk*1024, jobs, cipher, a.compress, a.level)
+            for e in entries:
+                if e["status"] != "ok": print(f'ft_onion: {e["path"]}: {e["error"]}', file=sys.stderr)
+            if a.stats:
+                s = summary
+                print(f'ft_onion: {s["files"]} file(s), {s["bytes"]/2**20:.1f} MiB in {s["seconds"]:.2f}s '
+                      f'(KDF {s["kdf_seconds"]:.2f}s, {jobs} worker(s)), {s["errors"]} error(s)', file=sys.stderr)
+            return 1 if summary["errors"] else 0
+        if a.range:
+            if not a.decrypt or a.batch or a.inp == '-': raise ValueError("--range needs -d and an -i file")
+            offset, length = parse_range(a.range)
+            with open(a.inp, 'rb') as src, open_output(a.out) as dst:
+                peel_range(src, dst, pws, offset, length, jobs)
+            return 0
+        if a.decrypt or a.stream or a.jobs is not None:
+            t0 = time.perf_counter()
+            with open_input(a.inp, mapped=True) as src, open_output(a.out, _size_hint(a, src, pws)) as dst:
+                if a.decrypt: n = peel_stream(src, dst, pws, jobs)
+                elif a.encrypt: n = seal_stream(src, dst, pws, kdf, a.chunk*1024, jobs, cipher, a.compress, a.level)
+                else: n = rekey_stream(src, dst, pws, new_pws, kdf, a.chunk*1024, jobs, cipher, a.compress, a.level)
+            if a.stats:
+                dt = time.perf_counter() - t0
+                print(f'ft_onion: {n/2**20:.1f} MiB in {dt:.2f}s = {n/2**20/dt:.1f} MiB/s ({jobs} worker(s), {len(pws)} layer(s))', file=sys.stderr)
+            return 0
+        with open_input(a.inp, mapped=True) as src:
+            data = src.view if hasattr(src, 'view') else src.read()
+            with open_output(a.out, _size_hint(a, src, pws)) as dst:
+                if a.encrypt: seal_to(dst, data, pws, kdf, cipher, a.compress, a.level)
+                elif bytes(data[:4]) == STREAM_MAGIC:  # ONI2 in: rekey it as a stream, ONI2 out
+                    rekey_stream(src if hasattr(src, 'view') else io.BytesIO(data), dst, pws, new_pws, kdf,
+                                 a.chunk*1024, jobs, cipher, a.compress, a.level)
+                else:
+                    plain = io.BytesIO(); peel_to(plain, data, pws)
+                    seal_to(dst, plain.getbuffer(), new_pws, kdf, cipher, a.compress or read_meta(data).get("compress"), a.level)
         return 0
     except KeyboardInterrupt: return 130
+    except InvalidTag:  # str() is empty
+        print(f'ft_onion: error: {aead.AUTH_FAILED}', file=sys.stderr); return 1
     except Exception as e:
         print(f'ft_onion: error: {e}', file=sys.stderr); return 1
 
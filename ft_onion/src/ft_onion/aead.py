@@ -0,0 +1,158 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Union
+import os, json, time, platform
+
+# Layer ciphers. Each layer's header records its "cipher"; layers without one (every
+# file written before this field existed) are AES-256-GCM. All take a 32-byte key and a
+# 12-byte nonce and append a 16-byte tag, so both formats' nonce schemes apply unchanged.
+# Callers hand a buffer whose first n bytes are the input and that has TAG spare bytes.
+# cryptography is imported where a cipher is built, not at module load (CLI --help stays light).
+
+TAG = 16
+DEFAULT = "aes-256-gcm"
+AUTO = "auto"
+AUTH_FAILED = "authentication failed (wrong passphrase or corrupt input)"  # what InvalidTag means to a user
+BENCH_SIZE = 1 << 20
+
+def gcm_seal_into(aes, nonce: bytes, aad: bytes, buf: memoryview, n: int) -> int:
+    """AES-GCM in place: buf[:n] becomes ciphertext and the tag lands right behind it.
+
+    Same bytes as AESGCM.encrypt (ciphertext || tag), without allocating a new buffer
+    per layer.
+    """
+    from cryptography.hazmat.primitives.ciphers import Cipher, modes
+    enc = Cipher(aes, modes.GCM(nonce)).encryptor()
+    enc.authenticate_additional_data(aad)
+    enc.update_into(buf[:n], buf); enc.finalize()
+    buf[n:n+TAG] = enc.tag
+    return n + TAG
+
+def gcm_open_into(aes, nonce: bytes, aad: bytes, buf: memoryview, n: int) -> int:
+    """Decrypt buf[:n] in place; raises InvalidTag before the caller may use the plaintext."""
+    if n < TAG: raise ValueError("ciphertext too short")
+    from cryptography.hazmat.primitives.ciphers import Cipher, modes
+    dec = Cipher(aes, modes.GCM(nonce, bytes(buf[n-TAG:n]))).decryptor()
+    dec.authenticate_additional_data(aad)
+    dec.update_into(buf[:n-TAG], buf); dec.finalize()
+    return n - TAG
+
+class AesGcm:
+    """AES-256-GCM, in place (fast path)."""
+    def __init__(self, key: bytes):
+        from cryptography.hazmat.primitives.ciphers import algorithms
+        self.aes = algorithms.AES(key)
+    def seal_into(self, nonce: bytes, aad: bytes, buf: memoryview, n: int) -> int:
+        return gcm_seal_into(self.aes, nonce, aad, buf, n)
+    def open_into(self, nonce: bytes, aad: bytes, buf: memoryview, n: int) -> int:
+        return gcm_open_into(self.aes, nonce, aad, buf, n)
+
+class Aead:
+    """Any cryptography AEAD class (encrypt/decrypt returning bytes), copied back into buf."""
+    def __init__(self, cls, key: bytes): self.aead = cls(key)
+    def seal_into(self, nonce: bytes, aad: bytes, buf: memoryview, n: int) -> int:
+        buf[:n+TAG] = self.aead.encrypt(nonce, buf[:n], aad)
+        return n + TAG
+    def open_into(self, nonce: bytes, aad: bytes, buf: memoryview, n: int) -> int:
+        if n < TAG: raise ValueError("ciphertext too short")
+        buf[:n-TAG] = self.aead.decrypt(nonce, buf[:n], aad)
+        return n - TAG
+
+def _chacha():
+    from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+    return ChaCha20Poly1305
+
+def _gcm_siv():
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCMSIV  # cryptography >= 42
+    return AESGCMSIV
+
+CIPHERS = {
+    "aes-256-gcm": AesGcm,
+    "chacha20-poly1305": lambda key: Aead(_chacha(), key),
+    "aes-256-gcm-siv": lambda key: Aead(_gcm_siv(), key),
+}
+
+def new(name: str, key: bytes):
+    """Layer cipher object for name; ValueError if unknown or unsupported by this OpenSSL."""
+    try: factory = CIPHERS[name]
+    except KeyError: raise ValueError(f"unknown cipher: {name}") from None
+    from cryptography.exceptions import UnsupportedAlgorithm
+    try: return factory(key)
+    except (UnsupportedAlgorithm, ImportError) as e: raise ValueError(f"cipher {name} not supported here: {e}") from None
+
+def layer_cipher(layer: dict) -> str:
+    return layer.get("cipher", DEFAULT)
+
+def available() -> List[str]:
+    out = []
+    for name in CIPHERS:
+        try: new(name, bytes(32)).seal_into(bytes(12), b'', memoryview(bytearray(TAG)), 0)
+        except ValueError: continue
+        out.append(name)
+    return out
+
+def benchmark(size: int = BENCH_SIZE, rounds: int = 3) -> Dict[str, float]:
+    """MiB/s of each available cipher sealing then opening size bytes (best of rounds)."""
+    buf = memoryview(bytearray(size + TAG)); nonce = bytes(12); res = {}
+    for name in available():
+        c = new(name, os.urandom(32)); best = float('inf')
+        for _ in range(rounds):
+            t = time.perf_counter()
+            c.open_into(nonce, b'', buf, c.seal_into(nonce, b'', buf, size))
+            best = min(best, time.perf_counter() - t)
+        res[name] = round(2 * size / 2**20 / best, 1)
+    return res
+
+def cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ft_onion", "aead.json")
+
+# CPU features that decide AES-GCM vs ChaCha20 speed (x86 "flags", arm "Features" in /proc/cpuinfo)
+CPU_FLAGS = frozenset({"aes", "pclmulqdq", "avx", "avx2", "avx512f", "vaes", "vpclmulqdq", "pmull", "asimd"})
+
+def _cpu_flags() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.strip() in ("flags", "Features"): return ",".join(sorted(CPU_FLAGS.intersection(value.split())))
+    except OSError: pass
+    return ""
+
+def _openssl_version() -> str:
+    try:
+        from cryptography.hazmat.backends.openssl.backend import backend
+        return backend.openssl_version_text()
+    except Exception: return ""  # other backends / layouts: the cryptography version still counts
+
+def _host_id() -> str:
+    """Everything the benchmark result depends on: CPU model and features, cryptography and OpenSSL."""
+    import cryptography
+    return "|".join((platform.machine(), platform.processor(), _cpu_flags(), cryptography.__version__, _openssl_version()))
+
+def fastest(path: Optional[str] = None, refresh: bool = False) -> str:
+    """Fastest cipher on this host; the benchmark result is cached per host/library version."""
+    path = path or cache_path()
+    if not refresh:
+        try:
+            with open(path) as f: cached = json.load(f)
+            if cached.get("host") == _host_id() and cached.get("fastest") in CIPHERS: return cached["fastest"]
+        except (OSError, ValueError): pass
+    speeds = benchmark()
+    best = max(speeds, key=speeds.get) if speeds else DEFAULT
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f: json.dump({"host": _host_id(), "fastest": best, "mib_s": speeds}, f)
+        os.replace(path + ".tmp", path)
+    except OSError: pass  # read-only home: just benchmark again next time
+    return best
+
+def resolve(spec: Optional[Union[str, List[str]]], layers: int) -> List[str]:
+    """Per-layer cipher names from None (default), a name, "auto", or a comma list / list with one name per layer."""
+    names = [DEFAULT] if spec is None else (spec.split(',') if isinstance(spec, str) else list(spec))
+    names = [n.strip().lower() for n in names]
+    if len(names) == 1: names = names * layers
+    if len(names) != layers: raise ValueError("give one cipher, or one per layer")
+    if AUTO in names:
+        best = fastest(); names = [best if n == AUTO else n for n in names]
+    for n in set(names): new(n, bytes(32))  # reject unknown/unsupported names up front
+    return names
@@ -0,0 +1,103 @@
+from __future__ import annotations
+from typing import Iterator, List, Optional, Tuple, Union
+import os, json, time
+from cryptography.exceptions import InvalidTag
+from . import aead
+from .kdf import Keyring
+from .layers import seal_to
+from .stream import seal_stream, peel_stream, read_header, DEFAULT_CHUNK
+from .io import open_input, open_output
+
+# Directory mode: every file under SRC is sealed/peeled into the same relative path under
+# DST (".oni" appended on seal, stripped on peel) with one shared Keyring(batch=True), so
+# scrypt runs once per layer for the whole batch and per-file cost is HKDF + AES. Files
+# are spread over a process pool; each worker gets the already-derived master keys.
+# Results go to DST/manifest.json, one entry per file; a failing file doesn't stop the batch.
+
+SUFFIX = ".oni"
+MANIFEST = "manifest.json"
+
+def walk(root: str, skip: Optional[str] = None) -> Iterator[str]:
+    """Relative paths of regular files under root, sorted; skip is a directory to leave out."""
+    skip = os.path.realpath(skip) if skip else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if os.path.realpath(os.path.join(dirpath, d)) != skip)
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                yield os.path.relpath(path, root)
+
+def output_name(rel: str, decrypt: bool) -> str:
+    if not decrypt: return rel + SUFFIX
+    return rel[:-len(SUFFIX)] if rel.endswith(SUFFIX) and len(rel) > len(SUFFIX) else rel + ".out"
+
+def process_file(ring: Keyring, src_path: str, dst_path: str, decrypt: bool, stream: bool,
+                 chunk_size: int = DEFAULT_CHUNK, cipher: Optional[List[str]] = None,
+                 compress: Optional[str] = None, level: Optional[int] = None) -> int:
+    """Seal (ONI1, or ONI2 with stream) or peel one file; returns plaintext bytes."""
+    os.makedirs(os.path.dirname(dst_path) or '.', exist_ok=True)
+    with open_input(src_path, mapped=True) as src, open_output(dst_path) as dst:
+        if decrypt: return peel_stream(src, dst, ring)
+        if stream: return seal_stream(src, dst, ring, chunk_size=chunk_size, cipher=cipher, compress=compress, level=level)
+        data = src.view if hasattr(src, 'view') else src.read()
+        seal_to(dst, data, ring, cipher=cipher, compress=compress, level=level)
+        return len(data)
+
+_worker_ring: Optional[Keyring] = None
+
+def _worker_init(ring: Keyring) -> None:
+    global _worker_ring
+    _worker_ring = ring
+
+def _job(rel: str, src_root: str, dst_root: str, decrypt: bool, stream: bool, chunk_size: int, cipher: Optional[List[str]],
+         compress: Optional[str], level: Optional[int]) -> dict:
+    out = output_name(rel, decrypt)
+    entry = {"path": rel, "output": out}
+    t = time.perf_counter()
+    try:
+        entry["bytes"] = process_file(_worker_ring, os.path.join(src_root, rel), os.path.join(dst_root, out), decrypt, stream, chunk_size, cipher, compress, level)
+        entry["status"] = "ok"
+    except InvalidTag:
+        entry.update(status="error", error=aead.AUTH_FAILED)
+    except Exception as e:
+        entry.update(status="error", error=str(e) or type(e).__name__)
+    entry["seconds"] = round(time.perf_counter() - t, 6)
+    return entry
+
+def prepare(ring: Keyring, src_root: str, files: List[str], decrypt: bool) -> None:
+    """Derive every master key the batch needs in this process, before forking workers."""
+    if not decrypt:
+        ring.new_layers(); return
+    for rel in files:
+        try:
+            with open(os.path.join(src_root, rel), 'rb') as f: ring.open_layers(read_header(f)[2].get("layers", []))
+        except Exception:
+            pass  # reported per file by the worker
+
+def run_batch(src_root: str, dst_root: str, ring: Keyring, decrypt: bool = False, stream: bool = False,
+              chunk_size: int = DEFAULT_CHUNK, jobs: int = 1, cipher: Optional[Union[str, List[str]]] = None,
+              compress: Optional[str] = None, level: Optional[int] = None) -> Tuple[List[dict], dict]:
+    """Process every file of src_root into dst_root; returns (entries, summary), also written as the manifest."""
+    if not os.path.isdir(src_root): raise ValueError(f"{src_root}: not a directory")
+    files = [rel for rel in walk(src_root, skip=dst_root) if not (decrypt and rel == MANIFEST)]
+    os.makedirs(dst_root, exist_ok=True)
+    t0 = time.perf_counter()
+    prepare(ring, src_root, files, decrypt)
+    t_kdf = time.perf_counter() - t0
+    cipher = None if decrypt else aead.resolve(cipher, len(ring))  # "auto" benchmarked once, not per worker
+    args = [(rel, src_root, dst_root, decrypt, stream, chunk_size, cipher, compress, level) for rel in files]
+    if jobs <= 1 or len(files) <= 1:
+        _worker_init(ring)
+        entries = [_job(*a) for a in args]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # deferred: pulls in multiprocessing
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init, initargs=(ring,)) as pool:
+            entries = list(pool.map(_job, *zip(*args), chunksize=max(1, len(args) // (4*jobs))))
+    elapsed = time.perf_counter() - t0
+    summary = {"mode": "decrypt" if decrypt else "encrypt", "files": len(entries),
+               "errors": sum(e["status"] != "ok" for e in entries),
+               "bytes": sum(e.get("bytes", 0) for e in entries),
+               "kdf_seconds": round(t_kdf, 6), "seconds": round(elapsed, 6), "jobs": jobs}
+    with open_output(os.path.join(dst_root, MANIFEST)) as f:
+        f.write(json.dumps({**summary, "entries": entries}, indent=1).encode())
+    return entries, summary
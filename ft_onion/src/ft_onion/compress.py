@@ -0,0 +1,107 @@
+from __future__ import annotations
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
+import zlib, lzma, importlib.util
+
+# Optional compression applied to the plaintext before the innermost layer (ciphertext
+# doesn't compress). The header records the algorithm as "compress"; absent = none.
+# Streams are compressed/decompressed on the fly, decompression in bounded pieces so a
+# highly compressible chunk can't balloon memory.
+
+OUT_BLOCK = 1 << 20  # max decompressed bytes produced per step
+IN_BLOCK = 1 << 20   # plaintext read per compressor step
+
+
+class Zlib:
+    name = "zlib"; default_level = 6; levels = range(0, 10)
+    def compressor(self, level: int): return zlib.compressobj(level)
+    def decompressor(self, out: BinaryIO): return zlib.decompressobj()
+    def pieces(self, d, data) -> Iterator[bytes]:
+        out = d.decompress(data, OUT_BLOCK)
+        while True:
+            if out: yield out
+            if not d.unconsumed_tail: return
+            out = d.decompress(d.unconsumed_tail, OUT_BLOCK)
+
+class Lzma:
+    name = "lzma"; default_level = 6; levels = range(0, 10)
+    def compressor(self, level: int): return lzma.LZMACompressor(preset=level)
+    def decompressor(self, out: BinaryIO): return lzma.LZMADecompressor()
+    def pieces(self, d, data) -> Iterator[bytes]:
+        if d.eof and data: raise ValueError("data after end of compressed stream")
+        out = d.decompress(data, OUT_BLOCK)
+        while True:
+            if out: yield out
+            if d.eof or d.needs_input: return
+            out = d.decompress(b'', OUT_BLOCK)
+
+class Zstd:
+    name = "zstd"; default_level = 3; levels = range(1, 23)
+    # zstandard (optional: pip install zstandard) is imported on first use
+    def compressor(self, level: int):
+        import zstandard
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    def decompressor(self, out: BinaryIO):
+        # zstandard's decompressobj has no output cap; its stream_writer hands out OUT_BLOCK pieces.
+        # It can't report a truncated frame, but the compressed stream is authenticated as a whole.
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_writer(out, write_size=OUT_BLOCK, closefd=False)
+    def pieces(self, d, data) -> Iterator[bytes]:
+        d.write(data)  # output already went to `out`
+        return iter(())
+
+CODECS: Dict[str, object] = {"zlib": Zlib(), "lzma": Lzma()}
+if importlib.util.find_spec("zstandard") is not None: CODECS["zstd"] = Zstd()
+
+def names() -> List[str]:
+    return list(CODECS) + ([] if "zstd" in CODECS else ["zstd (pip install zstandard)"])
+
+def get(name: str):
+    try: return CODECS[name]
+    except KeyError:
+        hint = " (pip install zstandard)" if name == "zstd" else ""
+        raise ValueError(f"unknown or unavailable compression: {name}{hint}") from None
+
+def check_level(codec, level: Optional[int]) -> int:
+    if level is None: return codec.default_level
+    if level not in codec.levels: raise ValueError(f"{codec.name} level must be {codec.levels.start}..{codec.levels.stop - 1}")
+    return level
+
+class CompressReader:
+    """Read side of a compressor: read(n) returns compressed bytes of src; consumed counts plaintext."""
+    def __init__(self, src: BinaryIO, name: str, level: Optional[int] = None):
+        codec = get(name)
+        self.src = src; self.c = codec.compressor(check_level(codec, level))
+        self.buf = bytearray(); self.eof = False; self.consumed = 0
+    def read(self, n: int = -1) -> bytes:
+        while (n < 0 or len(self.buf) < n) and not self.eof:
+            block = self.src.read(IN_BLOCK)
+            if not block:
+                self.buf += self.c.flush(); self.eof = True
+            else:
+                self.consumed += len(block); self.buf += self.c.compress(block)
+        n = len(self.buf) if n < 0 else min(n, len(self.buf))
+        out = bytes(self.buf[:n]); del self.buf[:n]
+        return out
+
+class _Emit:
+    def __init__(self, write: Callable[[bytes], int]): self.write = write
+
+class DecompressWriter:
+    """Write side of a decompressor: write(compressed) emits plaintext to dst; close() checks the end."""
+    def __init__(self, dst: BinaryIO, name: str):
+        self.codec = get(name); self.dst = dst; self.written = 0
+        self.d = self.codec.decompressor(_Emit(self._emit))
+    def _emit(self, piece) -> int:
+        self.dst.write(piece); self.written += len(piece)
+        return len(piece)
+    def write(self, data) -> int:
+        for piece in self.codec.pieces(self.d, data): self._emit(piece)
+        return len(data)
+    def close(self) -> None:
+        if not getattr(self.d, "eof", True): raise ValueError("truncated compressed stream")
+        if getattr(self.d, "unused_data", b""): raise ValueError("data after end of compressed stream")
+
+def compress_all(data, name: str, level: Optional[int] = None) -> bytes:
+    codec = get(name)
+    c = codec.compressor(check_level(codec, level))
+    return c.compress(data) + c.flush()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Union
+import os, sys, mmap, stat
+
+RELEASE_EVERY = 4 << 20  # drop already-consumed mapped pages every 4 MiB
+
+def read_bytes(path: str) -> bytes:
+    if path == '-': return sys.stdin.buffer.read()
+    with open(path, 'rb') as f:
+        return f.read()
+
+def write_bytes(path: str, data: bytes) -> None:
+    with open_output(path, len(data)) as f:
+        f.write(data)
+
+class MappedReader:
+    """File-like reader over an mmap whose read() returns zero-copy memoryview slices.
+
+    Pages behind the read position are handed back to the kernel as we go
+    (MADV_DONTNEED on a read-only file mapping just re-faults from the file if
+    touched again), so resident memory stays near the working set, not the file size.
+    """
+    def __init__(self, mm: mmap.mmap):
+        self.mm = mm; self.view = memoryview(mm); self.pos = 0; self._released = 0
+        if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'): mm.madvise(mmap.MADV_SEQUENTIAL)
+    def __len__(self) -> int: return len(self.view)
+    def read(self, n: int = -1) -> memoryview:
+        end = len(self.view) if n is None or n < 0 else min(self.pos + n, len(self.view))
+        out = self.view[self.pos:end]; self.pos = end
+        self._release_behind()
+        return out
+    def _release_behind(self) -> None:
+        # keep the last RELEASE_EVERY bytes mapped: readers hold a block or two of lookahead
+        upto = (self.pos - RELEASE_EVERY) // mmap.PAGESIZE * mmap.PAGESIZE
+        if upto - self._released >= RELEASE_EVERY and hasattr(mmap, 'MADV_DONTNEED'):
+            self.mm.madvise(mmap.MADV_DONTNEED, self._released, upto - self._released)
+            self._released = upto
+
+@contextmanager
+def open_input(path: str, mapped: bool = False) -> Iterator[Union[BinaryIO, MappedReader]]:
+    """Binary reader for path, or stdin for '-'.
+
+    mapped=True memory-maps regular non-empty files and yields a MappedReader instead.
+    """
+    if path == '-':
+        yield sys.stdin.buffer; return
+    with open(path, 'rb') as f:
+        if not (mapped and os.fstat(f.fileno()).st_size > 0):
+            yield f; return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        reader = MappedReader(mm)
+        try:
+            yield reader
+        finally:
+            reader.view.release()
+            try: mm.close()
+            except BufferError: pass  # slices still referenced (e.g. by a traceback); GC unmaps it
+
+def input_size(src) -> Optional[int]:
+    """Byte size of a mapped or regular-file input, None for pipes."""
+    if isinstance(src, MappedReader): return len(src)
+    try: st = os.fstat(src.fileno())
+    except (AttributeError, OSError, ValueError): return None
+    return st.st_size if stat.S_ISREG(st.st_mode) else None
+
+@contextmanager
+def open_output(path: str, size_hint: Optional[int] = None) -> Iterator[BinaryIO]:
+    """Binary writer for path, or stdout for '-'.
+
+    Files are written to path.tmp (preallocated to size_hint when the OS supports it,
+    trimmed to the real size at the end) and renamed over path once; the temp file is
+    removed on error.
+    """
+    if path == '-':
+        yield sys.stdout.buffer; sys.stdout.buffer.flush(); return
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            if size_hint and hasattr(os, 'posix_fallocate'):
+                try: os.posix_fallocate(f.fileno(), 0, size_hint)
+                except OSError: pass  # e.g. filesystem without fallocate support
+            yield f
+            f.truncate(f.tell())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
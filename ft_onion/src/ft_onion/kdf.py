@@ -0,0 +1,130 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+import os, time, base64, threading
+
+DEFAULT_TARGET_MS = 250   # calibration: wanted time per layer key
+DEFAULT_MAX_MEM_MB = 64   # calibration: scrypt memory ceiling
+MIN_N = 2**12             # never calibrate below this cost factor
+MAX_P = 16                # calibration: upper bound for the parallelism factor
+
+@dataclass(frozen=True)
+class ScryptParams:
+    """scrypt cost parameters; stored per layer in the onion header."""
+    n: int = 2**14
+    r: int = 8
+    p: int = 1
+    @property
+    def memory_bytes(self) -> int:
+        return 128 * self.r * self.n
+    def to_meta(self) -> dict:
+        return {"n": self.n, "r": self.r, "p": self.p}
+    @staticmethod
+    def from_meta(layer: dict) -> "ScryptParams":
+        # ONI1 files written before parameters were recorded use the old fixed cost
+        return ScryptParams(n=int(layer.get("n", 2**14)), r=int(layer.get("r", 8)), p=int(layer.get("p", 1)))
+
+def derive(passphrase: str, salt: bytes, params: ScryptParams = ScryptParams()) -> bytes:
+    if not isinstance(passphrase, str): raise TypeError("passphrase must be str")
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt  # deferred, like aead.py
+    kdf = Scrypt(salt=salt, length=32, n=params.n, r=params.r, p=params.p)
+    return kdf.derive(passphrase.encode('utf-8'))
+
+def memory_budget() -> int:
+    """Bytes the concurrent KDFs may use together: half the free RAM (1 GiB if unknown)."""
+    try: return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // 2
+    except (AttributeError, ValueError, OSError): return 1 << 30
+
+def _derive_job(job: Tuple[str, bytes, ScryptParams]) -> bytes:
+    return derive(*job)
+
+def derive_many(jobs: List[Tuple[str, bytes, ScryptParams]], workers: Optional[int] = None,
+                mem_budget: Optional[int] = None) -> List[bytes]:
+    """Derive every (passphrase, salt, params) key at once, before any cipher work.
+
+    scrypt is CPU- and memory-bound and holds the GIL, so the derivations run in a
+    process pool sized min(keys, CPUs, memory budget / per-key scrypt memory); N layers
+    then cost about one KDF of wall time instead of N.
+    """
+    if not jobs: return []
+    peak = max(p.memory_bytes for _, _, p in jobs)
+    n = min(len(jobs), workers or os.cpu_count() or 1, max(1, (mem_budget or memory_budget()) // peak))
+    if n <= 1: return [derive(*j) for j in jobs]
+    from concurrent.futures import ProcessPoolExecutor  # deferred: pulls in multiprocessing
+    with ProcessPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(_derive_job, jobs))
+
+def subkey(master: bytes, sub_salt: bytes) -> bytes:
+    """Per-file layer key: HKDF-SHA256(master, salt=sub_salt)."""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=sub_salt, info=b"ft_onion layer").derive(master)
+
+class Keyring:
+    """Layer keys for one passphrase list (innermost layer first).
+
+    By default every new_layers() draws fresh scrypt salts: one KDF per layer per file.
+    With batch=True the scrypt salts are drawn once, so each layer's master key is
+    derived once for the keyring's lifetime; every file then gets its own key
+    HKDF(master, per-file salt), the salt being recorded as the layer's "sub" field.
+    Masters met while opening files are cached as well, keyed by (layer, salt, params).
+    """
+    def __init__(self, passphrases: List[str], kdf: Optional[ScryptParams] = None, batch: bool = False):
+        self.passphrases = list(passphrases); self.kdf = kdf or ScryptParams(); self.batch = batch
+        self.masters: Dict[Tuple[int, bytes, ScryptParams], bytes] = {}
+        self._salts: Optional[List[bytes]] = None
+        self._lock = threading.Lock()
+    def __len__(self) -> int: return len(self.passphrases)
+    def __getstate__(self) -> dict:  # shipped to worker processes with its masters
+        return {k: v for k, v in self.__dict__.items() if k != '_lock'}
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state); self._lock = threading.Lock()
+    def _masters_for(self, specs: List[Tuple[int, bytes, ScryptParams]]) -> List[bytes]:
+        with self._lock:
+            missing = [s for s in dict.fromkeys(specs) if s not in self.masters]
+            if missing:
+                self.masters.update(zip(missing, derive_many([(self.passphrases[i], salt, p) for i, salt, p in missing])))
+            return [self.masters[s] for s in specs]
+    def new_layers(self) -> Tuple[List[dict], List[bytes]]:
+        """Fresh per-layer header fields and keys for sealing one file."""
+        if self.batch and self._salts is None: self._salts = [os.urandom(16) for _ in self.passphrases]
+        salts = self._salts if self.batch else [os.urandom(16) for _ in self.passphrases]
+        keys = self._masters_for([(i, salt, self.kdf) for i, salt in enumerate(salts)])
+        metas = [{"salt": base64.b64encode(salt).decode(), **self.kdf.to_meta()} for salt in salts]
+        if not self.batch: return metas, keys
+        subs = [os.urandom(16) for _ in salts]
+        for meta, sub in zip(metas, subs): meta["sub"] = base64.b64encode(sub).decode()
+        return metas, [subkey(k, sub) for k, sub in zip(keys, subs)]
+    def open_layers(self, layers: List[dict]) -> List[bytes]:
+        """Keys for the header layers of an existing file."""
+        if len(layers) != len(self.passphrases): raise ValueError("passphrase count mismatch")
+        keys = self._masters_for([(i, base64.b64decode(l["salt"]), ScryptParams.from_meta(l)) for i, l in enumerate(layers)])
+        return [subkey(k, base64.b64decode(l["sub"])) if "sub" in l else k for k, l in zip(keys, layers)]
+
+def as_keyring(passphrases: Union[List[str], Keyring], kdf: Optional[ScryptParams] = None) -> Keyring:
+    return passphrases if isinstance(passphrases, Keyring) else Keyring(passphrases, kdf)
+
+def _time_scrypt(params: ScryptParams, rounds: int = 3) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        t = time.perf_counter(); derive('calibration', b'\0'*16, params)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def calibrate(target_ms: float = DEFAULT_TARGET_MS, max_mem_mb: int = DEFAULT_MAX_MEM_MB, r: int = 8) -> ScryptParams:
+    """Benchmark scrypt here and pick params taking ~target_ms within max_mem_mb.
+
+    Time is linear in n*p and memory in n: take the largest power-of-two n that fits
+    both limits, then spend any time left on p (at most MAX_P). A ceiling below
+    128*MIN_N*r bytes lowers r first.
+    """
+    if target_ms <= 0 or max_mem_mb <= 0: raise ValueError("target time and memory ceiling must be positive")
+    ceiling = int(max_mem_mb * 1024 * 1024)
+    while r > 1 and 128*MIN_N*r > ceiling: r //= 2
+    if 128*MIN_N*r > ceiling: raise ValueError(f"memory ceiling too low: scrypt needs at least {128*MIN_N//1024} KiB")
+    per_n = _time_scrypt(ScryptParams(MIN_N, r, 1)) / MIN_N
+    budget = target_ms / 1000.0
+    max_n = ceiling // (128 * r)
+    n = MIN_N
+    while n*2 <= max_n and per_n*n*2 <= budget: n *= 2
+    return ScryptParams(n=n, r=r, p=min(MAX_P, max(1, int(budget // (per_n*n)))))
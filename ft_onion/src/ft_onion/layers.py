@@ -0,0 +1,93 @@
+from __future__ import annotations
+from typing import BinaryIO, List, Optional, Tuple, Union
+import io, os, json, base64
+from . import aead
+from .aead import TAG
+from .compress import DecompressWriter, compress_all
+from .kdf import ScryptParams, Keyring, as_keyring, derive
+
+MAGIC = b"ONI1"
+
+def _derive(passphrase: str, salt: bytes, n: int=2**14, r: int=8, p: int=1) -> bytes:
+    return derive(passphrase, salt, ScryptParams(n, r, p))
+
+# Every layer runs in place in one preallocated buffer: buf[:n] holds the data, the
+# layer's output overwrites it (plus the 16-byte tag on seal). See aead.py.
+
+def _is_bytes_like(x) -> bool:
+    return isinstance(x, (bytes, bytearray, memoryview))
+
+def _aad(i: int, compress: Optional[str]) -> bytes:
+    """Every layer authenticates MAGIC; the innermost one also the "compress" header field,
+    so stripping or changing it can't make peel hand back the still-compressed bytes."""
+    return MAGIC + b"|" + compress.encode() if i == 0 and compress else MAGIC
+
+def check_meta(meta, top: Tuple[str, ...], per_layer: Tuple[str, ...]) -> dict:
+    """meta, if it has the fields peel needs; a damaged header is a ValueError, not a KeyError."""
+    layers = meta.get("layers") if isinstance(meta, dict) else None
+    if not (isinstance(layers, list) and all(k in meta for k in top)
+            and all(isinstance(l, dict) and all(k in l for k in per_layer) for l in layers)):
+        raise ValueError("corrupt header")
+    return meta
+
+def read_meta(blob) -> dict:
+    """The JSON header of an ONI1 blob."""
+    if not (_is_bytes_like(blob) and len(blob) >= 8):
+        raise ValueError("blob too short or wrong type")
+    blob = memoryview(blob)
+    if blob[:4] != MAGIC: raise ValueError("bad magic or unsupported version")
+    mlen = int.from_bytes(blob[4:8],'big')
+    return check_meta(json.loads(bytes(blob[8:8+mlen]).decode()), (), ("salt", "nonce"))
+
+def seal_to(dst: BinaryIO, plaintext, passphrases: Union[List[str], Keyring], kdf: Optional[ScryptParams] = None,
+            cipher: Optional[Union[str, List[str]]] = None, compress: Optional[str] = None, level: Optional[int] = None) -> int:
+    """Write the ONI1 encryption of plaintext to dst; one working buffer for all layers.
+
+    cipher: one aead name (or "auto") for every layer, or one per layer; default AES-256-GCM.
+    compress: zlib/lzma/zstd applied before the innermost layer (at level), recorded in the header.
+    """
+    if not _is_bytes_like(plaintext):
+        raise TypeError("plaintext must be bytes-like")
+    if compress: plaintext = compress_all(plaintext, compress, level)
+    layers, keys = as_keyring(passphrases, kdf).new_layers()
+    n = len(plaintext)
+    buf = memoryview(bytearray(n + TAG*len(keys)))
+    buf[:n] = plaintext
+    for i, (layer, key, name) in enumerate(zip(layers, keys, aead.resolve(cipher, len(keys)))):
+        nonce = os.urandom(12)
+        n = aead.new(name, key).seal_into(nonce, _aad(i, compress), buf, n)
+        layer.update(cipher=name, nonce=base64.b64encode(nonce).decode())
+    meta = {"layers": layers, **({"compress": compress} if compress else {})}
+    meta_b = json.dumps(meta, separators=(',',':')).encode()
+    dst.write(MAGIC + len(meta_b).to_bytes(4,'big') + meta_b); dst.write(buf[:n])
+    return n
+
+def peel_to(dst: BinaryIO, blob, passphrases: Union[List[str], Keyring]) -> int:
+    """Write the ONI1 decryption of blob (bytes, or a memoryview of an mmap) to dst; returns plaintext bytes."""
+    meta = read_meta(blob)
+    blob = memoryview(blob); mlen = int.from_bytes(blob[4:8],'big')
+    layers = meta["layers"]
+    keys = as_keyring(passphrases).open_layers(layers)
+    buf = memoryview(bytearray(blob[8+mlen:]))  # the only copy: input may be a read-only map
+    n = len(buf)
+    for i in range(len(layers)-1, -1, -1):
+        nonce = base64.b64decode(layers[i]["nonce"])
+        n = aead.new(aead.layer_cipher(layers[i]), keys[i]).open_into(nonce, _aad(i, meta.get("compress")), buf, n)
+    if not meta.get("compress"):
+        dst.write(buf[:n]); return n
+    out = DecompressWriter(dst, meta["compress"]); out.write(buf[:n]); out.close()
+    return out.written
+
+def seal(plaintext: bytes, passphrases: List[str], kdf: Optional[ScryptParams] = None,
+         cipher: Optional[Union[str, List[str]]] = None, compress: Optional[str] = None, level: Optional[int] = None) -> bytes:
+    """Encrypt plaintext with N onion layers (outermost = last passphrase).
+
+    kdf: scrypt parameters for every layer (default n=2^14, r=8, p=1); recorded per layer.
+    cipher, compress, level: see seal_to.
+    """
+    out = io.BytesIO(); seal_to(out, plaintext, passphrases, kdf, cipher, compress, level)
+    return out.getvalue()
+
+def peel(blob: bytes, passphrases: List[str]) -> bytes:
+    out = io.BytesIO(); peel_to(out, blob, passphrases)
+    return out.getvalue()
@@ -0,0 +1,293 @@
+from __future__ import annotations
+from typing import BinaryIO, Callable, Iterable, List, Optional, Tuple, Union
+from collections import deque
+import os, json, base64, threading
+from .kdf import ScryptParams, Keyring, as_keyring
+from . import aead
+from .aead import TAG
+from .compress import CompressReader, DecompressWriter
+from .layers import MAGIC as ONI1_MAGIC, check_meta, peel_to
+
+# ONI2: chunked streaming onion format.
+#
+#   MAGIC "ONI2" | meta_len (4, BE) | meta_json | record 0 | record 1 | ... | record k (final)
+#
+# The plaintext is cut into `chunk`-byte pieces (the final piece may be shorter or empty)
+# and every piece is sealed through all layers on its own, so a record is
+# len(piece) + 16*layers bytes. Layer l seals chunk i with the nonce
+#   prefix_l (7 random bytes) | i (4 bytes, BE) | final flag (1 byte)
+# and the whole header as associated data: reordering, dropping or truncating records,
+# or editing the header, all fail authentication.
+
+STREAM_MAGIC = b"ONI2"
+DEFAULT_CHUNK = 1 << 20
+MAX_CHUNKS = 1 << 32
+_HDR = 8
+
+def _b64(b: bytes) -> str: return base64.b64encode(b).decode()
+
+def layer_nonce(prefix: bytes, idx: int, final: bool) -> bytes:
+    if idx >= MAX_CHUNKS: raise ValueError("too many chunks for one stream")
+    return prefix + idx.to_bytes(4, 'big') + (b'\x01' if final else b'\x00')
+
+class ChunkCodec:
+    """Seals/opens chunks through every layer inside one reused buffer.
+
+    The returned memoryview aliases that buffer: write it out before the next call.
+    """
+    def __init__(self, keys: List[bytes], prefixes: List[bytes], aad: bytes, ciphers: Optional[List[str]] = None):
+        ciphers = ciphers or [aead.DEFAULT]*len(keys)
+        self.layers = [aead.new(name, k) for name, k in zip(ciphers, keys)]; self.prefixes = prefixes; self.aad = aad
+        self.buf = memoryview(bytearray(0))
+    def _load(self, data, size: int) -> memoryview:
+        if len(self.buf) < size: self.buf = memoryview(bytearray(size))
+        self.buf[:len(data)] = data
+        return self.buf
+    def seal(self, idx: int, final: bool, data) -> memoryview:
+        """Innermost layer = first passphrase."""
+        n = len(data); buf = self._load(data, n + TAG*len(self.layers))
+        for layer, prefix in zip(self.layers, self.prefixes):
+            n = layer.seal_into(layer_nonce(prefix, idx, final), self.aad, buf, n)
+        return buf[:n]
+    def open(self, idx: int, final: bool, data) -> memoryview:
+        """Inverse of seal: peel the outermost layer first."""
+        n = len(data); buf = self._load(data, n)
+        for layer, prefix in zip(reversed(self.layers), reversed(self.prefixes)):
+            n = layer.open_into(layer_nonce(prefix, idx, final), self.aad, buf, n)
+        return buf[:n]
+
+def read_exact(src: BinaryIO, n: int) -> bytes:
+    """Read up to n bytes, looping over short reads (pipes); fewer only at EOF."""
+    buf = src.read(n)
+    if buf is None: buf = b''
+    if len(buf) == n or not buf: return buf
+    parts = [buf]; got = len(buf)
+    while got < n:
+        b = src.read(n - got)
+        if not b: break
+        parts.append(b); got += len(b)
+    return b''.join(parts)
+
+def _chunks(src: BinaryIO, size: int):
+    """Yield (index, final, block) with one block of lookahead so the last one is flagged."""
+    cur = read_exact(src, size); idx = 0
+    while True:
+        nxt = read_exact(src, size) if len(cur) == size else b''
+        final = not nxt
+        yield idx, final, cur
+        if final: return
+        cur = nxt; idx += 1
+
+# Parallel mode: chunks are independent, so each worker process seals/opens whole
+# chunks through all layers while the chunk is hot in its cache. The parent keeps at
+# most 2*jobs chunks in flight and writes results back in order.
+_worker_state: Optional[ChunkCodec] = None
+
+def _worker_init(keys: List[bytes], prefixes: List[bytes], aad: bytes, ciphers: List[str]) -> None:
+    global _worker_state
+    _worker_state = ChunkCodec(keys, prefixes, aad, ciphers)
+
+def _worker_seal(idx: int, final: bool, data: bytes) -> bytes:
+    return bytes(_worker_state.seal(idx, final, data))
+
+def _worker_open(idx: int, final: bool, data: bytes) -> bytes:
+    return bytes(_worker_state.open(idx, final, data))
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """-j value to worker count: None/1 = serial, 0 = one per CPU."""
+    if jobs is None: return 1
+    if jobs < 0: raise ValueError("jobs must be >= 0")
+    return jobs or os.cpu_count() or 1
+
+def _run_chunks(chunks: Iterable[Tuple[int, bool, bytes]], dst: BinaryIO, serial: Callable[[int, bool, bytes], memoryview],
+                worker: Callable[[int, bool, bytes], bytes], init: tuple, jobs: int) -> int:
+    """Push chunks through serial() or a pool of `jobs` processes; write results in order."""
+    total = 0
+    if jobs <= 1:
+        for idx, final, block in chunks:
+            out = serial(idx, final, block); dst.write(out); total += len(out)
+        return total
+    from concurrent.futures import ProcessPoolExecutor  # deferred: pulls in multiprocessing
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init, initargs=init) as pool:
+        pending = deque()
+        for idx, final, block in chunks:
+            pending.append(pool.submit(worker, idx, final, bytes(block)))  # mapped slices don't pickle
+            if len(pending) >= 2*jobs:
+                out = pending.popleft().result(); dst.write(out); total += len(out)
+        while pending:
+            out = pending.popleft().result(); dst.write(out); total += len(out)
+    return total
+
+def build_header(passphrases: Union[List[str], Keyring], kdf: Optional[ScryptParams], chunk_size: int,
+                 cipher: Optional[Union[str, List[str]]] = None, compress: Optional[str] = None) -> Tuple[bytes, List[bytes], List[bytes], List[str]]:
+    """Draw salts/prefixes, derive layer keys; return (header bytes, keys, prefixes, ciphers)."""
+    if not len(passphrases): raise ValueError("at least one passphrase is required")
+    if chunk_size <= 0: raise ValueError("chunk size must be positive")
+    layers, keys = as_keyring(passphrases, kdf).new_layers()
+    ciphers = aead.resolve(cipher, len(layers))
+    prefixes = [os.urandom(7) for _ in layers]
+    for layer, prefix, name in zip(layers, prefixes, ciphers): layer.update(cipher=name, prefix=_b64(prefix))
+    meta = {"chunk": chunk_size, "layers": layers, **({"compress": compress} if compress else {})}
+    meta_b = json.dumps(meta, separators=(',',':')).encode()
+    return STREAM_MAGIC + len(meta_b).to_bytes(4,'big') + meta_b, keys, prefixes, ciphers
+
+def read_header(src: BinaryIO) -> Tuple[bytes, bytes, dict]:
+    """Return (magic, full header bytes, meta) for an ONI1 or ONI2 stream."""
+    head = bytes(read_exact(src, _HDR))
+    if len(head) < _HDR: raise ValueError("input too short")
+    magic = head[:4]
+    if magic not in (ONI1_MAGIC, STREAM_MAGIC): raise ValueError("bad magic or unsupported version")
+    mlen = int.from_bytes(head[4:8], 'big')
+    meta_b = bytes(read_exact(src, mlen))
+    if len(meta_b) != mlen: raise ValueError("truncated header")
+    meta = json.loads(meta_b.decode())
+    if magic == ONI1_MAGIC: return magic, head + meta_b, check_meta(meta, (), ("salt", "nonce"))
+    return magic, head + meta_b, check_meta(meta, ("chunk",), ("salt", "prefix"))
+
+def layer_keys(meta: dict, passphrases: Union[List[str], Keyring]) -> Tuple[List[bytes], List[bytes], List[str]]:
+    """(keys, nonce prefixes, cipher names) of an ONI2 header's layers."""
+    layers = meta.get("layers", [])
+    keys = as_keyring(passphrases).open_layers(layers)
+    return keys, [base64.b64decode(l["prefix"]) for l in layers], [aead.layer_cipher(l) for l in layers]
+
+def seal_stream(src: BinaryIO, dst: BinaryIO, passphrases: Union[List[str], Keyring], kdf: Optional[ScryptParams] = None,
+                chunk_size: int = DEFAULT_CHUNK, jobs: int = 1, cipher: Optional[Union[str, List[str]]] = None,
+                compress: Optional[str] = None, level: Optional[int] = None) -> int:
+    """Encrypt src into dst as ONI2 holding a bounded number of chunks in memory.
+
+    jobs > 1 spreads chunks over that many processes; cipher/compress/level as for
+    layers.seal_to (chunks are cut from the compressed stream). Returns plaintext bytes.
+    """
+    if compress: src = CompressReader(src, compress, level)
+    header, keys, prefixes, ciphers = build_header(passphrases, kdf, chunk_size, cipher, compress)
+    codec = ChunkCodec(keys, prefixes, header, ciphers)
+    dst.write(header); total = 0
+    def counted():
+        nonlocal total
+        for idx, final, block in _chunks(src, chunk_size):
+            total += len(block); yield idx, final, block
+    _run_chunks(counted(), dst, codec.seal, _worker_seal, (keys, prefixes, header, ciphers), jobs)
+    return src.consumed if compress else total
+
+def peel_stream(src: BinaryIO, dst: BinaryIO, passphrases: Union[List[str], Keyring], jobs: int = 1) -> int:
+    """Decrypt an ONI2 stream (bounded memory) or an ONI1 blob (in memory) into dst.
+
+    src may be a MappedReader (io.open_input(mapped=True)); ONI1 is then decrypted
+    straight from the mapping.
+    """
+    view = getattr(src, 'view', None)
+    return _peel_body(src, dst, passphrases, jobs, view, *read_header(src))
+
+def _peel_body(src: BinaryIO, dst: BinaryIO, passphrases: Union[List[str], Keyring], jobs: int,
+               view: Optional[memoryview], magic: bytes, header: bytes, meta: dict) -> int:
+    """peel_stream once the header has been read."""
+    if magic == ONI1_MAGIC:
+        return peel_to(dst, view if view is not None else header + src.read(), passphrases)
+    keys, prefixes, ciphers = layer_keys(meta, passphrases)
+    if meta.get("compress"):
+        out = DecompressWriter(dst, meta["compress"])
+        _peel_records(src, out, header, meta, keys, prefixes, ciphers, jobs); out.close()
+        return out.written
+    return _peel_records(src, dst, header, meta, keys, prefixes, ciphers, jobs)
+
+def _peel_records(src: BinaryIO, dst: BinaryIO, header: bytes, meta: dict, keys: List[bytes],
+                  prefixes: List[bytes], ciphers: List[str], jobs: int) -> int:
+    codec = ChunkCodec(keys, prefixes, header, ciphers)
+    record = int(meta["chunk"]) + TAG*len(keys)
+    def checked():
+        for idx, final, block in _chunks(src, record):
+            if len(block) < TAG*len(keys): raise ValueError("truncated or corrupt stream")
+            yield idx, final, block
+    return _run_chunks(checked(), dst, codec.open, _worker_open, (keys, prefixes, header, ciphers), jobs)
+
+# Random access: ONI2 records have a fixed size, so the header's "chunk" field is the
+# chunk index. Plaintext byte x sits in chunk x // chunk, whose record starts at
+# len(header) + idx*(chunk + 16*layers); the file size gives the record count. Only the
+# records covering the range are read (positioned reads) and authenticated, plus the
+# final-flagged last record, which proves the file length wasn't truncated.
+
+def pread_exact(fd: int, n: int, offset: int) -> bytes:
+    """n bytes at offset without moving the file position (fewer only at EOF)."""
+    parts = []; got = 0
+    while got < n:
+        b = os.pread(fd, n - got, offset + got)
+        if not b: break
+        parts.append(b); got += len(b)
+    return b''.join(parts)
+
+class _RangeWriter:
+    """Passes on `left` bytes after dropping the first `skip` bytes written."""
+    def __init__(self, dst: BinaryIO, skip: int, left: int): self.dst = dst; self.skip = skip; self.left = left
+    def write(self, b) -> int:
+        b = memoryview(b); drop = min(self.skip, len(b)); self.skip -= drop
+        out = b[drop:drop + self.left]; self.left -= len(out)
+        if len(out): self.dst.write(out)
+        return len(b)
+
+def parse_range(text: str) -> Tuple[int, Optional[int]]:
+    """"OFFSET:LEN" (LEN empty = to the end) to (offset, length)."""
+    off, sep, ln = text.partition(':')
+    try:
+        offset = int(off); length = int(ln) if ln else None
+    except ValueError: raise ValueError(f"bad range {text!r}: expected OFFSET:LEN") from None
+    if not sep or offset < 0 or (length is not None and length < 0): raise ValueError(f"bad range {text!r}: expected OFFSET:LEN")
+    return offset, length
+
+def plaintext_size(meta: dict, header_len: int, file_size: int) -> Tuple[int, int, int]:
+    """(plaintext bytes, record count, last record length) of an ONI2 file of file_size bytes."""
+    chunk = int(meta["chunk"]); over = TAG*len(meta.get("layers", []))
+    body = file_size - header_len
+    count = max(1, -(-body // (chunk + over)))
+    last_len = body - (count - 1)*(chunk + over)
+    if last_len < over: raise ValueError("truncated or corrupt stream")
+    return (count - 1)*chunk + last_len - over, count, last_len
+
+def peel_range(src: BinaryIO, dst: BinaryIO, passphrases: Union[List[str], Keyring], offset: int,
+               length: Optional[int] = None, jobs: int = 1) -> int:
+    """Decrypt plaintext bytes [offset, offset+length) of a seekable ONI2 file into dst.
+
+    src must be a real file (it is read with os.pread). Returns the bytes written, fewer
+    than length if the range runs past the end.
+    """
+    magic, header, meta = read_header(src)
+    if magic != STREAM_MAGIC: raise ValueError("--range needs an ONI2 file (written with -s)")
+    if meta.get("compress"): raise ValueError("--range is not possible on compressed files")
+    fd = src.fileno()
+    size, count, last_len = plaintext_size(meta, len(header), os.fstat(fd).st_size)
+    keys, prefixes, ciphers = layer_keys(meta, passphrases)
+    codec = ChunkCodec(keys, prefixes, header, ciphers)
+    chunk = int(meta["chunk"]); rec = chunk + TAG*len(keys)
+    def record(i: int) -> bytes:
+        return pread_exact(fd, last_len if i == count - 1 else rec, len(header) + i*rec)
+    end = size if length is None else min(size, offset + length)
+    first, last = offset // chunk, (end - 1) // chunk
+    if last < count - 1 or end <= offset:
+        codec.open(count - 1, True, record(count - 1))  # authenticates the file length
+    if end <= offset: return 0
+    chunks = ((i, i == count - 1, record(i)) for i in range(first, last + 1))
+    out = _RangeWriter(dst, offset - first*chunk, end - offset)
+    _run_chunks(chunks, out, codec.open, _worker_open, (keys, prefixes, header, ciphers), jobs)
+    return end - offset
+
+def rekey_stream(src: BinaryIO, dst: BinaryIO, passphrases: List[str], new_passphrases: List[str],
+                 kdf: Optional[ScryptParams] = None, chunk_size: int = DEFAULT_CHUNK, jobs: int = 1,
+                 cipher: Optional[Union[str, List[str]]] = None, compress: Optional[str] = None, level: Optional[int] = None) -> int:
+    """Re-encrypt ONI1/ONI2 src as ONI2 under new keys; plaintext only crosses an in-memory pipe.
+
+    The source's compression is kept unless compress names another one.
+    """
+    view = getattr(src, 'view', None)
+    magic, header, meta = read_header(src)
+    if not compress: compress = meta.get("compress")
+    r, w = os.pipe(); err: List[BaseException] = []
+    def producer():
+        try:
+            with open(w, 'wb') as wf: _peel_body(src, wf, passphrases, jobs, view, magic, header, meta)
+        except BaseException as e: err.append(e)
+    t = threading.Thread(target=producer, daemon=True); t.start()
+    try:
+        with open(r, 'rb') as rf: total = seal_stream(rf, dst, new_passphrases, kdf, chunk_size, jobs, cipher, compress, level)
+    finally:
+        t.join()
+    if err: raise err[0]
+    return total
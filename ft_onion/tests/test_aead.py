@@ -0,0 +1,57 @@
+import io, json
+import pytest
+from src.ft_onion import aead
+from src.ft_onion.layers import seal, peel
+from src.ft_onion.kdf import ScryptParams
+from src.ft_onion.stream import seal_stream, peel_stream, read_header
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
+CIPHERS = aead.available()
+
+@pytest.mark.parametrize('cipher', CIPHERS)
+def test_cipher_roundtrip_both_formats(cipher):
+    pt = bytes(range(256)) * 9
+    blob = seal(pt, ['a', 'b'], FAST, cipher)
+    assert [l['cipher'] for l in json.loads(blob[8:8+int.from_bytes(blob[4:8], 'big')])['layers']] == [cipher]*2
+    assert peel(blob, ['a', 'b']) == pt
+    out = io.BytesIO(); seal_stream(io.BytesIO(pt), out, ['a', 'b'], FAST, 100, cipher=cipher)
+    dec = io.BytesIO(); peel_stream(io.BytesIO(out.getvalue()), dec, ['a', 'b'])
+    assert dec.getvalue() == pt
+
+def test_mixed_ciphers_per_layer():
+    names = (CIPHERS * 3)[:3]
+    out = io.BytesIO(); seal_stream(io.BytesIO(b'mix'), out, ['a', 'b', 'c'], FAST, cipher=names)
+    out.seek(0)
+    assert [l['cipher'] for l in read_header(out)[2]['layers']] == names
+    dec = io.BytesIO(); peel_stream(io.BytesIO(out.getvalue()), dec, ['a', 'b', 'c'])
+    assert dec.getvalue() == b'mix'
+
+def test_resolve_rejects_bad_specs():
+    with pytest.raises(ValueError): aead.resolve('rot13', 1)
+    with pytest.raises(ValueError): aead.resolve(['aes-256-gcm']*2, 3)
+
+def test_auto_benchmark_is_cached(tmp_path, monkeypatch):
+    path = str(tmp_path / 'aead.json')
+    runs = []
+    monkeypatch.setattr(aead, 'benchmark', lambda: runs.append(1) or {'aes-256-gcm': 1.0, 'chacha20-poly1305': 2.0})
+    assert aead.fastest(path) == 'chacha20-poly1305'
+    assert aead.fastest(path) == 'chacha20-poly1305' and len(runs) == 1
+    aead.fastest(path, refresh=True)
+    assert len(runs) == 2
+
+def test_benchmark_cache_is_per_cpu_and_openssl(tmp_path, monkeypatch):
+    path = str(tmp_path / 'aead.json')
+    runs = []
+    monkeypatch.setattr(aead, 'benchmark', lambda: runs.append(1) or {'aes-256-gcm': 2.0, 'chacha20-poly1305': 1.0})
+    aead.fastest(path)
+    monkeypatch.setattr(aead, '_cpu_flags', lambda: 'avx2')  # e.g. the same image moved to a host without AES-NI
+    aead.fastest(path)
+    monkeypatch.setattr(aead, '_openssl_version', lambda: 'OpenSSL 0.0.0')
+    aead.fastest(path); aead.fastest(path)
+    assert len(runs) == 3
+
+def test_cli_help_constants_match_the_registry():
+    import ft_onion
+    from src.ft_onion.stream import DEFAULT_CHUNK
+    assert list(ft_onion.CIPHER_NAMES) == list(aead.CIPHERS) and ft_onion.DEFAULT_CIPHER == aead.DEFAULT
+    assert ft_onion.DEFAULT_CHUNK == DEFAULT_CHUNK
@@ -0,0 +1,40 @@
+import io, json
+from src.ft_onion.batch import run_batch, MANIFEST
+from src.ft_onion.kdf import Keyring, ScryptParams
+from src.ft_onion.stream import peel_stream
+from src.ft_onion import kdf
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
+
+def _tree(root):
+    (root / 'sub').mkdir(parents=True)
+    files = {'a.txt': b'alpha', 'empty': b'', 'sub/b.bin': bytes(range(256))*40}
+    for rel, data in files.items(): (root / rel).write_bytes(data)
+    return files
+
+def test_batch_roundtrip_one_kdf_per_layer(tmp_path, monkeypatch):
+    files = _tree(tmp_path / 'src')
+    calls = []
+    real = kdf.derive_many
+    monkeypatch.setattr(kdf, 'derive_many', lambda jobs, *a, **k: calls.append(len(jobs)) or real(jobs, *a, **k))
+    for stream in (False, True):
+        calls.clear()
+        entries, summary = run_batch(str(tmp_path / 'src'), str(tmp_path / 'enc'), Keyring(['a', 'b'], FAST, batch=True), stream=stream)
+        assert calls == [2] and summary['errors'] == 0 and len(entries) == 3
+        calls.clear()
+        run_batch(str(tmp_path / 'enc'), str(tmp_path / 'dec'), Keyring(['a', 'b'], batch=True), decrypt=True)
+        assert calls == [2]
+        for rel, data in files.items(): assert (tmp_path / 'dec' / rel).read_bytes() == data
+        out = io.BytesIO()  # each file still opens on its own with the passphrases
+        peel_stream(io.BytesIO((tmp_path / 'enc' / 'a.txt.oni').read_bytes()), out, ['a', 'b'])
+        assert out.getvalue() == b'alpha'
+
+def test_batch_manifest_reports_failures(tmp_path):
+    _tree(tmp_path / 'src')
+    run_batch(str(tmp_path / 'src'), str(tmp_path / 'enc'), Keyring(['a'], FAST, batch=True))
+    (tmp_path / 'enc' / 'junk.oni').write_bytes(b'nope')
+    entries, summary = run_batch(str(tmp_path / 'enc'), str(tmp_path / 'dec'), Keyring(['a'], batch=True), decrypt=True)
+    manifest = json.loads((tmp_path / 'dec' / MANIFEST).read_bytes())
+    assert summary['errors'] == 1 == manifest['errors']
+    bad = [e for e in manifest['entries'] if e['status'] != 'ok']
+    assert [e['path'] for e in bad] == ['junk.oni'] and not (tmp_path / 'dec' / 'junk').exists()
@@ -0,0 +1,74 @@
+import io, json, zlib
+import pytest
+from cryptography.exceptions import InvalidTag
+from src.ft_onion import compress
+from src.ft_onion.compress import CompressReader, DecompressWriter, OUT_BLOCK
+from src.ft_onion.layers import seal, peel, read_meta
+from src.ft_onion.kdf import ScryptParams
+from src.ft_onion.stream import seal_stream, peel_stream, rekey_stream, read_header
+import ft_onion
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
+CODECS = list(compress.CODECS)
+TEXT = b'2026-10-19 INFO served /index.html 200\n' * 3000
+
+@pytest.mark.parametrize('algo', CODECS)
+def test_compressed_roundtrip_both_formats(algo):
+    blob = seal(TEXT, ['a', 'b'], FAST, compress=algo)
+    assert len(blob) < len(TEXT) // 10
+    assert peel(blob, ['a', 'b']) == TEXT
+    out = io.BytesIO()
+    assert seal_stream(io.BytesIO(TEXT), out, ['a', 'b'], FAST, 512, compress=algo, level=1) == len(TEXT)
+    out.seek(0)
+    assert read_header(out)[2]['compress'] == algo
+    dec = io.BytesIO()
+    assert peel_stream(io.BytesIO(out.getvalue()), dec, ['a', 'b']) == len(TEXT)
+    assert dec.getvalue() == TEXT
+
+def test_decompression_is_bounded_and_checks_the_end():
+    bomb = zlib.compress(bytes(8 * OUT_BLOCK))
+    sizes = []
+    class Sink:
+        def write(self, b): sizes.append(len(b))
+    w = DecompressWriter(Sink(), 'zlib'); w.write(bomb); w.close()
+    assert max(sizes) <= OUT_BLOCK and sum(sizes) == 8 * OUT_BLOCK
+    w = DecompressWriter(io.BytesIO(), 'zlib'); w.write(bomb[:-5])
+    with pytest.raises(ValueError): w.close()
+
+@pytest.mark.skipif('zstd' not in compress.CODECS, reason='zstandard not installed')
+def test_zstd_decompression_is_bounded():
+    bomb = compress.compress_all(bytes(8 * OUT_BLOCK), 'zstd')
+    sizes = []
+    class Sink:
+        def write(self, b): sizes.append(len(b))
+    w = DecompressWriter(Sink(), 'zstd'); w.write(bomb); w.close()
+    assert max(sizes) <= OUT_BLOCK and sum(sizes) == 8 * OUT_BLOCK == w.written
+
+def test_oni1_compress_field_is_authenticated():
+    blob = seal(TEXT, ['a', 'b'], FAST, compress='zlib')
+    mlen = int.from_bytes(blob[4:8], 'big'); meta = json.loads(blob[8:8 + mlen])
+    for forged_meta in ({k: v for k, v in meta.items() if k != 'compress'}, {**meta, 'compress': 'lzma'}):
+        mb = json.dumps(forged_meta).encode()
+        with pytest.raises(InvalidTag): peel(blob[:4] + len(mb).to_bytes(4, 'big') + mb + blob[8 + mlen:], ['a', 'b'])
+
+@pytest.mark.parametrize('algo', CODECS)
+def test_rekey_keeps_compression_unless_overridden(algo, tmp_path):
+    src = io.BytesIO(); seal_stream(io.BytesIO(TEXT), src, ['a'], FAST, 512, compress=algo)
+    for override, want in ((None, algo), ('zlib', 'zlib')):
+        out = io.BytesIO(); rekey_stream(io.BytesIO(src.getvalue()), out, ['a'], ['b'], FAST, 512, compress=override)
+        assert read_header(io.BytesIO(out.getvalue()))[2]['compress'] == want
+        dec = io.BytesIO(); peel_stream(io.BytesIO(out.getvalue()), dec, ['b'])
+        assert dec.getvalue() == TEXT
+    old, new = tmp_path / 'old.oni', tmp_path / 'new.oni'
+    old.write_bytes(seal(TEXT, ['a'], FAST, compress=algo))
+    assert ft_onion.main(['-r', '-k', 'a', '-n', 'b', '-i', str(old), '-o', str(new), '--kdf-ms', '1']) == 0
+    assert read_meta(new.read_bytes())['compress'] == algo and peel(new.read_bytes(), ['b']) == TEXT
+
+def test_compress_reader_counts_plaintext():
+    r = CompressReader(io.BytesIO(TEXT), 'zlib')
+    data = b''.join(iter(lambda: r.read(100), b''))
+    assert zlib.decompress(data) == TEXT and r.consumed == len(TEXT)
+
+def test_bad_compression_options():
+    with pytest.raises(ValueError): seal(b'x', ['a'], FAST, compress='brotli')
+    with pytest.raises(ValueError): seal(b'x', ['a'], FAST, compress='zlib', level=42)
@@ -0,0 +1,103 @@
+import asyncio, importlib.util, io, os, sys, time
+import pytest
+
+# docker/entrypoint.py is a script, not a package module: load it by path.
+_spec = importlib.util.spec_from_file_location('entrypoint', os.path.join(os.path.dirname(__file__), '..', 'docker', 'entrypoint.py'))
+ep = sys.modules["entrypoint"] = importlib.util.module_from_spec(_spec); _spec.loader.exec_module(ep)
+
+def _stub(code):
+    return [sys.executable, '-c', code]
+
+def _run(sup, timeout=20):
+    return asyncio.run(asyncio.wait_for(sup.run(), timeout))
+
+def test_chatty_child_is_drained_and_rate_limited():
+    # 20 000 lines (~1 MB) would fill a pipe nobody reads and block the child forever
+    out = io.StringIO()
+    svc = ep.Service('chatty', _stub("import sys\nfor i in range(20000): sys.stdout.write('x'*50 + '\\n')"), restart=False)
+    assert _run(ep.Supervisor([svc], ep.Logger(out))) == 0
+    lines = out.getvalue().splitlines()
+    assert sum(l.startswith('[chatty] xxx') for l in lines) <= ep.LINE_BURST + ep.LINE_RATE * 20
+    assert any('exited with status 0' in l for l in lines)
+    assert any('log line(s) suppressed' in l for l in lines)
+
+def test_crashing_child_restarts_with_backoff():
+    out = io.StringIO()
+    sup = ep.Supervisor([ep.Service('crash', _stub('import sys; print("up"); sys.exit(3)'))], ep.Logger(out),
+                        backoff_min=0.05, backoff_max=0.2, stable_after=60)
+    async def scenario():
+        task = asyncio.ensure_future(sup.run())
+        while sup.children[0].starts < 4: await asyncio.sleep(0.02)
+        sup.stop(); return await task
+    asyncio.run(asyncio.wait_for(scenario(), 20))
+    text = out.getvalue()
+    assert text.count('exited with status 3') >= 3
+    assert 'restarting in 0.1s' in text and 'restarting in 0.2s' in text  # doubled, capped
+
+def test_stop_terminates_children_gracefully():
+    out = io.StringIO()
+    sup = ep.Supervisor([ep.Service('sleeper', _stub('import time; print("ready", flush=True); time.sleep(60)'))], ep.Logger(out), stop_grace=5)
+    async def scenario():
+        task = asyncio.ensure_future(sup.run())
+        while '[sleeper] ready' not in out.getvalue(): await asyncio.sleep(0.02)
+        t = time.monotonic(); sup.stop(); await task
+        return time.monotonic() - t
+    assert asyncio.run(asyncio.wait_for(scenario(), 20)) < 5
+    assert 'shutting down' in out.getvalue() and 'restarting' not in out.getvalue()
+
+def test_stop_racing_the_spawn_still_escalates_to_kill(tmp_path, monkeypatch):
+    # the child ignores SIGTERM; stop() lands while create_subprocess_exec is in flight
+    out = io.StringIO(); armed = tmp_path / 'armed'
+    child = ep.Child(ep.Service('stubborn', _stub(f'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); '
+                                                  f'open({str(armed)!r}, "w").close(); time.sleep(60)')), ep.Logger(out), stop_grace=0.3)
+    spawn = asyncio.create_subprocess_exec
+    async def racing_spawn(*a, **kw):
+        proc = await spawn(*a, **kw)
+        while not armed.exists(): await asyncio.sleep(0.01)
+        await child.stop()  # self.proc is still None here
+        return proc
+    monkeypatch.setattr(asyncio, 'create_subprocess_exec', racing_spawn)
+    t = time.monotonic()
+    asyncio.run(asyncio.wait_for(child.run(), 20))
+    assert time.monotonic() - t < 10
+    assert 'killing' in out.getvalue() and 'exited with status -9' in out.getvalue()
+
+def test_exit_is_seen_while_a_grandchild_holds_stdout(tmp_path):
+    out = io.StringIO(); pid_file = tmp_path / 'grandchild.pid'
+    code = (f'import subprocess, sys\n'
+            f'g = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])\n'
+            f'open({str(pid_file)!r}, "w").write(str(g.pid)); print("bye")')
+    t = time.monotonic()
+    try:
+        assert _run(ep.Supervisor([ep.Service('parent', _stub(code), restart=False)], ep.Logger(out))) == 0
+        assert time.monotonic() - t < 10
+    finally:
+        if pid_file.exists(): os.kill(int(pid_file.read_text()), 9)
+    text = out.getvalue()
+    assert '[parent] bye' in text and 'exited with status 0' in text and 'held by a descendant' in text
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_wait_for_file(tmp_path, use_inotify):
+    path = str(tmp_path / 'hostname')
+    async def scenario():
+        waiter = asyncio.ensure_future(ep.wait_for_file(path, timeout=10, use_inotify=use_inotify))
+        await asyncio.sleep(0.1)
+        open(path, 'w').close()                 # empty file: not ready yet
+        await asyncio.sleep(0.1); assert not waiter.done()
+        with open(path, 'w') as f: f.write('abc.onion\n')
+        return await waiter
+    assert asyncio.run(scenario())
+    assert not asyncio.run(ep.wait_for_file(str(tmp_path / 'never'), timeout=0.2, use_inotify=use_inotify))
+
+def test_ready_file_announced(tmp_path):
+    seen = []
+    hostname = tmp_path / 'hostname'
+    svc = ep.Service('tor', _stub(f"import time; time.sleep(0.2); open({str(hostname)!r}, 'w').write('xyz.onion\\n')"),
+                     restart=False, ready_file=str(hostname), on_ready=seen.append)
+    sup = ep.Supervisor([svc], ep.Logger(io.StringIO()))
+    async def scenario():
+        task = asyncio.ensure_future(sup.run())
+        while not seen: await asyncio.sleep(0.02)
+        sup.stop(); await task
+    asyncio.run(asyncio.wait_for(scenario(), 20))
+    assert seen == ['xyz.onion']
@@ -1,7 +1,59 @@
-from src.ft_onion.layers import seal, peel
+import json
+import pytest
+from src.ft_onion.layers import seal, peel, MAGIC
+from src.ft_onion.kdf import ScryptParams, calibrate
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
 
 def test_roundtrip():
     pt = b'hello onion'
     blob = seal(pt, ['a','b','c'])
     out = peel(blob, ['a','b','c'])
     assert out == pt
+
+def _meta(blob):
+    mlen = int.from_bytes(blob[4:8], 'big')
+    return json.loads(blob[8:8+mlen])
+
+def test_kdf_params_recorded_per_layer():
+    blob = seal(b'x', ['a','b'], FAST)
+    assert [(l['n'], l['r'], l['p']) for l in _meta(blob)['layers']] == [(2**10, 8, 1)]*2
+    assert peel(blob, ['a','b']) == b'x'
+
+def test_peel_header_without_kdf_params():
+    blob = seal(b'legacy', ['a'])
+    meta = _meta(blob)
+    for l in meta['layers']:
+        del l['n'], l['r'], l['p']
+    mb = json.dumps(meta).encode()
+    mlen = int.from_bytes(blob[4:8], 'big')
+    legacy = MAGIC + len(mb).to_bytes(4, 'big') + mb + blob[8+mlen:]
+    assert peel(legacy, ['a']) == b'legacy'
+
+def test_calibrate_respects_memory_ceiling():
+    params = calibrate(target_ms=50, max_mem_mb=4)
+    assert params.memory_bytes <= 4 * 1024 * 1024 and params.p >= 1
+
+@pytest.mark.parametrize('max_mem_mb', [1, 0.5])
+def test_calibrate_lowers_r_under_a_tiny_ceiling(max_mem_mb):
+    params = calibrate(target_ms=2000, max_mem_mb=max_mem_mb)
+    assert 128 * params.n * params.r <= max_mem_mb * 2**20 and 1 <= params.p <= 16
+    with pytest.raises(ValueError):
+        calibrate(target_ms=50, max_mem_mb=0.25)
+
+def test_derive_many_matches_serial():
+    from src.ft_onion.kdf import derive, derive_many
+    jobs = [(pw, bytes([i])*16, FAST) for i, pw in enumerate('abc')]
+    assert derive_many(jobs, workers=3) == [derive(*j) for j in jobs]
+    assert derive_many(jobs, workers=3, mem_budget=FAST.memory_bytes) == [derive(*j) for j in jobs]
+
+def test_inplace_gcm_matches_aesgcm():
+    import os
+    from cryptography.hazmat.primitives.ciphers import algorithms
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from src.ft_onion.aead import gcm_seal_into, gcm_open_into, TAG
+    key, nonce, pt = os.urandom(32), os.urandom(12), os.urandom(1000)
+    buf = memoryview(bytearray(len(pt) + TAG)); buf[:len(pt)] = pt
+    n = gcm_seal_into(algorithms.AES(key), nonce, MAGIC, buf, len(pt))
+    assert bytes(buf[:n]) == AESGCM(key).encrypt(nonce, pt, MAGIC)
+    assert bytes(buf[:gcm_open_into(algorithms.AES(key), nonce, MAGIC, buf, n)]) == pt
@@ -0,0 +1,83 @@
+import io, random
+import pytest
+from cryptography.exceptions import InvalidTag
+from src.ft_onion.layers import seal, peel
+from src.ft_onion.kdf import ScryptParams
+from src.ft_onion.stream import seal_stream, peel_stream
+
+# Seeded random round trips over sizes, layer counts, chunk sizes, compression and both
+# formats, plus the failure cases every optimisation must preserve: tampering, truncation
+# and wrong passphrases are always rejected with InvalidTag or ValueError.
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
+SEEDS = range(12)
+CHEAP = ScryptParams(n=2**4, r=1, p=1)  # for tests that run scrypt once per bit flip
+REJECTED = (InvalidTag, ValueError)
+
+def _case(seed):
+    rnd = random.Random(seed)
+    size = rnd.choice([0, 1, rnd.randrange(2, 64), rnd.randrange(64, 5000)])
+    pws = [f'pw{seed}-{i}' for i in range(rnd.randint(1, 4))]
+    case = rnd, rnd.randbytes(size), pws, rnd.choice([1, 7, 64, 1000]), rnd.choice(['oni1', 'oni2'])
+    return case + (rnd.choice([None, 'zlib']),)
+
+def _seal(fmt, pt, pws, chunk, compress=None, kdf=FAST):
+    if fmt == 'oni1': return seal(pt, pws, kdf, compress=compress)
+    out = io.BytesIO(); seal_stream(io.BytesIO(pt), out, pws, kdf, chunk, compress=compress)
+    return out.getvalue()
+
+def _peel(blob, pws, jobs=1):
+    out = io.BytesIO(); peel_stream(io.BytesIO(blob), out, pws, jobs)
+    return out.getvalue()
+
+def _body_start(blob):
+    return 8 + int.from_bytes(blob[4:8], 'big')
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_fuzz_roundtrip(seed):
+    _, pt, pws, chunk, fmt, algo = _case(seed)
+    blob = _seal(fmt, pt, pws, chunk, algo)
+    assert _peel(blob, pws) == pt
+    if fmt == 'oni1': assert peel(blob, pws) == pt
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_fuzz_tamper_rejected(seed):
+    rnd, pt, pws, chunk, fmt, algo = _case(seed)
+    blob = _seal(fmt, pt, pws, chunk, algo)
+    for pos in (rnd.randrange(_body_start(blob)), rnd.randrange(_body_start(blob), len(blob))):
+        bad = bytearray(blob); bad[pos] ^= 1 << rnd.randrange(8)
+        if fmt == 'oni1' and 8 <= pos < _body_start(blob):
+            # ONI1 authenticates what its header means, not its bytes: a flip may only be
+            # harmless (a renamed key falling back to the same default, base64 padding)
+            try: assert _peel(bytes(bad), pws) == pt
+            except REJECTED: pass
+            continue
+        with pytest.raises(REJECTED):
+            _peel(bytes(bad), pws)
+
+def test_every_header_bit_flip_is_rejected_or_harmless():
+    for fmt in ('oni1', 'oni2'):
+        blob = _seal(fmt, b'onion' * 20, ['a', 'b'], 32, 'zlib', CHEAP)
+        for pos in range(_body_start(blob)):
+            for bit in range(8):
+                bad = bytearray(blob); bad[pos] ^= 1 << bit
+                try: out = _peel(bytes(bad), ['a', 'b'])
+                except REJECTED: continue
+                assert fmt == 'oni1' and out == b'onion' * 20, (fmt, pos, bit)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_fuzz_truncation_rejected(seed):
+    rnd, pt, pws, chunk, fmt, algo = _case(seed)
+    blob = _seal(fmt, pt, pws, chunk, algo)
+    with pytest.raises(REJECTED):
+        _peel(blob[:rnd.randrange(len(blob))], pws)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_fuzz_wrong_passphrase_rejected(seed):
+    rnd, pt, pws, chunk, fmt, algo = _case(seed)
+    blob = _seal(fmt, pt, pws, chunk, algo)
+    wrong = list(pws); wrong[rnd.randrange(len(wrong))] += 'x'
+    with pytest.raises(InvalidTag):
+        _peel(blob, wrong)
+    with pytest.raises(ValueError):
+        _peel(blob, pws + ['extra'])
@@ -0,0 +1,89 @@
+import asyncio, gzip, importlib.util, os, sys
+import pytest
+
+# docker/loadtest.py is a script, not a package module: load it by path.
+_spec = importlib.util.spec_from_file_location('loadtest', os.path.join(os.path.dirname(__file__), '..', 'docker', 'loadtest.py'))
+lt = sys.modules["loadtest"] = importlib.util.module_from_spec(_spec); _spec.loader.exec_module(lt)
+
+PAGE = b'<html>' + b'onion ' * 500 + b'</html>'
+
+async def _serve(reader, writer, conns):
+    # tiny nginx stand-in: / (gzip on request), /chunked, /healthz, anything else 404
+    conns.append(1)
+    try:
+        while True:
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').lower()
+            path = head.split(' ', 2)[1]
+            extra = b''
+            if path == '/healthz':
+                status, body = b'200 OK', b'ok'
+            elif path == '/':
+                status, body = b'200 OK', PAGE
+                if 'accept-encoding: gzip' in head: body = gzip.compress(PAGE); extra = b'Content-Encoding: gzip\r\n'
+            elif path == '/chunked':
+                writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n')
+                await writer.drain(); continue
+            else:
+                status, body = b'404 Not Found', b'nope'
+            close = 'connection: close' in head
+            writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: %d\r\n' % len(body) + extra +
+                         (b'Connection: close\r\n' if close else b'') + b'\r\n' + body)
+            await writer.drain()
+            if close: break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+def _run(**kw):
+    async def scenario():
+        conns = []
+        server = await asyncio.start_server(lambda r, w: _serve(r, w, conns), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            report = await lt.load_test(f'http://127.0.0.1:{port}/', **kw)
+        return report, len(conns)
+    return asyncio.run(asyncio.wait_for(scenario(), 30))
+
+def test_keepalive_reuses_connections():
+    report, conns = _run(paths=['/', '/healthz'], total=200, concurrency=4)
+    t = report['total']
+    assert t['requests'] == 200 and t['errors'] == 0 and t['status'] == {'200': 200}
+    assert conns == report['connections'] == 4
+    assert report['paths']['/healthz']['body_bytes_per_req'] == 2
+    assert report['paths']['/']['body_bytes_per_req'] == len(PAGE)
+    assert t['wire_bytes_per_req'] > t['body_bytes_per_req']
+    assert t['p50_ms'] <= t['p90_ms'] <= t['p99_ms'] <= t['max_ms']
+
+def test_no_keepalive_opens_one_connection_per_request():
+    report, conns = _run(total=30, concurrency=3, keepalive=False)
+    assert report['total']['errors'] == 0 and conns == report['connections'] == 30
+
+def test_gzip_shrinks_bytes_per_request():
+    plain, _ = _run(total=20, concurrency=2)
+    packed, _ = _run(total=20, concurrency=2, gzip=True)
+    assert packed['total']['gzip_responses'] == 20 and plain['total']['gzip_responses'] == 0
+    assert packed['total']['body_bytes_per_req'] < plain['total']['body_bytes_per_req'] / 10
+
+def test_chunked_and_status_counts():
+    report, _ = _run(paths=['/chunked', '/missing'], total=10, concurrency=1)
+    assert report['paths']['/chunked']['body_bytes_per_req'] == 11
+    assert report['total']['status'] == {'200': 5, '404': 5}
+    assert report['connections'] == 1
+
+def test_connection_errors_are_counted():
+    async def scenario():
+        server = await asyncio.start_server(lambda r, w: None, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close(); await server.wait_closed()
+        return await lt.load_test(f'http://127.0.0.1:{port}/', total=5, concurrency=1, timeout=2)
+    report = asyncio.run(scenario())
+    assert report['total']['errors'] == 5 and report['total']['requests'] == 0
+    assert lt.main(['--url', 'ftp://x/']) == 2
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert lt.percentile(values, 50) == 50 and lt.percentile(values, 99) == 99 and lt.percentile(values, 100) == 100
+    assert lt.percentile([], 50) == 0.0
+    with pytest.raises(ValueError):
+        asyncio.run(lt.load_test(total=0))
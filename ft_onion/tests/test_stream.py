@@ -0,0 +1,116 @@
+import io, os
+import pytest
+from cryptography.exceptions import InvalidTag
+from src.ft_onion.layers import seal
+from src.ft_onion.kdf import ScryptParams
+from src.ft_onion.stream import seal_stream, peel_stream, rekey_stream, read_header, TAG
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
+PWS = ['a', 'b', 'c']
+
+def _seal(pt, chunk=64, pws=PWS):
+    out = io.BytesIO()
+    seal_stream(io.BytesIO(pt), out, pws, FAST, chunk)
+    return out.getvalue()
+
+def _peel(blob, pws=PWS):
+    out = io.BytesIO()
+    peel_stream(io.BytesIO(blob), out, pws)
+    return out.getvalue()
+
+@pytest.mark.parametrize('size', [0, 1, 63, 64, 65, 128, 1000])
+def test_stream_roundtrip(size):
+    pt = os.urandom(size)
+    assert _peel(_seal(pt)) == pt
+
+def test_record_sizes():
+    blob = _seal(b'x'*130)
+    _, header, _ = read_header(io.BytesIO(blob))
+    assert len(blob) == len(header) + 130 + 3*3*TAG
+
+def test_tampered_record_rejected():
+    blob = bytearray(_seal(b'y'*200))
+    blob[-1] ^= 1
+    with pytest.raises(InvalidTag):
+        _peel(bytes(blob))
+
+def test_truncated_stream_rejected():
+    blob = _seal(b'z'*256)  # four full records + empty final record
+    with pytest.raises(InvalidTag):
+        _peel(blob[:-3*TAG])
+
+def test_reordered_records_rejected():
+    blob = _seal(os.urandom(200))
+    _, header, _ = read_header(io.BytesIO(blob))
+    rec = 64 + 3*TAG
+    body = blob[len(header):]
+    swapped = body[rec:2*rec] + body[:rec] + body[2*rec:]
+    with pytest.raises(InvalidTag):
+        _peel(header + swapped)
+
+def test_wrong_passphrase_rejected():
+    with pytest.raises(InvalidTag):
+        _peel(_seal(b'secret'), ['a', 'b', 'x'])
+
+def test_oni1_still_readable():
+    assert _peel(seal(b'legacy', ['a', 'b'], FAST), ['a', 'b']) == b'legacy'
+
+def test_rekey_stream():
+    out = io.BytesIO()
+    rekey_stream(io.BytesIO(_seal(b'q'*300)), out, PWS, ['n1'], FAST, 32)
+    assert _peel(out.getvalue(), ['n1']) == b'q'*300
+
+def test_parallel_matches_serial_format():
+    pt = os.urandom(1000)
+    out = io.BytesIO()
+    seal_stream(io.BytesIO(pt), out, PWS, FAST, 64, jobs=2)
+    blob = out.getvalue()
+    assert _peel(blob) == pt
+    back = io.BytesIO()
+    peel_stream(io.BytesIO(blob), back, PWS, jobs=2)
+    assert back.getvalue() == pt
+
+def test_peel_from_mapped_file(tmp_path):
+    from src.ft_onion.io import open_input
+    for name, blob in (('v1', seal(b'm'*5000, PWS, FAST)), ('v2', _seal(b'm'*5000))):
+        (tmp_path / name).write_bytes(blob)
+        out = io.BytesIO()
+        with open_input(str(tmp_path / name), mapped=True) as src:
+            peel_stream(src, out, PWS)
+        assert out.getvalue() == b'm'*5000
+
+def test_peel_range_matches_slices(tmp_path):
+    from src.ft_onion.stream import peel_range
+    pt = os.urandom(1000)
+    path = tmp_path / 'r.oni'; path.write_bytes(_seal(pt))
+    for offset, length in [(0, 1000), (0, 1), (63, 2), (64, 64), (100, 333), (990, 50), (999, None), (1000, 5), (5000, 1)]:
+        out = io.BytesIO()
+        with open(path, 'rb') as f: n = peel_range(f, out, PWS, offset, length)
+        want = pt[offset:None if length is None else offset + length]
+        assert out.getvalue() == want and n == len(want)
+
+def test_peel_range_detects_truncation_and_tamper(tmp_path):
+    from src.ft_onion.stream import peel_range
+    blob = _seal(os.urandom(1000))
+    (tmp_path / 'cut.oni').write_bytes(blob[:-(64 + 3*TAG) - 10])
+    with open(tmp_path / 'cut.oni', 'rb') as f, pytest.raises(InvalidTag):
+        peel_range(f, io.BytesIO(), PWS, 0, 10)
+    bad = bytearray(blob); bad[-1] ^= 1
+    (tmp_path / 'bad.oni').write_bytes(bytes(bad))
+    with open(tmp_path / 'bad.oni', 'rb') as f, pytest.raises(InvalidTag):
+        peel_range(f, io.BytesIO(), PWS, 0, 10)
+
+def test_cli_rekey_detects_the_input_format(tmp_path):
+    import ft_onion
+    for blob, magic in ((_seal(b'q'*300), b'ONI2'), (seal(b'q'*300, PWS, FAST), b'ONI1')):
+        (tmp_path / 'in').write_bytes(blob)
+        assert ft_onion.main(['-r', '-k', ','.join(PWS), '-n', 'n1', '-i', str(tmp_path / 'in'), '-o', str(tmp_path / 'out'), '--kdf-ms', '1']) == 0
+        out = (tmp_path / 'out').read_bytes()
+        assert out[:4] == magic and _peel(out, ['n1']) == b'q'*300
+
+@pytest.mark.parametrize('stream', [True, False])
+def test_cli_wrong_passphrase_is_reported(tmp_path, capsys, stream):
+    import ft_onion
+    (tmp_path / 'in').write_bytes(_seal(b'q'*300) if stream else seal(b'q'*300, PWS, FAST))
+    assert ft_onion.main(['-d', '-k', 'wrong,pw,s', '-i', str(tmp_path / 'in'), '-o', str(tmp_path / 'out')]) == 1
+    assert capsys.readouterr().err == 'ft_onion: error: authentication failed (wrong passphrase or corrupt input)\n'
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""ft_otp micro-benchmarks: HOTP/TOTP codes per second, key file decryption and hex key parsing.
+
+Usage:
+    ./bench_otp.py                          # JSON report on stdout
+    ./bench_otp.py -o bench.json --kdf-n 16384 --hex-sizes 64,1M,16M
+
+Every case is timed as the best of --repeat runs of a loop that lasts at least --min-time
+seconds. decrypt_key is split into its scrypt part (_derive_key) and its AES-GCM part,
+which is what a change to the hot path would move. The report records the git commit, so
+two runs can be compared across commits:
+
+    git checkout A && ./bench_otp.py -o a.json
+    git checkout B && ./bench_otp.py -o b.json
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import platform
+import subprocess
+import tempfile
+from typing import Callable, Dict, Any
+
+from src.otp import hotp, totp
+from src.crypto_utils import ScryptParams, EncParams, encrypt_key, decrypt_key, _derive_key
+from src.io_utils import read_hex_key_file, validate_hex_key
+
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+KEY_HEX = "3132333435363738393031323334353637383930313233343536373839303132"
+SEEDS = {"sha1": b"12345678901234567890", "sha256": b"12345678901234567890123456789012",
+         "sha512": b"1234567890" * 6 + b"1234"}
+
+def parse_size(text: str) -> int:
+    """Parse sizes such as 64, 4K or 16M into bytes."""
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1] if text and text[-1] in UNITS else ""
+    return int(float(text[:len(text) - len(unit)]) * UNITS[unit])
+
+def timed(fn: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, float]:
+    """Best seconds per call of *fn* over *repeat* loops that each last at least *min_time*."""
+    fn()  # warm up (imports, caches)
+    best = float("inf")
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+    return {"seconds_per_call": best, "calls_per_second": round(1.0 / best, 1) if best else None}
+
+def bench_codes(min_time: float, repeat: int) -> list:
+    """hotp/totp codes per second for every algorithm and digit count."""
+    out = []
+    for algo, seed in SEEDS.items():
+        for digits in (6, 8):
+            counter = iter(range(1 << 62))
+            r = timed(lambda: hotp(seed, next(counter), digits=digits, algo=algo), min_time, repeat)
+            out.append({"function": "hotp", "algo": algo, "digits": digits, "codes_per_second": r["calls_per_second"]})
+            r = timed(lambda: totp(seed, digits=digits, algo=algo), min_time, repeat)
+            out.append({"function": "totp", "algo": algo, "digits": digits, "codes_per_second": r["calls_per_second"]})
+    return out
+
+def bench_decrypt(kdf: ScryptParams, min_time: float, repeat: int) -> dict:
+    """decrypt_key as a whole and split into scrypt (KDF) and AES-GCM time."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    blob = encrypt_key(KEY_HEX, "bench", kdf)
+    obj = json.loads(blob.decode("utf-8"))
+    params = EncParams.from_json(obj)
+    ct = base64.b64decode(obj["ciphertext"])
+    key = _derive_key("bench", params.salt, params.n, params.r, params.p)
+    total = timed(lambda: decrypt_key(blob, "bench"), min_time, repeat)
+    kdf_t = timed(lambda: _derive_key("bench", params.salt, params.n, params.r, params.p), min_time, repeat)
+    aes_t = timed(lambda: AESGCM(key).decrypt(params.nonce, ct, b"ft_otp key"), min_time, repeat)
+    return {
+        "kdf": {"n": kdf.n, "r": kdf.r, "p": kdf.p, "memory_bytes": kdf.memory_bytes},
+        "decrypt_key_ms": round(total["seconds_per_call"] * 1e3, 4),
+        "kdf_ms": round(kdf_t["seconds_per_call"] * 1e3, 4),
+        "aes_gcm_us": round(aes_t["seconds_per_call"] * 1e6, 3),
+        "decrypts_per_second": total["calls_per_second"],
+    }
+
+def bench_hex(sizes: list, min_time: float, repeat: int, tmpdir: str | None) -> list:
+    """read_hex_key_file / validate_hex_key throughput on keys of the given sizes (hex chars)."""
+    out = []
+    for size in sizes:
+        hex_key = (KEY_HEX * (size // len(KEY_HEX) + 1))[:size - size % 2]
+        # one newline every 64 chars, like a wrapped key file
+        text = "\n".join(hex_key[i:i + 64] for i in range(0, len(hex_key), 64)) + "\n"
+        fd, path = tempfile.mkstemp(prefix="bench_otp.", suffix=".hex", dir=tmpdir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            read = timed(lambda: read_hex_key_file(path), min_time, repeat)
+        finally:
+            os.remove(path)
+        valid = timed(lambda: validate_hex_key(hex_key, min_len=min(64, len(hex_key))), min_time, repeat)
+        mib = len(hex_key) / 2**20
+        out.append({
+            "hex_chars": len(hex_key),
+            "read_hex_key_file_ms": round(read["seconds_per_call"] * 1e3, 4),
+            "read_hex_key_file_mib_s": round(mib / read["seconds_per_call"], 2),
+            "validate_hex_key_ms": round(valid["seconds_per_call"] * 1e3, 4),
+            "validate_hex_key_mib_s": round(mib / valid["seconds_per_call"], 2),
+        })
+    return out
+
+def git_commit() -> str | None:
+    """Short hash of the checked-out commit (with '+dirty' for local changes), if in a git tree."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=here, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + ("+dirty" if dirty else "")
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark ft_otp HOTP/TOTP, key decryption and hex key parsing.")
+    p.add_argument("--kdf-n", type=int, default=ScryptParams().n, help="scrypt N of the key file (default %(default)s)")
+    p.add_argument("--hex-sizes", default="64,64K,1M,16M", help="hex key sizes in chars, K/M suffixes (default %(default)s)")
+    p.add_argument("--min-time", type=float, default=0.2, help="seconds per timing loop (default %(default)s)")
+    p.add_argument("--repeat", type=int, default=3, help="timing loops per case, best is kept (default %(default)s)")
+    p.add_argument("--only", choices=["codes", "decrypt", "hex"], action="append", help="run only these groups")
+    p.add_argument("--tmpdir", default=None, help="where hex key files are written")
+    p.add_argument("-o", "--out", help="write the JSON report here instead of stdout")
+    return p.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    a = parse_args(sys.argv[1:] if argv is None else argv)
+    groups = set(a.only or ["codes", "decrypt", "hex"])
+    report: Dict[str, Any] = {"commit": git_commit(), "python": platform.python_version(),
+                              "machine": platform.machine(), "min_time": a.min_time, "repeat": a.repeat}
+    if "codes" in groups:
+        report["codes"] = bench_codes(a.min_time, a.repeat)
+    if "decrypt" in groups:
+        report["decrypt"] = bench_decrypt(ScryptParams(n=a.kdf_n), a.min_time, a.repeat)
+    if "hex" in groups:
+        report["hex"] = bench_hex([parse_size(s) for s in a.hex_sizes.split(",")], a.min_time, a.repeat, a.tmpdir)
+    text = json.dumps(report, indent=1)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,26 +9,40 @@ Usage:
     ./ft_otp -k <encrypted_key_file>
         Decrypt the stored key (passphrase required) and print a 6-digit TOTP for now.
 
+    ./ft_otp -r <encrypted_key_file_or_vault> [--kdf-ms MS] [--kdf-mem MB]
+        Re-encrypt in place with scrypt parameters calibrated for this machine
+        (and optionally a new passphrase). The plaintext key never touches the disk.
+
+    --kdf-ms / --kdf-mem with -g calibrate scrypt for the new key file as well.
+
 Environment:
-    FT_OTP_PASSPHRASE  If set, used as passphrase for -g and -k (non-interactive).
+    FT_OTP_PASSPHRASE      If set, used as passphrase for -g, -k and -r (non-interactive).
+    FT_OTP_NEW_PASSPHRASE  If set, new passphrase for -r (otherwise prompted; empty keeps the current one).
 
 Notes:
     - Uses TOTP with 30s time step and 6 digits (default RFC parameters).
-    - Key file is AES-256-GCM encrypted using a key derived by scrypt (N=2^14, r=8, p=1).
+    - Key file is AES-256-GCM encrypted using a key derived by scrypt (default N=2^14, r=8, p=1;
+      the parameters are stored in the file header).
 """
 from __future__ import annotations
 
 import sys
+import json
 import argparse
 from src.io_utils import read_hex_key_file, validate_hex_key, secure_write, read_bytes
-from src.crypto_utils import prompt_passphrase, encrypt_key, decrypt_key
+from src.crypto_utils import (
+    prompt_passphrase, encrypt_key, decrypt_key, rekey, calibrate_scrypt,
+    DEFAULT_TARGET_MS, DEFAULT_MAX_MEM_MB, MAGIC,
+)
 from src.otp import totp
 
 DEFAULT_KEY_PATH = "ft_otp.key"
 
-def cmd_generate(hex_path: str, out_path: str = DEFAULT_KEY_PATH) -> int:
+def cmd_generate(hex_path: str, out_path: str = DEFAULT_KEY_PATH, calibration=None) -> int:
     """Handle -g: read hex key, validate, encrypt, save to ft_otp.key.
 
+    *calibration* is an optional (target_ms, max_mem_mb) pair for the scrypt parameters.
+
     Returns:
         Exit status code (0 ok, non-zero error).
     """
@@ -41,7 +55,8 @@ def cmd_generate(hex_path: str, out_path: str = DEFAULT_KEY_PATH) -> int:
 
     pw = prompt_passphrase(confirm=True)
     try:
-        blob = encrypt_key(hex_key, pw)
+        kdf = calibrate_scrypt(*calibration) if calibration else None
+        blob = encrypt_key(hex_key, pw, kdf)
         secure_write(out_path, blob)
     except Exception as e:
         print(f"./ft_otp: error: failed to encrypt/save key: {e}")
@@ -69,19 +84,79 @@ def cmd_code(enc_path: str) -> int:
     print(code)
     return 0
 
+def cmd_rekey(path: str, target_ms: float, max_mem_mb: int) -> int:
+    """Handle -r: upgrade a key file or vault to calibrated scrypt parameters.
+
+    Decryption and re-encryption happen in memory; the result replaces *path* atomically.
+    """
+    from src.vault import Vault, VAULT_MAGIC  # only -r handles vaults
+    try:
+        blob = read_bytes(path)
+        magic = json.loads(blob.decode("utf-8")).get("magic")
+    except Exception as e:
+        print(f"./ft_otp: error: cannot read key file: {e}")
+        return 2
+    if magic not in (MAGIC, VAULT_MAGIC):
+        print("./ft_otp: error: not an ft_otp key file or vault")
+        return 2
+
+    pw = prompt_passphrase(confirm=False)
+    new_pw = prompt_passphrase(confirm=True, env_var="FT_OTP_NEW_PASSPHRASE",
+                               prompt="New passphrase (empty keeps current): ") or pw
+    try:
+        kdf = calibrate_scrypt(target_ms, max_mem_mb)
+    except Exception as e:
+        print(f"./ft_otp: error: scrypt calibration failed: {e}")
+        return 2
+    try:
+        if magic == VAULT_MAGIC:
+            vault = Vault.from_bytes(blob)
+            vault.unlock(pw)
+            vault.rekey(new_pw, kdf)
+            new_blob = vault.to_bytes()
+        else:
+            new_blob = rekey(blob, pw, new_pw, kdf)
+        secure_write(path, new_blob)
+    except Exception as e:
+        print(f"./ft_otp: error: wrong passphrase or corrupt key file ({e})")
+        return 3
+
+    print(f"Key was successfully re-encrypted in {path} (scrypt N=2^{kdf.n.bit_length() - 1}, r={kdf.r}, p={kdf.p}).")
+    return 0
+
+def _positive(kind):
+    """argparse type: a number of *kind* greater than zero."""
+    def convert(text: str):
+        try:
+            value = kind(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid number: {text!r}") from None
+        if not value > 0:
+            raise argparse.ArgumentTypeError(f"must be positive: {text}")
+        return value
+    return convert
+
 def parse_args(argv: list[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(add_help=False)
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("-g", dest="gen_path", metavar="FILE", help="read hex key from FILE and save encrypted ft_otp.key")
     group.add_argument("-k", dest="key_path", metavar="FILE", help="read encrypted key from FILE and print current TOTP")
+    group.add_argument("-r", dest="rekey_path", metavar="FILE", help="re-encrypt key file or vault FILE with calibrated scrypt parameters")
     parser.add_argument("-o", dest="out_path", default=DEFAULT_KEY_PATH, help="output path for -g (default: ft_otp.key)")
+    parser.add_argument("--kdf-ms", type=_positive(float), metavar="MS", help=f"target unlock time for scrypt calibration (default for -r: {DEFAULT_TARGET_MS})")
+    parser.add_argument("--kdf-mem", type=_positive(int), metavar="MB", help=f"scrypt memory ceiling for calibration (default: {DEFAULT_MAX_MEM_MB})")
     parser.add_argument("-h", "--help", action="help", help="show this help message and exit")
     return parser.parse_args(argv)
 
 def main(argv: list[str] | None = None) -> int:
     ns = parse_args(sys.argv[1:] if argv is None else argv)
+    target_ms = DEFAULT_TARGET_MS if ns.kdf_ms is None else ns.kdf_ms
+    max_mem_mb = DEFAULT_MAX_MEM_MB if ns.kdf_mem is None else ns.kdf_mem
     if ns.gen_path:
-        return cmd_generate(ns.gen_path, ns.out_path)
+        calibrated = ns.kdf_ms is not None or ns.kdf_mem is not None
+        return cmd_generate(ns.gen_path, ns.out_path, (target_ms, max_mem_mb) if calibrated else None)
+    elif ns.rekey_path:
+        return cmd_rekey(ns.rekey_path, target_ms, max_mem_mb)
     else:
         return cmd_code(ns.key_path)
 
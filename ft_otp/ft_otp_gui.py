@@ -1,140 +1,143 @@
 #!/usr/bin/env python3
 """ft_otp_gui — Graphical interface for ft_otp (BONUS feature).
 
-A simple GUI for generating and viewing TOTP codes.
+A dashboard showing live TOTP codes for one or more accounts, loaded from
+ft_otp.key files or from a multi-account vault.
+
+Everything that touches Tk runs on the Tk thread through the ``after`` scheduler:
+each code is computed once per period boundary and only the progress bars are
+animated in between. Decryption (scrypt) runs on a worker thread so the window
+stays responsive while a key or vault is being unlocked.
 """
 from __future__ import annotations
 
+import os
+import time
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import threading
-import time
 from src.crypto_utils import decrypt_key
 from src.io_utils import read_bytes
-from src.otp import totp
+from src.vault import Vault
+from src.otp import hotp
+
+TICK_MS = 100   # progress bar animation step
+POLL_MS = 50    # how often finished background decryptions are picked up
 
 class OTPTimer:
     """Timer that tracks TOTP validity period."""
     def __init__(self, period: int = 30):
         self.period = period
-    
-    def get_remaining_seconds(self) -> int:
+
+    def get_remaining_seconds(self, now: float | None = None) -> int:
         """Get seconds remaining in current period."""
-        return self.period - (int(time.time()) % self.period)
-    
-    def get_progress(self) -> float:
+        now = time.time() if now is None else now
+        return self.period - (int(now) % self.period)
+
+    def get_progress(self, now: float | None = None) -> float:
         """Get progress through current period (0.0 to 1.0)."""
-        return (self.period - self.get_remaining_seconds()) / self.period
+        now = time.time() if now is None else now
+        return (now % self.period) / self.period
+
+    def counter(self, now: float | None = None) -> int:
+        """RFC 6238 moving factor for *now* (T0 = 0)."""
+        now = time.time() if now is None else now
+        return int(now) // self.period
+
+class AccountRow(tk.Frame):
+    """One account on the dashboard: code, countdown bar and copy button."""
+    def __init__(self, master, app: "FtOtpGUI", name: str, key: bytes,
+                 digits: int = 6, period: int = 30, algo: str = "sha1"):
+        super().__init__(master, padx=8, pady=6, bd=1, relief=tk.GROOVE)
+        self.app = app
+        self.name = name
+        self.key = key
+        self.digits = digits
+        self.algo = algo
+        self.timer = OTPTimer(period=period)
+        self.counter = None  # counter of the code currently shown
+
+        tk.Label(self, text=name, font=("Arial", 10, "bold"), anchor=tk.W).grid(row=0, column=0, sticky="w")
+        tk.Label(self, text=f"{algo.upper()} · {digits} digits · {period}s", font=("Arial", 8), fg="gray").grid(row=1, column=0, sticky="w")
+        self.code_var = tk.StringVar(value="-" * digits)
+        tk.Label(self, textvariable=self.code_var, font=("Courier New", 22, "bold"), fg="#27ae60").grid(row=0, column=1, rowspan=2, padx=10)
+        self.progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(self, variable=self.progress_var, maximum=100, mode="determinate", length=140).grid(row=0, column=2, sticky="we")
+        self.remaining_var = tk.StringVar(value="--s")
+        tk.Label(self, textvariable=self.remaining_var, font=("Arial", 8), fg="gray").grid(row=1, column=2)
+        tk.Button(self, text="📋", command=self.copy, cursor="hand2").grid(row=0, column=3, rowspan=2, padx=(8, 0))
+        self.grid_columnconfigure(0, weight=1)
+
+    def tick(self, now: float) -> None:
+        """Refresh on the Tk thread; HMAC only runs when the period rolls over."""
+        counter = self.timer.counter(now)
+        if counter != self.counter:
+            self.counter = counter
+            self.code_var.set(hotp(self.key, counter, digits=self.digits, algo=self.algo))
+        self.progress_var.set(self.timer.get_progress(now) * 100)
+        self.remaining_var.set(f"{self.timer.get_remaining_seconds(now)}s")
+
+    def copy(self) -> None:
+        self.app.clipboard_clear()
+        self.app.clipboard_append(self.code_var.get())
+        self.app.status_var.set(f"Code for {self.name} copied to clipboard!")
 
 class FtOtpGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("ft_otp — TOTP Generator")
-        self.geometry("500x400")
-        self.resizable(False, False)
-        
-        self.key_data = None
-        self.timer = OTPTimer(period=30)
-        self.update_thread = None
-        self.running = False
-        
+        self.geometry("560x480")
+        self.minsize(460, 260)
+
+        self.rows: dict[str, AccountRow] = {}
+        self.results: "queue.Queue[tuple]" = queue.Queue()  # filled by decrypt workers
+        self.pending = 0
+        self._tick_job = None
+        self._poll_job = None
+
         self._build_ui()
-    
+        self._schedule_tick()
+
     def _build_ui(self):
         # Header
         header = tk.Frame(self, bg="#2c3e50", height=60)
         header.pack(fill=tk.X)
         header.pack_propagate(False)
-        
-        title = tk.Label(
+        tk.Label(
             header,
             text="🔐 ft_otp TOTP Generator",
             font=("Arial", 18, "bold"),
             fg="white",
             bg="#2c3e50"
-        )
-        title.pack(pady=15)
-        
-        # Main content
-        content = tk.Frame(self, padx=30, pady=20)
-        content.pack(fill=tk.BOTH, expand=True)
-        
-        # Key file section
-        key_frame = tk.LabelFrame(content, text="Key File", padx=10, pady=10)
-        key_frame.pack(fill=tk.X, pady=(0, 20))
-        
-        self.key_path_var = tk.StringVar(value="No key file loaded")
-        key_label = tk.Label(
-            key_frame,
-            textvariable=self.key_path_var,
-            fg="gray",
-            font=("Arial", 9)
-        )
-        key_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
-        load_btn = tk.Button(
-            key_frame,
-            text="Load Key",
-            command=self.load_key,
-            bg="#3498db",
-            fg="white",
-            font=("Arial", 10),
-            cursor="hand2"
-        )
-        load_btn.pack(side=tk.RIGHT, padx=5)
-        
-        # TOTP display
-        totp_frame = tk.LabelFrame(content, text="Current TOTP Code", padx=10, pady=10)
-        totp_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 20))
-        
-        self.totp_var = tk.StringVar(value="------")
-        totp_label = tk.Label(
-            totp_frame,
-            textvariable=self.totp_var,
-            font=("Courier New", 36, "bold"),
-            fg="#27ae60"
-        )
-        totp_label.pack(pady=20)
-        
-        # Timer progress bar
-        timer_frame = tk.Frame(totp_frame)
-        timer_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
-        
-        self.progress_var = tk.DoubleVar(value=0)
-        self.progress_bar = ttk.Progressbar(
-            timer_frame,
-            variable=self.progress_var,
-            maximum=100,
-            mode='determinate',
-            length=400
-        )
-        self.progress_bar.pack(fill=tk.X)
-        
-        self.timer_label_var = tk.StringVar(value="--s remaining")
-        timer_label = tk.Label(
-            timer_frame,
-            textvariable=self.timer_label_var,
-            font=("Arial", 9),
-            fg="gray"
-        )
-        timer_label.pack(pady=5)
-        
-        # Copy button
-        copy_btn = tk.Button(
-            content,
-            text="📋 Copy to Clipboard",
-            command=self.copy_to_clipboard,
-            bg="#9b59b6",
-            fg="white",
-            font=("Arial", 11),
-            cursor="hand2",
-            height=2
-        )
-        copy_btn.pack(fill=tk.X)
-        
+        ).pack(pady=15)
+
+        # Toolbar
+        bar = tk.Frame(self, padx=10, pady=8)
+        bar.pack(fill=tk.X)
+        tk.Button(bar, text="Load Key", command=self.load_key, bg="#3498db", fg="white",
+                  font=("Arial", 10), cursor="hand2").pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(bar, text="Open Vault", command=self.load_vault, bg="#9b59b6", fg="white",
+                  font=("Arial", 10), cursor="hand2").pack(side=tk.LEFT)
+
+        # Scrollable account list
+        body = tk.Frame(self, padx=10)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(body, highlightthickness=0)
+        scroll = ttk.Scrollbar(body, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scroll.set)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.list_frame = tk.Frame(self.canvas)
+        window = self.canvas.create_window((0, 0), window=self.list_frame, anchor="nw")
+        self.list_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        self.canvas.bind("<Configure>", lambda e: self.canvas.itemconfigure(window, width=e.width))
+        self.empty_label = tk.Label(self.list_frame, text="No accounts loaded.", fg="gray", pady=30)
+        self.empty_label.pack(fill=tk.X)
+
         # Status bar
-        self.status_var = tk.StringVar(value="Ready. Load a key file to begin.")
-        status_bar = tk.Label(
+        self.status_var = tk.StringVar(value="Ready. Load a key file or vault to begin.")
+        tk.Label(
             self,
             textvariable=self.status_var,
             bd=1,
@@ -142,113 +145,130 @@ class FtOtpGUI(tk.Tk):
             anchor=tk.W,
             font=("Arial", 8),
             fg="gray"
-        )
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-    
-    def load_key(self):
-        path = filedialog.askopenfilename(
-            title="Select Encrypted Key File",
-            filetypes=[("Key files", "*.key"), ("All files", "*.*")]
-        )
-        
-        if not path:
-            return
-        
-        # Prompt for passphrase
+        ).pack(side=tk.BOTTOM, fill=tk.X)
+
+    def _ask_passphrase(self, what: str) -> str | None:
         dialog = tk.Toplevel(self)
         dialog.title("Enter Passphrase")
         dialog.geometry("350x150")
         dialog.resizable(False, False)
         dialog.transient(self)
         dialog.grab_set()
-        
-        tk.Label(dialog, text="Enter passphrase to decrypt key:", font=("Arial", 10)).pack(pady=15)
-        
+
+        tk.Label(dialog, text=f"Enter passphrase to decrypt {what}:", font=("Arial", 10)).pack(pady=15)
+
         passphrase_var = tk.StringVar()
         entry = tk.Entry(dialog, textvariable=passphrase_var, show="●", font=("Arial", 12), width=30)
         entry.pack(pady=10)
         entry.focus()
-        
+
         result = {"passphrase": None}
-        
+
         def on_ok():
             result["passphrase"] = passphrase_var.get()
             dialog.destroy()
-        
+
         def on_cancel():
             dialog.destroy()
-        
+
         entry.bind("<Return>", lambda e: on_ok())
         entry.bind("<Escape>", lambda e: on_cancel())
-        
+
         btn_frame = tk.Frame(dialog)
         btn_frame.pack(pady=10)
-        
         tk.Button(btn_frame, text="OK", command=on_ok, width=10, bg="#27ae60", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(btn_frame, text="Cancel", command=on_cancel, width=10).pack(side=tk.LEFT, padx=5)
-        
+
         self.wait_window(dialog)
-        
-        if not result["passphrase"]:
+        return result["passphrase"] or None
+
+    def load_key(self):
+        path = filedialog.askopenfilename(
+            title="Select Encrypted Key File",
+            filetypes=[("Key files", "*.key"), ("All files", "*.*")]
+        )
+        if not path:
             return
-        
-        # Try to decrypt
-        try:
-            blob = read_bytes(path)
-            self.key_data = decrypt_key(blob, result["passphrase"])
-            self.key_path_var.set(path)
-            self.status_var.set(f"Loaded: {path}")
-            self.start_totp_updates()
-            messagebox.showinfo("Success", "Key loaded successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load key:\n{e}")
-            self.status_var.set("Error loading key file")
-    
-    def start_totp_updates(self):
-        if self.running:
+        passphrase = self._ask_passphrase("key")
+        if passphrase is None:
             return
-        
-        self.running = True
-        self.update_thread = threading.Thread(target=self._update_loop, daemon=True)
-        self.update_thread.start()
-    
-    def _update_loop(self):
-        while self.running and self.key_data:
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        def job():
+            return [(name, decrypt_key(read_bytes(path), passphrase), {})]
+        self._run_in_background(job, path)
+
+    def load_vault(self):
+        path = filedialog.askopenfilename(
+            title="Select Vault",
+            filetypes=[("Vaults", "*.vault"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        passphrase = self._ask_passphrase("vault")
+        if passphrase is None:
+            return
+
+        def job():
+            vault = Vault.from_bytes(read_bytes(path))
+            vault.unlock(passphrase)
+            return [(name, vault.get(name), vault.params(name)) for name in vault.names()]
+        self._run_in_background(job, path)
+
+    def _run_in_background(self, job, path: str):
+        """Run *job* (decryption) on a worker thread; its result is applied by _poll_results."""
+        def worker():
             try:
-                # Generate TOTP
-                code = totp(self.key_data, digits=6, period=30, algo="sha1")
-                self.totp_var.set(code)
-                
-                # Update timer
-                remaining = self.timer.get_remaining_seconds()
-                progress = self.timer.get_progress() * 100
-                
-                self.timer_label_var.set(f"{remaining}s remaining")
-                self.progress_var.set(progress)
-                
-                time.sleep(0.1)  # Update 10 times per second for smooth progress bar
+                self.results.put((path, job(), None))
             except Exception as e:
-                self.status_var.set(f"Error: {e}")
+                self.results.put((path, None, e))
+        self.pending += 1
+        self.status_var.set(f"Decrypting {path}…")
+        threading.Thread(target=worker, daemon=True).start()
+        if self._poll_job is None:
+            self._poll_job = self.after(POLL_MS, self._poll_results)
+
+    def _poll_results(self):
+        self._poll_job = None
+        while True:
+            try:
+                path, accounts, error = self.results.get_nowait()
+            except queue.Empty:
                 break
-    
-    def copy_to_clipboard(self):
-        code = self.totp_var.get()
-        if code == "------":
-            messagebox.showwarning("No Code", "No TOTP code to copy. Load a key first.")
-            return
-        
-        self.clipboard_clear()
-        self.clipboard_append(code)
-        self.status_var.set("Code copied to clipboard!")
-        
-        # Flash the label
-        original_bg = self.totp_var
-        self.after(100, lambda: self.status_var.set(f"Loaded: {self.key_path_var.get()}"))
-    
+            self.pending -= 1
+            if error is not None:
+                self.status_var.set("Error loading key file")
+                messagebox.showerror("Error", f"Failed to load {path}:\n{error}")
+                continue
+            for name, key, params in accounts:
+                self.add_account(name, key, **params)
+            self.status_var.set(f"Loaded {len(accounts)} account(s) from {path}")
+        if self.pending:
+            self._poll_job = self.after(POLL_MS, self._poll_results)
+
+    def add_account(self, name: str, key: bytes, digits: int = 6, period: int = 30, algo: str = "sha1"):
+        """Add (or replace) an account row; must be called on the Tk thread."""
+        if name in self.rows:
+            self.rows.pop(name).destroy()
+        self.empty_label.pack_forget()
+        row = AccountRow(self.list_frame, self, name, key, digits=digits, period=period, algo=algo)
+        row.pack(fill=tk.X, pady=3)
+        row.tick(time.time())
+        self.rows[name] = row
+
+    def _schedule_tick(self):
+        self._tick_job = self.after(TICK_MS, self._tick)
+
+    def _tick(self):
+        now = time.time()
+        for row in self.rows.values():
+            row.tick(now)
+        self._schedule_tick()
+
     def on_close(self):
-        self.running = False
-        if self.update_thread:
-            self.update_thread.join(timeout=1)
+        for job in (self._tick_job, self._poll_job):
+            if job is not None:
+                self.after_cancel(job)
         self.destroy()
 
 def main():
@@ -2,7 +2,8 @@
 """ft_otp_qr — Generate QR code for TOTP setup (BONUS feature).
 
 Usage:
-    ./ft_otp_qr.py -k <encrypted_key_file> [-i <issuer>] [-a <account>] [-o <output.png>]
+    ./ft_otp_qr.py -k <encrypted_key_file> [-i <issuer>] [-a <account>] [-o <output.png>] [-f png|svg|term]
+    ./ft_otp_qr.py --batch <manifest.csv|manifest.json> [-d <out_dir>] [-f png|svg|term] [-j <workers>]
 
 This generates a QR code that can be scanned by authenticator apps like:
 - Google Authenticator
@@ -11,21 +12,39 @@ This generates a QR code that can be scanned by authenticator apps like:
 - etc.
 
 The QR code contains an otpauth:// URI with the TOTP parameters.
+
+Batch mode provisions many accounts in one run. Each manifest row has the columns
+(CSV header) or keys (JSON list of objects):
+    key      ft_otp.key file or vault (required)
+    entry    vault entry name (required when `key` is a vault)
+    issuer   service name (default: ft_otp)
+    account  account identifier (default: entry name or key file name)
+    output   image path (default: <out_dir>/<issuer>_<account>.<ext>)
+The passphrase is asked once; each vault is unlocked once, key files are decrypted
+and QR codes rendered in a process pool.
 """
 from __future__ import annotations
 
+import os
+import re
 import sys
+import csv
+import json
+import time
 import argparse
 import base64
 import urllib.parse
 from src.crypto_utils import prompt_passphrase, decrypt_key
 from src.io_utils import read_bytes
 
-try:
-    import qrcode
-except ImportError:
-    print("Error: qrcode library not installed. Run: pip install qrcode[pil]", file=sys.stderr)
-    sys.exit(1)
+# qrcode (and Pillow behind it), the vault module and the process pool are imported on
+# the code paths that use them, so --help and argument errors return immediately.
+
+FORMATS = {"png": ".png", "svg": ".svg", "term": ".txt"}
+
+# QR version that fit a given URI length last time; otpauth URIs of one batch have
+# near-identical lengths, so this skips re-running the best-fit search per image.
+_version_cache: dict[int, int] = {}
 
 def generate_otpauth_uri(
     secret: bytes,
@@ -68,43 +87,207 @@ def generate_otpauth_uri(
     
     return uri
 
-def generate_qr_code(uri: str, output_path: str = "ft_otp_qr.png") -> None:
-    """Generate a QR code image from the otpauth URI.
-    
-    Args:
-        uri: otpauth:// URI
-        output_path: Path to save the QR code image
-    """
+def require_qrcode():
+    """Import and return the qrcode module, exiting with an install hint if it is missing."""
+    try:
+        import qrcode
+    except ImportError:
+        print("Error: qrcode library not installed. Run: pip install qrcode[pil]", file=sys.stderr)
+        sys.exit(1)
+    return qrcode
+
+def make_qr(uri: str, image_factory=None) -> "qrcode.QRCode":
+    """Build the QR matrix for *uri*, reusing the version fitted for URIs of the same length."""
+    qrcode = require_qrcode()
+    version = _version_cache.get(len(uri))
     qr = qrcode.QRCode(
-        version=1,
+        version=version,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
         box_size=10,
         border=4,
+        image_factory=image_factory,
     )
     qr.add_data(uri)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
+    try:
+        qr.make(fit=version is None)
+    except qrcode.exceptions.DataOverflowError:
+        qr.version = None
+        qr.make(fit=True)
+    _version_cache[len(uri)] = qr.version
+    return qr
+
+def render_qr(uri: str, output_path: str, fmt: str = "png") -> str:
+    """Render *uri* to *output_path* as PNG (Pillow), SVG (no Pillow needed) or ASCII text.
+
+    With fmt "term" and output_path "-", the code is printed to the terminal.
+    """
+    if fmt == "term":
+        qr = make_qr(uri)
+        if output_path == "-":
+            qr.print_ascii(tty=sys.stdout.isatty())
+        else:
+            with open(output_path, "w", encoding="utf-8") as f:
+                qr.print_ascii(out=f)
+        return output_path
+    if fmt == "svg":
+        import qrcode.image.svg
+        img = make_qr(uri, qrcode.image.svg.SvgPathImage).make_image()
+    else:
+        img = make_qr(uri).make_image(fill_color="black", back_color="white")
     img.save(output_path)
-    print(f"QR code saved to: {output_path}")
+    return output_path
+
+def generate_qr_code(uri: str, output_path: str = "ft_otp_qr.png", fmt: str = "png") -> None:
+    """Generate a QR code image from the otpauth URI.
+    
+    Args:
+        uri: otpauth:// URI
+        output_path: Path to save the QR code image
+        fmt: "png", "svg" or "term"
+    """
+    render_qr(uri, output_path, fmt)
+    if output_path != "-":
+        print(f"QR code saved to: {output_path}")
     print(f"\nScan this QR code with your authenticator app to add the account.")
 
+def _decrypt_job(job: tuple[str, bytes, str]) -> tuple[str, bytes]:
+    """Process-pool worker: decrypt one ft_otp.key blob (one scrypt run)."""
+    path, blob, passphrase = job
+    return path, decrypt_key(blob, passphrase)
+
+def _render_job(job: tuple[str, str, str]) -> str:
+    """Process-pool worker: render one QR code."""
+    uri, output_path, fmt = job
+    return render_qr(uri, output_path, fmt)
+
+def read_manifest(path: str) -> list[dict[str, str]]:
+    """Load a batch manifest: a JSON list of objects or a CSV file with a header row."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    if not isinstance(rows, list) or not all(isinstance(r, dict) and r.get("key") for r in rows):
+        raise ValueError("manifest rows must be objects with at least a 'key' field")
+    return [{k: str(v).strip() for k, v in r.items() if v not in (None, "")} for r in rows]
+
+def _is_vault(blob: bytes) -> bool:
+    from src.vault import VAULT_MAGIC
+    try:
+        return json.loads(blob.decode("utf-8")).get("magic") == VAULT_MAGIC
+    except ValueError:
+        return False
+
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._@-]+", "_", text) or "account"
+
+def _row_label(row: dict[str, str]) -> tuple[str, str]:
+    """(issuer, account) of a manifest row, with their defaults."""
+    account = row.get("account") or row.get("entry") or os.path.splitext(os.path.basename(row["key"]))[0]
+    return row.get("issuer", "ft_otp"), account
+
+def output_paths(rows: list[dict[str, str]], out_dir: str, fmt: str) -> list[str]:
+    """Image path of every row; two rows writing the same file is an error, not an overwrite."""
+    paths, seen = [], {}
+    for n, row in enumerate(rows, 1):
+        issuer, account = _row_label(row)
+        path = row.get("output") or os.path.join(out_dir, f"{_safe_name(issuer)}_{_safe_name(account)}{FORMATS[fmt]}")
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen:
+            raise ValueError(f"rows {seen[key]} and {n} both write {path} (set 'output' or a distinct account)")
+        seen[key] = n
+        paths.append(path)
+    return paths
+
+def run_batch(manifest: str, out_dir: str, fmt: str, workers: int | None) -> int:
+    try:
+        rows = read_manifest(manifest)
+        blobs = {row["key"]: read_bytes(row["key"]) for row in rows}
+    except Exception as e:
+        print(f"Error: cannot read manifest: {e}", file=sys.stderr)
+        return 2
+    try:
+        outputs = output_paths(rows, out_dir, fmt)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    from concurrent.futures import ProcessPoolExecutor
+    from src.vault import Vault
+    os.makedirs(out_dir, exist_ok=True)
+    passphrase = prompt_passphrase(confirm=False)
+
+    started = time.perf_counter()
+    secrets: dict[tuple[str, str | None], tuple[bytes, dict]] = {}
+    try:
+        # Vaults: one scrypt per vault, then cheap per-entry subkeys.
+        vault_paths = {p for p, b in blobs.items() if _is_vault(b)}
+        for path in vault_paths:
+            vault = Vault.from_bytes(blobs[path])
+            vault.unlock(passphrase)
+            for row in rows:
+                if row["key"] == path:
+                    if "entry" not in row:
+                        raise ValueError(f"{path} is a vault: the manifest row needs an 'entry'")
+                    secrets[(path, row["entry"])] = (vault.get(row["entry"]), vault.params(row["entry"]))
+        # Key files: one scrypt each, spread over the pool.
+        jobs = [(p, b, passphrase) for p, b in blobs.items() if p not in vault_paths]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, raw_key in pool.map(_decrypt_job, jobs):
+                secrets[(path, None)] = (raw_key, {})
+            decrypted = time.perf_counter()
+
+            render = []
+            for row, output in zip(rows, outputs):
+                raw_key, params = secrets[(row["key"], row["entry"] if row["key"] in vault_paths else None)]
+                issuer, account = _row_label(row)
+                uri = generate_otpauth_uri(raw_key, issuer=issuer, account=account,
+                                           algorithm=params.get("algo", "sha1"),
+                                           digits=params.get("digits", 6), period=params.get("period", 30))
+                render.append((uri, output, fmt))
+            outputs = list(pool.map(_render_job, render, chunksize=max(1, len(render) // (4 * (workers or os.cpu_count() or 1)))))
+    except Exception as e:
+        print(f"Error: batch failed ({e})", file=sys.stderr)
+        return 3
+    finished = time.perf_counter()
+
+    for path in outputs:
+        print(path)
+    total = finished - started
+    print(f"{len(outputs)} QR codes in {total:.2f}s ({len(outputs) / total:.1f}/s): "
+          f"decrypt {decrypted - started:.2f}s, render {finished - decrypted:.2f}s", file=sys.stderr)
+    return 0
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate TOTP QR code for authenticator apps (BONUS feature)"
     )
-    parser.add_argument("-k", "--key", required=True, metavar="FILE",
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("-k", "--key", metavar="FILE",
                        help="Encrypted key file (e.g., ft_otp.key)")
+    source.add_argument("--batch", metavar="MANIFEST",
+                       help="CSV/JSON manifest of key files/vault entries to provision")
     parser.add_argument("-i", "--issuer", default="ft_otp",
                        help="Issuer/service name (default: ft_otp)")
     parser.add_argument("-a", "--account", default="user@example.com",
                        help="Account identifier (default: user@example.com)")
-    parser.add_argument("-o", "--output", default="ft_otp_qr.png",
-                       help="Output QR code image path (default: ft_otp_qr.png)")
+    parser.add_argument("-o", "--output", default=None,
+                       help="Output QR code path (default: ft_otp_qr.<ext>; '-' prints a term code)")
+    parser.add_argument("-f", "--format", choices=sorted(FORMATS), default="png",
+                       help="png (Pillow), svg (no Pillow needed) or term (ASCII)")
+    parser.add_argument("-d", "--out-dir", default="qr",
+                       help="Output directory for --batch (default: qr)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                       help="Worker processes for --batch (default: CPU count)")
     parser.add_argument("--show-uri", action="store_true",
                        help="Print the otpauth:// URI")
     
     args = parser.parse_args()
+    if args.output == "-" and args.format != "term":
+        parser.error("-o - prints to the terminal: use it with -f term")
+    require_qrcode()  # fail before asking for the passphrase
+
+    if args.batch:
+        return run_batch(args.batch, args.out_dir, args.format, args.jobs)
     
     # Read and decrypt the key file
     try:
@@ -135,7 +318,7 @@ def main():
     
     # Generate QR code
     try:
-        generate_qr_code(uri, args.output)
+        generate_qr_code(uri, args.output or "ft_otp_qr" + FORMATS[args.format], args.format)
     except Exception as e:
         print(f"Error: failed to generate QR code: {e}", file=sys.stderr)
         return 4
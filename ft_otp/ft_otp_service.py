@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""ft_otp_service — TOTP verification backend and its load generator.
+
+Usage:
+    ./ft_otp_service.py serve [--vault FILE] [-k NAME=KEY_FILE ...] [--unix PATH | --host H --port P [--allow-remote]]
+        Decrypt the keys once, keep them in memory and answer JSON-lines requests
+        (see src/service.py for the protocol) on a Unix or localhost TCP socket.
+        Clients are not authenticated: the Unix socket is owner-only (0600), and a
+        non-loopback --host is refused unless --allow-remote is given.
+
+    ./ft_otp_service.py load -a ACCOUNT [-n TOTAL] [-c CONN] [--op generate|verify] [--unix PATH | --host H --port P]
+        Hammer a running service and report requests/s and p50/p99 latency.
+
+Environment:
+    FT_OTP_PASSPHRASE  Passphrase for the vault and key files (non-interactive).
+"""
+from __future__ import annotations
+
+import sys
+import json
+import signal
+import asyncio
+import argparse
+from src.crypto_utils import prompt_passphrase
+from src.service import KeyStore, OtpService, start_server, is_loopback, load_test, DEFAULT_WINDOW
+
+DEFAULT_PORT = 8765
+PROG = "./ft_otp_service"
+
+async def run_serve(ns: argparse.Namespace) -> int:
+    if not ns.vault and not ns.keys:
+        print(f"{PROG}: error: give --vault and/or -k NAME=KEY_FILE", file=sys.stderr)
+        return 2
+    if not ns.unix and not ns.allow_remote and not is_loopback(ns.host):
+        print(f"{PROG}: error: --host {ns.host} is not a loopback address; clients are not authenticated, "
+              "pass --allow-remote to serve it anyway", file=sys.stderr)
+        return 2
+    pw = prompt_passphrase(confirm=False)
+    store = KeyStore()
+    loads = []
+    if ns.vault:
+        loads.append(store.load_vault(ns.vault, pw))
+    for spec in ns.keys or []:
+        name, sep, path = spec.partition("=")
+        if not sep or not name:
+            print(f"{PROG}: error: -k expects NAME=KEY_FILE, got {spec!r}", file=sys.stderr)
+            return 2
+        loads.append(store.load_keyfile(name, path, pw))
+    try:
+        await asyncio.gather(*loads)
+    except Exception as e:
+        print(f"{PROG}: error: wrong passphrase or corrupt key file ({e})", file=sys.stderr)
+        return 3
+
+    server = await start_server(OtpService(store, ns.window), ns.host, ns.port, ns.unix, ns.allow_remote)
+    where = ns.unix or "{}:{}".format(*server.sockets[0].getsockname()[:2])
+    print(f"Serving {len(store.names())} account(s) on {where}", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: rely on KeyboardInterrupt
+    async with server:
+        await stop.wait()
+    return 0
+
+async def run_load(ns: argparse.Namespace) -> int:
+    stats = await load_test(ns.account, ns.total, ns.concurrency, ns.op, ns.host, ns.port, ns.unix)
+    if ns.json:
+        print(json.dumps(stats))
+    else:
+        print(f"{stats['requests']} {stats['op']} requests over {stats['concurrency']} connections "
+              f"in {stats['seconds']}s: {stats['rps']} req/s, "
+              f"p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, {stats['errors']} errors")
+    return 0 if stats["errors"] == 0 else 1
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=PROG, description="TOTP generate/verify service over a local socket.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name, helptext in (("serve", "run the service"), ("load", "run the load generator")):
+        p = sub.add_parser(name, help=helptext)
+        p.add_argument("--unix", metavar="PATH", help="Unix socket path (instead of TCP)")
+        p.add_argument("--host", default="127.0.0.1", help="TCP host (default: 127.0.0.1)")
+        p.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+        if name == "serve":
+            p.add_argument("--vault", metavar="FILE", help="load every account of this vault")
+            p.add_argument("-k", dest="keys", metavar="NAME=KEY_FILE", action="append", help="load an ft_otp.key file as NAME")
+            p.add_argument("--allow-remote", action="store_true",
+                           help="allow a non-loopback --host (clients are not authenticated: anyone reaching the port gets codes)")
+            p.add_argument("--window", type=int, default=DEFAULT_WINDOW, help=f"accepted drift in periods for verify (default: {DEFAULT_WINDOW})")
+            p.set_defaults(func=run_serve)
+        else:
+            p.add_argument("-a", "--account", required=True, help="account to request codes for")
+            p.add_argument("-n", dest="total", type=int, default=10000, help="total requests (default: 10000)")
+            p.add_argument("-c", dest="concurrency", type=int, default=16, help="parallel connections (default: 16)")
+            p.add_argument("--op", choices=("generate", "verify"), default="generate", help="request type (default: generate)")
+            p.add_argument("--json", action="store_true", help="print the report as JSON")
+            p.set_defaults(func=run_load)
+    return parser.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    ns = parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        return asyncio.run(ns.func(ns))
+    except KeyboardInterrupt:
+        return 130
+    except OSError as e:
+        print(f"{PROG}: error: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
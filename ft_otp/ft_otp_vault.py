@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""ft_otp_vault — Many TOTP accounts in one encrypted vault file.
+
+Usage:
+    ./ft_otp_vault.py -v <vault> init
+    ./ft_otp_vault.py -v <vault> add <name> <hex_key_file> [--digits N] [--period S] [--algo A]
+    ./ft_otp_vault.py -v <vault> import <ft_otp.key> [<ft_otp.key> ...] [--name NAME]
+    ./ft_otp_vault.py -v <vault> list
+    ./ft_otp_vault.py -v <vault> code <name> [<name> ...]
+    ./ft_otp_vault.py -v <vault> rm <name>
+
+`init` accepts --kdf-ms/--kdf-mem to calibrate scrypt; use `./ft_otp -r <vault>` to
+re-encrypt an existing vault with new parameters or a new passphrase.
+
+The vault runs scrypt once per unlock (not once per account); each entry is
+encrypted under its own HKDF subkey, so only the requested entries are decrypted
+and adding/updating one entry leaves the others untouched.
+
+Environment:
+    FT_OTP_PASSPHRASE      Vault passphrase (non-interactive).
+    FT_OTP_KEY_PASSPHRASE  Passphrase of the ft_otp.key files given to `import`.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+from src.io_utils import read_hex_key_file, validate_hex_key, secure_write, read_bytes
+from src.crypto_utils import prompt_passphrase, calibrate_scrypt, DEFAULT_TARGET_MS, DEFAULT_MAX_MEM_MB
+from src.vault import Vault
+from src.otp import totp
+
+DEFAULT_VAULT_PATH = "ft_otp.vault"
+PROG = "./ft_otp_vault"
+
+def _load(path: str) -> Vault:
+    return Vault.from_bytes(read_bytes(path))
+
+def _unlocked(path: str) -> Vault:
+    vault = _load(path)
+    vault.unlock(prompt_passphrase(confirm=False))
+    return vault
+
+def cmd_init(ns: argparse.Namespace) -> int:
+    if os.path.exists(ns.vault):
+        print(f"{PROG}: error: {ns.vault} already exists")
+        return 2
+    kdf = None
+    if ns.kdf_ms is not None or ns.kdf_mem is not None:
+        kdf = calibrate_scrypt(ns.kdf_ms or DEFAULT_TARGET_MS, ns.kdf_mem or DEFAULT_MAX_MEM_MB)
+    vault = Vault.create(prompt_passphrase(confirm=True), kdf)
+    secure_write(ns.vault, vault.to_bytes())
+    print(f"Vault was successfully created in {ns.vault}.")
+    return 0
+
+def cmd_add(ns: argparse.Namespace) -> int:
+    hex_key = read_hex_key_file(ns.hex_path)
+    validate_hex_key(hex_key, min_len=64)
+    vault = _unlocked(ns.vault)
+    vault.put(ns.name, bytes.fromhex(hex_key), digits=ns.digits, period=ns.period, algo=ns.algo)
+    secure_write(ns.vault, vault.to_bytes())
+    print(f"Entry '{ns.name}' saved in {ns.vault}.")
+    return 0
+
+def cmd_import(ns: argparse.Namespace) -> int:
+    """Migrate existing FTOTP1 key files; entries are named after the file stem unless --name is given."""
+    if ns.name and len(ns.key_paths) > 1:
+        print(f"{PROG}: error: --name can only be used with a single key file")
+        return 2
+    vault = _unlocked(ns.vault)
+    key_pw = prompt_passphrase(confirm=False, env_var="FT_OTP_KEY_PASSPHRASE", prompt="Key file passphrase: ")
+    for path in ns.key_paths:
+        name = ns.name or os.path.splitext(os.path.basename(path))[0]
+        vault.import_keyfile(name, read_bytes(path), key_pw)
+        print(f"Imported {path} as '{name}'.")
+    secure_write(ns.vault, vault.to_bytes())
+    return 0
+
+def cmd_list(ns: argparse.Namespace) -> int:
+    vault = _load(ns.vault)
+    for name in vault.names():
+        p = vault.params(name)
+        print(f"{name}\t{p['algo']}\t{p['digits']} digits\t{p['period']}s")
+    return 0
+
+def cmd_code(ns: argparse.Namespace) -> int:
+    vault = _unlocked(ns.vault)
+    for name in ns.names:
+        code = totp(vault.get(name), **vault.params(name))
+        print(f"{name}\t{code}" if len(ns.names) > 1 else code)
+    return 0
+
+def cmd_rm(ns: argparse.Namespace) -> int:
+    vault = _unlocked(ns.vault)
+    vault.remove(ns.name)
+    secure_write(ns.vault, vault.to_bytes())
+    print(f"Entry '{ns.name}' removed from {ns.vault}.")
+    return 0
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=PROG, description="Multi-account encrypted TOTP vault.")
+    parser.add_argument("-v", "--vault", default=DEFAULT_VAULT_PATH, metavar="FILE",
+                        help=f"vault file (default: {DEFAULT_VAULT_PATH})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("init", help="create an empty vault")
+    p.add_argument("--kdf-ms", type=float, metavar="MS", help="calibrate scrypt to this unlock time")
+    p.add_argument("--kdf-mem", type=int, metavar="MB", help=f"scrypt memory ceiling for calibration (default: {DEFAULT_MAX_MEM_MB})")
+    p.set_defaults(func=cmd_init)
+    p = sub.add_parser("add", help="add or replace an entry from a hex key file")
+    p.add_argument("name")
+    p.add_argument("hex_path", metavar="HEX_FILE")
+    p.add_argument("--digits", type=int, default=6, help="code length (default: 6)")
+    p.add_argument("--period", type=int, default=30, help="time step in seconds (default: 30)")
+    p.add_argument("--algo", default="sha1", choices=("sha1", "sha256", "sha512"), help="HMAC hash (default: sha1)")
+    p.set_defaults(func=cmd_add)
+    p = sub.add_parser("import", help="migrate ft_otp.key files into the vault")
+    p.add_argument("key_paths", metavar="KEY_FILE", nargs="+")
+    p.add_argument("--name", help="entry name (default: key file name without extension)")
+    p.set_defaults(func=cmd_import)
+    sub.add_parser("list", help="list entries (no passphrase needed)").set_defaults(func=cmd_list)
+    p = sub.add_parser("code", help="print the current TOTP of one or more entries")
+    p.add_argument("names", metavar="NAME", nargs="+")
+    p.set_defaults(func=cmd_code)
+    p = sub.add_parser("rm", help="remove an entry")
+    p.add_argument("name")
+    p.set_defaults(func=cmd_rm)
+    return parser.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    ns = parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        return ns.func(ns)
+    except KeyboardInterrupt:
+        return 130
+    except KeyError as e:
+        print(f"{PROG}: error: {e.args[0]}")
+        return 2
+    except Exception as e:
+        print(f"{PROG}: error: {e}")
+        return 3
+
+if __name__ == "__main__":
+    raise SystemExit(main())
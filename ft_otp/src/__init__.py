@@ -1,5 +1,5 @@
 """src
 Utilities for the *ft_otp* assignment: secure key storage and RFC-compliant HOTP/TOTP generation.
 """
-__all__ = ["otp", "crypto_utils", "io_utils"]
+__all__ = ["otp", "crypto_utils", "io_utils", "vault", "service"]
 __version__ = "1.0.0"
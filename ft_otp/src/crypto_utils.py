@@ -2,16 +2,32 @@ from __future__ import annotations
 
 import os
 import json
+import time
 import base64
 import getpass
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+# cryptography is imported inside the functions that need it, so importing this module
+# (constants, prompt_passphrase, ScryptParams) stays cheap for --help and error paths.
 
 MAGIC = "FTOTP1"  # file format magic/version
 
+DEFAULT_TARGET_MS = 250   # calibration: wanted unlock latency
+DEFAULT_MAX_MEM_MB = 64   # calibration: scrypt memory ceiling
+MIN_N = 2**12             # never calibrate below this cost factor
+MAX_P = 16                # calibration: upper bound for the parallelism factor
+
+@dataclass
+class ScryptParams:
+    """scrypt cost parameters (memory used is about 128 * r * n bytes)."""
+    n: int = 2**14
+    r: int = 8
+    p: int = 1
+    @property
+    def memory_bytes(self) -> int:
+        return 128 * self.r * self.n
+
 @dataclass
 class EncParams:
     """Encryption parameters stored alongside the ciphertext."""
@@ -41,15 +57,51 @@ class EncParams:
 
 def _derive_key(passphrase: str, salt: bytes, n: int, r: int, p: int) -> bytes:
     """Derive a 256-bit key from a passphrase using scrypt."""
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
     kdf = Scrypt(salt=salt, length=32, n=n, r=r, p=p)
     return kdf.derive(passphrase.encode("utf-8"))
 
-def prompt_passphrase(confirm: bool = False, env_var: str = "FT_OTP_PASSPHRASE") -> str:
+def _time_scrypt(n: int, r: int, p: int, rounds: int = 3) -> float:
+    """Best-of-*rounds* wall time (seconds) of one scrypt derivation on this machine."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _derive_key("calibration", b"\x00" * 16, n, r, p)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def calibrate_scrypt(target_ms: float = DEFAULT_TARGET_MS, max_mem_mb: int = DEFAULT_MAX_MEM_MB, r: int = 8) -> ScryptParams:
+    """Pick scrypt parameters that take about *target_ms* to derive here, within *max_mem_mb*.
+
+    scrypt time grows linearly with n (and p) while memory grows with n only, so n is
+    the largest power of two that fits both the time budget and the memory ceiling;
+    time left over once memory is the limit is spent on p (at most MAX_P). A ceiling
+    below 128 * MIN_N * r bytes lowers r first.
+    """
+    if target_ms <= 0 or max_mem_mb <= 0:
+        raise ValueError("target time and memory ceiling must be positive")
+    ceiling = int(max_mem_mb * 1024 * 1024)
+    while r > 1 and 128 * MIN_N * r > ceiling:
+        r //= 2
+    if 128 * MIN_N * r > ceiling:
+        raise ValueError(f"memory ceiling too low: scrypt needs at least {128 * MIN_N // 1024} KiB")
+    probe_n = MIN_N
+    per_n = _time_scrypt(probe_n, r, 1) / probe_n
+    budget = target_ms / 1000.0
+    max_n = ceiling // (128 * r)
+    n = MIN_N
+    while n * 2 <= max_n and per_n * n * 2 <= budget:
+        n *= 2
+    p = min(MAX_P, max(1, int(budget // (per_n * n))))
+    return ScryptParams(n=n, r=r, p=p)
+
+def prompt_passphrase(confirm: bool = False, env_var: str = "FT_OTP_PASSPHRASE", prompt: str = "Enter passphrase: ") -> str:
     """Obtain a passphrase from env or interactive prompt.
 
     Args:
         confirm: If True, ask to confirm by typing twice (for -g).
         env_var: Environment variable to check first.
+        prompt: Text shown by the interactive prompt.
 
     Returns:
         The passphrase string (may be empty, but discouraged).
@@ -58,7 +110,7 @@ def prompt_passphrase(confirm: bool = False, env_var: str = "FT_OTP_PASSPHRASE")
     if env_var in os.environ:
         return os.environ[env_var]
     while True:
-        pw = getpass.getpass("Enter passphrase: ")
+        pw = getpass.getpass(prompt)
         if not confirm:
             return pw
         pw2 = getpass.getpass("Confirm passphrase: ")
@@ -66,18 +118,26 @@ def prompt_passphrase(confirm: bool = False, env_var: str = "FT_OTP_PASSPHRASE")
             return pw
         print("Passphrases do not match. Try again.")
 
-def encrypt_key(hex_key: str, passphrase: str) -> bytes:
+def encrypt_key(hex_key: str, passphrase: str, kdf: Optional[ScryptParams] = None) -> bytes:
     """Encrypt a hex-encoded key with a passphrase using AES-GCM + scrypt.
 
+    Args:
+        kdf: scrypt parameters stored in the header (default: N=2^14, r=8, p=1).
+
     Returns:
         The serialized JSON (UTF-8) of { params..., "ciphertext": base64 }.
     """
     if len(hex_key) % 2 != 0:
         raise ValueError("hex key length must be even")
-    raw_key = bytes.fromhex(hex_key)
+    return encrypt_raw_key(bytes.fromhex(hex_key), passphrase, kdf)
+
+def encrypt_raw_key(raw_key: bytes, passphrase: str, kdf: Optional[ScryptParams] = None) -> bytes:
+    """Like :func:`encrypt_key` but for raw key bytes."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    kdf = kdf or ScryptParams()
     salt = os.urandom(16)
     nonce = os.urandom(12)  # AES-GCM 96-bit nonce
-    params = EncParams(salt=salt, nonce=nonce)
+    params = EncParams(salt=salt, nonce=nonce, n=kdf.n, r=kdf.r, p=kdf.p)
     aesgcm = AESGCM(_derive_key(passphrase, salt, params.n, params.r, params.p))
     ct = aesgcm.encrypt(nonce, raw_key, associated_data=b"ft_otp key")  # includes tag
     payload = params.to_json()
@@ -86,8 +146,17 @@ def encrypt_key(hex_key: str, passphrase: str) -> bytes:
 
 def decrypt_key(blob: bytes, passphrase: str) -> bytes:
     """Decrypt and return the raw key bytes from a serialized JSON *blob*."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
     obj = json.loads(blob.decode("utf-8"))
     params = EncParams.from_json(obj)
     ct = base64.b64decode(obj["ciphertext"])
     aesgcm = AESGCM(_derive_key(passphrase, params.salt, params.n, params.r, params.p))
     return aesgcm.decrypt(params.nonce, ct, associated_data=b"ft_otp key")
+
+def rekey(blob: bytes, passphrase: str, new_passphrase: Optional[str] = None, kdf: Optional[ScryptParams] = None) -> bytes:
+    """Re-encrypt a serialized key file under new scrypt parameters and/or passphrase.
+
+    The raw key only ever exists in memory; the caller writes the returned blob.
+    """
+    raw_key = decrypt_key(blob, passphrase)
+    return encrypt_raw_key(raw_key, passphrase if new_passphrase is None else new_passphrase, kdf)
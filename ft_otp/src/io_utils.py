@@ -20,11 +20,18 @@ def validate_hex_key(hex_key: str, min_len: int = 64) -> None:
         raise ValueError(f"key must be at least {min_len} hexadecimal characters") 
 
 def secure_write(path: str, data: bytes) -> None:
-    """Write *data* to *path*, restricting permissions on POSIX to 0600."""
-    with open(path, "wb") as f:
+    """Write *data* to *path*, restricting permissions on POSIX to 0600.
+
+    The data goes to a sibling temporary file that is renamed over *path*,
+    so an existing file is never left half-written.
+    """
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600)
+    with os.fdopen(fd, "wb") as f:
         f.write(data)
     if os.name == "posix":
-        os.chmod(path, 0o600)
+        os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
 
 def read_bytes(path: str) -> bytes:
     with open(path, "rb") as f:
@@ -0,0 +1,222 @@
+"""JSON-lines TOTP generate/verify service and its load generator.
+
+Trust model: the service does not authenticate its clients. Anyone who can connect
+gets live codes for every loaded account ("generate") and can probe codes ("verify",
+rate-limited only by replay protection). Access control is therefore the socket's:
+a Unix socket is made owner-only (0600) once bound, and TCP listens on loopback
+addresses only unless the caller passes allow_remote=True (--allow-remote), which
+exposes every account to the network and is meant for a host that filters the port.
+"""
+from __future__ import annotations
+
+import os
+import math
+import ipaddress
+import time
+import hmac
+import json
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+from .otp import hotp
+from .crypto_utils import decrypt_key
+from .io_utils import read_bytes
+from .vault import Vault
+
+# Wire protocol: one JSON object per line in each direction (UTF-8, "\n"-terminated).
+#   {"op": "generate", "account": NAME [, "time": UNIX]}
+#       -> {"ok": true, "code": "123456", "remaining": 17}
+#   {"op": "verify", "account": NAME, "code": "123456" [, "window": 1]}
+#       -> {"ok": true, "valid": true, "drift": 0}
+#          {"ok": true, "valid": false [, "replayed": true]}
+# verify always uses the server clock; "window" can only narrow the server's own window.
+# A code is accepted once: after a success, codes for that counter or an older one are
+# refused (RFC 6238 section 5.2).
+#   {"op": "accounts"} -> {"ok": true, "accounts": [...]}
+#   {"op": "ping"}     -> {"ok": true}
+# Failures answer {"ok": false, "error": "..."} and keep the connection open.
+
+MAX_LINE = 64 * 1024
+DEFAULT_WINDOW = 1  # accepted clock drift, in periods, for verify
+
+class KeyStore:
+    """Decrypted TOTP secrets held in memory for the lifetime of the service.
+
+    Loading runs scrypt, which is CPU-bound for hundreds of milliseconds, so it is
+    pushed to the default executor to keep the event loop responsive.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, Tuple[bytes, Dict[str, Any]]] = {}
+
+    def add(self, name: str, raw_key: bytes, digits: int = 6, period: int = 30, algo: str = "sha1") -> None:
+        self._keys[name] = (bytes(raw_key), {"digits": digits, "period": period, "algo": algo})
+
+    def get(self, name: str) -> Tuple[bytes, Dict[str, Any]]:
+        try:
+            return self._keys[name]
+        except KeyError:
+            raise KeyError(f"unknown account: {name}") from None
+
+    def names(self) -> List[str]:
+        return sorted(self._keys)
+
+    async def load_keyfile(self, name: str, path: str, passphrase: str) -> None:
+        blob = read_bytes(path)
+        raw_key = await asyncio.get_running_loop().run_in_executor(None, decrypt_key, blob, passphrase)
+        self.add(name, raw_key)
+
+    async def load_vault(self, path: str, passphrase: str) -> None:
+        vault = Vault.from_bytes(read_bytes(path))
+        await asyncio.get_running_loop().run_in_executor(None, vault.unlock, passphrase)
+        for name in vault.names():
+            self.add(name, vault.get(name), **vault.params(name))
+
+class OtpService:
+    """Answers generate/verify requests for the accounts of a :class:`KeyStore`."""
+
+    def __init__(self, store: KeyStore, window: int = DEFAULT_WINDOW):
+        self.store = store
+        self.window = window
+        self.last_counter: Dict[str, int] = {}  # account -> last accepted time step
+
+    def dispatch(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        op = req.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op == "accounts":
+            return {"ok": True, "accounts": self.store.names()}
+        if op not in ("generate", "verify"):
+            raise ValueError(f"unknown op: {op!r}")
+        account = str(req.get("account"))
+        key, params = self.store.get(account)
+        if op == "generate" and req.get("time") is not None:
+            now = int(req["time"])
+        else:
+            now = int(time.time())
+        period = params["period"]
+        counter = now // period
+        if op == "generate":
+            code = hotp(key, counter, digits=params["digits"], algo=params["algo"])
+            return {"ok": True, "code": code, "remaining": period - now % period}
+        code = str(req.get("code", ""))
+        window = max(0, min(int(req.get("window", self.window)), self.window))
+        last = self.last_counter.get(account, -1)
+        replayed = False
+        for drift in sorted(range(-window, window + 1), key=abs):
+            expected = hotp(key, counter + drift, digits=params["digits"], algo=params["algo"])
+            if hmac.compare_digest(expected, code):
+                if counter + drift <= last:
+                    replayed = True
+                    continue
+                self.last_counter[account] = counter + drift
+                return {"ok": True, "valid": True, "drift": drift}
+        return {"ok": True, "valid": False, **({"replayed": True} if replayed else {})}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    break  # line longer than MAX_LINE: drop the client
+                if not line:
+                    break
+                try:
+                    resp = self.dispatch(json.loads(line))
+                except KeyError as e:
+                    resp = {"ok": False, "error": e.args[0]}
+                except Exception as e:
+                    resp = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(resp, separators=(",", ":")).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # other host names may resolve anywhere
+
+async def start_server(service: OtpService, host: str = "127.0.0.1", port: int = 0,
+                       unix_path: Optional[str] = None, allow_remote: bool = False) -> asyncio.AbstractServer:
+    """Listen on a Unix socket (*unix_path*, mode 0600) or a TCP *host*:*port*.
+
+    Clients are not authenticated (see the module docstring), so a TCP *host* that is
+    not a loopback address is refused unless *allow_remote* is set.
+    """
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle, path=unix_path, limit=MAX_LINE)
+        os.chmod(unix_path, 0o600)
+        return server
+    if not allow_remote and not is_loopback(host):
+        raise ValueError(f"refusing to serve on non-loopback address {host!r} without allow_remote: "
+                         "clients are not authenticated")
+    return await asyncio.start_server(service.handle, host=host, port=port, limit=MAX_LINE)
+
+async def open_client(host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, req: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one request on an open connection and wait for its answer."""
+    writer.write(json.dumps(req, separators=(",", ":")).encode("utf-8") + b"\n")
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("server closed the connection")
+    return json.loads(line)
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)  # nearest-rank
+    return sorted_values[min(idx, len(sorted_values) - 1)]
+
+async def load_test(account: str, total: int = 10000, concurrency: int = 16, op: str = "generate",
+                    host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None) -> Dict[str, Any]:
+    """Fire *total* requests over *concurrency* connections; return throughput and latency figures.
+
+    For ``verify`` each connection asks for the current code and then verifies it over
+    and over: the service accepts it once and answers the rest as replays, which still
+    run the full check. Only a code that is neither accepted nor replayed counts as an error.
+    """
+    if total <= 0 or concurrency <= 0:
+        raise ValueError("total and concurrency must be positive")
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(count: int) -> None:
+        nonlocal errors
+        reader, writer = await open_client(host, port, unix_path)
+        try:
+            req: Dict[str, Any] = {"op": op, "account": account}
+            if op == "verify":
+                req["code"] = (await request(reader, writer, {"op": "generate", "account": account}))["code"]
+            for _ in range(count):
+                start = time.perf_counter()
+                resp = await request(reader, writer, req)
+                latencies.append(time.perf_counter() - start)
+                if not resp.get("ok") or (resp.get("valid") is False and not resp.get("replayed")):
+                    errors += 1
+        finally:
+            writer.close()
+
+    concurrency = min(concurrency, total)
+    shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in shares))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "op": op, "requests": len(latencies), "errors": errors, "concurrency": concurrency,
+        "seconds": round(elapsed, 4), "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+    }
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+import hmac
+import json
+import base64
+import hashlib
+from typing import Dict, Any, List, Optional
+
+from .crypto_utils import ScryptParams, _derive_key, decrypt_key
+
+VAULT_MAGIC = "FTOTPV1"  # multi-account vault format magic/version
+
+# Multi-account vault layout (compact JSON, UTF-8):
+#   {"magic": "FTOTPV1",
+#    "kdf": {"salt", "n", "r", "p"},           # one scrypt run -> master key
+#    "check": base64(HMAC-SHA256(master)),      # passphrase verification
+#    "entries": {name: {"salt", "nonce", "ciphertext", "digits", "period", "algo"}}}
+#
+# Every entry is encrypted under its own subkey HKDF-SHA256(master, entry salt, name),
+# so an entry can be read, added or replaced without touching the others. The entry's
+# name and OTP parameters are its associated data: renaming an entry or editing its
+# digits/period/algo in the file makes decryption fail.
+#
+# As in crypto_utils, cryptography is imported inside the functions that use it.
+
+_CHECK_INFO = b"ft_otp vault check"
+_ENTRY_INFO = b"ft_otp vault entry:"
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+def _entry_subkey(master: bytes, salt: bytes, name: str) -> bytes:
+    """Derive the 256-bit AES key of entry *name* from the vault master key (HKDF-SHA256)."""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=_ENTRY_INFO + name.encode("utf-8"))
+    return hkdf.derive(master)
+
+def _entry_aad(name: str, digits: int, period: int, algo: str) -> bytes:
+    params = json.dumps([digits, period, algo], separators=(",", ":"))
+    return _ENTRY_INFO + name.encode("utf-8") + b"\0" + params.encode("utf-8")
+
+def _check_value(master: bytes) -> bytes:
+    return hmac.new(master, _CHECK_INFO, hashlib.sha256).digest()
+
+class Vault:
+    """Many named TOTP secrets behind a single passphrase.
+
+    The index (names and OTP parameters) is readable without the passphrase;
+    secrets are decrypted one at a time by :meth:`get` after :meth:`unlock`.
+    """
+
+    def __init__(self, kdf: Dict[str, Any], check: str, entries: Dict[str, Dict[str, Any]]):
+        self.kdf = kdf
+        self.check = check
+        self.entries = entries
+        self._master: Optional[bytes] = None
+
+    @staticmethod
+    def create(passphrase: str, kdf: Optional[ScryptParams] = None) -> "Vault":
+        """Create an empty, unlocked vault protected by *passphrase*."""
+        vault = Vault({}, "", {})
+        vault._set_master(passphrase, kdf or ScryptParams())
+        return vault
+
+    def _set_master(self, passphrase: str, kdf: ScryptParams) -> None:
+        salt = os.urandom(16)
+        master = _derive_key(passphrase, salt, kdf.n, kdf.r, kdf.p)
+        self.kdf = {"salt": _b64(salt), "n": kdf.n, "r": kdf.r, "p": kdf.p}
+        self.check = _b64(_check_value(master))
+        self._master = master
+
+    @staticmethod
+    def from_bytes(blob: bytes) -> "Vault":
+        """Parse a serialized vault. No key derivation or decryption happens here."""
+        obj = json.loads(blob.decode("utf-8"))
+        if obj.get("magic") != VAULT_MAGIC:
+            raise ValueError("Invalid vault file format (bad magic)")
+        return Vault(obj["kdf"], obj["check"], obj.get("entries", {}))
+
+    def to_bytes(self) -> bytes:
+        payload = {"magic": VAULT_MAGIC, "kdf": self.kdf, "check": self.check, "entries": self.entries}
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    @property
+    def unlocked(self) -> bool:
+        return self._master is not None
+
+    def unlock(self, passphrase: str) -> None:
+        """Run the (single) scrypt derivation and verify the passphrase.
+
+        Raises:
+            ValueError: wrong passphrase or corrupt vault header.
+        """
+        kdf = self.kdf
+        master = _derive_key(passphrase, base64.b64decode(kdf["salt"]),
+                             int(kdf.get("n", 2**14)), int(kdf.get("r", 8)), int(kdf.get("p", 1)))
+        if not hmac.compare_digest(_check_value(master), base64.b64decode(self.check)):
+            raise ValueError("wrong passphrase or corrupt vault")
+        self._master = master
+
+    def lock(self) -> None:
+        self._master = None
+
+    def _require_master(self) -> bytes:
+        if self._master is None:
+            raise RuntimeError("vault is locked")
+        return self._master
+
+    def names(self) -> List[str]:
+        return sorted(self.entries)
+
+    def params(self, name: str) -> Dict[str, Any]:
+        """Return the OTP parameters (digits, period, algo) of entry *name*."""
+        e = self._entry(name)
+        return {"digits": int(e.get("digits", 6)), "period": int(e.get("period", 30)), "algo": e.get("algo", "sha1")}
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        try:
+            return self.entries[name]
+        except KeyError:
+            raise KeyError(f"no such entry: {name}") from None
+
+    def get(self, name: str) -> bytes:
+        """Decrypt and return the raw secret of entry *name* (only this entry is decrypted)."""
+        e = self._entry(name)
+        key = _entry_subkey(self._require_master(), base64.b64decode(e["salt"]), name)
+        aad = _entry_aad(name, **self.params(name))
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        return AESGCM(key).decrypt(base64.b64decode(e["nonce"]), base64.b64decode(e["ciphertext"]), aad)
+
+    def put(self, name: str, raw_key: bytes, digits: int = 6, period: int = 30, algo: str = "sha1") -> None:
+        """Add or replace entry *name*; other entries are left untouched."""
+        if not name:
+            raise ValueError("entry name must not be empty")
+        digits, period, algo = int(digits), int(period), algo.lower()
+        salt = os.urandom(16)
+        nonce = os.urandom(12)
+        key = _entry_subkey(self._require_master(), salt, name)
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        ct = AESGCM(key).encrypt(nonce, bytes(raw_key), _entry_aad(name, digits, period, algo))
+        self.entries[name] = {
+            "salt": _b64(salt), "nonce": _b64(nonce), "ciphertext": _b64(ct),
+            "digits": digits, "period": period, "algo": algo,
+        }
+
+    def remove(self, name: str) -> None:
+        """Delete entry *name*; like :meth:`put`, this needs an unlocked vault."""
+        self._require_master()
+        self._entry(name)
+        del self.entries[name]
+
+    def rekey(self, new_passphrase: str, kdf: Optional[ScryptParams] = None) -> None:
+        """Move an unlocked vault to a new passphrase and/or scrypt parameters.
+
+        All entries are re-encrypted in memory since their subkeys hang off the master key.
+        """
+        secrets = {name: (self.get(name), self.params(name)) for name in self.entries}
+        self._set_master(new_passphrase, kdf or ScryptParams())
+        self.entries = {}
+        for name, (raw_key, params) in secrets.items():
+            self.put(name, raw_key, **params)
+
+    def import_keyfile(self, name: str, blob: bytes, passphrase: str) -> None:
+        """Migrate a single-key ``FTOTP1`` file (e.g. ``ft_otp.key``) into entry *name*."""
+        self.put(name, decrypt_key(blob, passphrase))
@@ -0,0 +1,73 @@
+"""Key file encryption (scrypt + AES-GCM) and hex key parsing/validation."""
+import json
+import pytest
+from cryptography.exceptions import InvalidTag
+from src.crypto_utils import ScryptParams, encrypt_key, decrypt_key, rekey, calibrate_scrypt
+from src.io_utils import read_hex_key_file, validate_hex_key, secure_write, read_bytes
+import ft_otp
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
+HEX = "3132333435363738393031323334353637383930313233343536373839303132"
+
+def test_decrypt_roundtrip_and_header():
+    blob = encrypt_key(HEX, "pw", FAST)
+    header = json.loads(blob)
+    assert header["magic"] == "FTOTP1" and (header["n"], header["r"], header["p"]) == (2**10, 8, 1)
+    assert decrypt_key(blob, "pw") == bytes.fromhex(HEX)
+
+def test_wrong_passphrase_and_tampering_are_rejected():
+    blob = encrypt_key(HEX, "pw", FAST)
+    with pytest.raises(InvalidTag):
+        decrypt_key(blob, "wrong")
+    header = json.loads(blob)
+    header["n"] = 2**11  # the KDF parameters are not authenticated, but change the key
+    with pytest.raises(InvalidTag):
+        decrypt_key(json.dumps(header).encode(), "pw")
+
+def test_bad_magic_is_rejected():
+    header = json.loads(encrypt_key(HEX, "pw", FAST))
+    header["magic"] = "NOPE"
+    with pytest.raises(ValueError):
+        decrypt_key(json.dumps(header).encode(), "pw")
+
+def test_rekey_changes_passphrase_and_params():
+    blob = rekey(encrypt_key(HEX, "old", FAST), "old", "new", ScryptParams(n=2**11))
+    assert json.loads(blob)["n"] == 2**11
+    assert decrypt_key(blob, "new") == bytes.fromhex(HEX)
+
+def test_read_hex_key_file_ignores_whitespace(tmp_path):
+    path = tmp_path / "key.hex"
+    path.write_text("  " + HEX[:32] + "\n" + HEX[32:].upper() + "\r\n")
+    assert read_hex_key_file(str(path)).lower() == HEX
+
+@pytest.mark.parametrize("key,message", [
+    ("zz" * 32, "hexadecimal"),
+    (HEX + "a", "even"),
+    (HEX[:62], "at least 64"),
+])
+def test_validate_hex_key_rejects(key, message):
+    with pytest.raises(ValueError, match=message):
+        validate_hex_key(key)
+
+def test_validate_hex_key_accepts_long_mixed_case_keys():
+    validate_hex_key(HEX.upper() * 1000)
+
+def test_secure_write_is_private_and_atomic(tmp_path):
+    path = tmp_path / "ft_otp.key"
+    secure_write(str(path), b"one")
+    secure_write(str(path), b"two")
+    assert read_bytes(str(path)) == b"two"
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert not (tmp_path / "ft_otp.key.tmp").exists()
+
+@pytest.mark.parametrize("max_mem_mb", [1, 4])
+def test_calibration_stays_under_the_memory_ceiling(max_mem_mb):
+    kdf = calibrate_scrypt(target_ms=2000, max_mem_mb=max_mem_mb)
+    assert 128 * kdf.n * kdf.r <= max_mem_mb * 2**20 and 1 <= kdf.p <= 16
+
+@pytest.mark.parametrize("option", [["--kdf-ms", "-5"], ["--kdf-ms", "0"], ["--kdf-mem", "0"], ["--kdf-mem", "x"]])
+def test_cli_rejects_non_positive_calibration_options(option, capsys):
+    with pytest.raises(SystemExit) as exc:
+        ft_otp.main(["-r", "missing.key", *option])
+    err = capsys.readouterr().err
+    assert exc.value.code == 2 and ("must be positive" in err or "invalid number" in err)
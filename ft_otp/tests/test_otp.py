@@ -0,0 +1,54 @@
+"""RFC 4226 (HOTP) and RFC 6238 (TOTP) conformance vectors."""
+import pytest
+from src.otp import hotp, totp
+
+# RFC 4226 Appendix D: secret "12345678901234567890", SHA-1; the 31-bit truncated values
+# are listed so both 6 and 8 digit codes can be checked (code = value mod 10^digits).
+RFC4226_SECRET = b"12345678901234567890"
+RFC4226_TRUNCATED = [1284755224, 1094287082, 137359152, 1726969429, 1640338314,
+                     868254676, 1918287922, 82162583, 673399871, 645520489]
+
+# RFC 6238 Appendix B: the seed is the ASCII digits repeated to the hash output size.
+RFC6238_SEEDS = {
+    "sha1": b"12345678901234567890",
+    "sha256": b"12345678901234567890123456789012",
+    "sha512": b"1234567890" * 6 + b"1234",
+}
+RFC6238_VECTORS = [  # (unix time, sha1, sha256, sha512), 8 digits
+    (59, "94287082", "46119246", "90693936"),
+    (1111111109, "07081804", "68084774", "25091201"),
+    (1111111111, "14050471", "67062674", "99943326"),
+    (1234567890, "89005924", "91819424", "93441116"),
+    (2000000000, "69279037", "90698825", "38618901"),
+    (20000000000, "65353130", "77737706", "47863826"),
+]
+
+@pytest.mark.parametrize("counter,value", list(enumerate(RFC4226_TRUNCATED)))
+@pytest.mark.parametrize("digits", [6, 8])
+def test_hotp_rfc4226(counter, value, digits):
+    assert hotp(RFC4226_SECRET, counter, digits=digits) == f"{value % 10**digits:0{digits}d}"
+
+@pytest.mark.parametrize("t,sha1,sha256,sha512", RFC6238_VECTORS)
+@pytest.mark.parametrize("digits", [6, 8])
+def test_totp_rfc6238(t, sha1, sha256, sha512, digits):
+    for algo, code in (("sha1", sha1), ("sha256", sha256), ("sha512", sha512)):
+        assert totp(RFC6238_SEEDS[algo], digits=digits, for_time=t, algo=algo) == code[-digits:], algo
+
+def test_totp_is_hotp_of_the_time_step():
+    key = RFC6238_SEEDS["sha1"]
+    assert totp(key, for_time=89) == hotp(key, 2)
+    assert totp(key, for_time=89, period=60) == hotp(key, 1)
+    assert totp(key, for_time=89, t0=30) == hotp(key, 1)
+
+def test_algorithm_name_is_case_insensitive():
+    assert hotp(RFC4226_SECRET, 0, algo="SHA1") == "755224"
+
+@pytest.mark.parametrize("kwargs", [{"digits": 0}, {"algo": "md5"}])
+def test_hotp_rejects_bad_parameters(kwargs):
+    with pytest.raises(ValueError):
+        hotp(RFC4226_SECRET, 0, **kwargs)
+
+@pytest.mark.parametrize("kwargs", [{"period": 0}, {"for_time": -1}])
+def test_totp_rejects_bad_parameters(kwargs):
+    with pytest.raises(ValueError):
+        totp(RFC4226_SECRET, **kwargs)
@@ -0,0 +1,37 @@
+"""ft_otp_qr batch output paths and argument checks (no QR rendering)."""
+import os
+import sys
+import pytest
+import ft_otp_qr
+from ft_otp_qr import output_paths
+
+def test_output_paths_defaults_and_explicit():
+    rows = [{"key": "a.key"}, {"key": "team.vault", "entry": "github", "issuer": "Git Hub"},
+            {"key": "b.key", "output": "custom.png"}]
+    assert output_paths(rows, "qr", "svg") == [os.path.join("qr", "ft_otp_a.svg"),
+                                               os.path.join("qr", "Git_Hub_github.svg"), "custom.png"]
+
+@pytest.mark.parametrize("rows", [
+    [{"key": "one/x.key"}, {"key": "two/x.key"}],                         # same default name
+    [{"key": "a.key", "account": "a b"}, {"key": "b.key", "account": "a_b"}],  # same after sanitising
+    [{"key": "a.key", "output": "qr/ft_otp_b.png"}, {"key": "b.key"}],     # explicit vs default
+])
+def test_colliding_outputs_are_refused(rows):
+    with pytest.raises(ValueError, match="rows 1 and 2"):
+        output_paths(rows, "qr", "png")
+
+def test_batch_collision_fails_before_the_passphrase(tmp_path, monkeypatch, capsys):
+    manifest = tmp_path / "m.json"
+    manifest.write_text('[{"key": "k1"}, {"key": "k1", "issuer": "ft_otp"}]')
+    (tmp_path / "k1").write_bytes(b"{}")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ft_otp_qr, "prompt_passphrase", lambda **kw: pytest.fail("asked for a passphrase"))
+    assert ft_otp_qr.run_batch(str(manifest), "qr", "png", 1) == 2
+    assert "both write" in capsys.readouterr().err and not os.path.exists("qr")
+
+@pytest.mark.parametrize("fmt", ["png", "svg"])
+def test_stdout_output_needs_term_format(monkeypatch, fmt):
+    monkeypatch.setattr(sys, "argv", ["ft_otp_qr.py", "-k", "ft_otp.key", "-o", "-", "-f", fmt])
+    with pytest.raises(SystemExit) as e:
+        ft_otp_qr.main()
+    assert e.value.code == 2
@@ -0,0 +1,119 @@
+"""JSON-lines OTP service: protocol, drift window, replay protection and the load generator."""
+import os
+import json
+import asyncio
+import pytest
+from src import service
+from src.otp import hotp
+from src.service import KeyStore, OtpService, start_server, open_client, request, load_test
+import ft_otp_service
+
+KEY = b"12345678901234567890"
+NOW = 1111111109  # counter 37037036 at 30 s
+
+def _service(window=1):
+    store = KeyStore()
+    store.add("github", KEY)
+    store.add("aws", KEY, digits=8, period=60, algo="sha256")
+    return OtpService(store, window)
+
+def _code(step, digits=6, algo="sha1"):
+    return hotp(KEY, NOW // 30 + step, digits=digits, algo=algo)
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(service.time, "time", lambda: NOW)
+
+def _serve(scenario, svc=None):
+    """Run scenario(port) against an in-process server on a random localhost port."""
+    async def main():
+        server = await start_server(svc or _service(), "127.0.0.1", 0)
+        async with server:
+            return await scenario(server.sockets[0].getsockname()[1])
+    return asyncio.run(asyncio.wait_for(main(), 30))
+
+def test_protocol_over_tcp(clock):
+    async def scenario(port):
+        reader, writer = await open_client("127.0.0.1", port)
+        try:
+            answers = [await request(reader, writer, req) for req in (
+                {"op": "ping"},
+                {"op": "accounts"},
+                {"op": "generate", "account": "github"},
+                {"op": "generate", "account": "aws", "time": 59},
+                {"op": "verify", "account": "github", "code": _code(0)},
+                {"op": "generate", "account": "nobody"},
+                {"op": "launch"},
+            )]
+            writer.write(b"not json\n")
+            await writer.drain()
+            answers.append(json.loads(await reader.readline()))
+            answers.append(await request(reader, writer, {"op": "ping"}))  # still open
+        finally:
+            writer.close()
+        return answers
+    ping, accounts, gen, gen_at, ver, unknown, bad_op, bad_json, again = _serve(scenario)
+    assert ping == {"ok": True} and again == {"ok": True}
+    assert accounts == {"ok": True, "accounts": ["aws", "github"]}
+    assert gen == {"ok": True, "code": _code(0), "remaining": 30 - NOW % 30}
+    assert gen_at["code"] == hotp(KEY, 0, digits=8, algo="sha256")
+    assert ver == {"ok": True, "valid": True, "drift": 0}
+    assert unknown == {"ok": False, "error": "unknown account: nobody"}
+    assert not bad_op["ok"] and not bad_json["ok"]
+
+def test_drift_window(clock):
+    svc = _service(window=1)
+    verify = lambda code, **kw: svc.dispatch({"op": "verify", "account": "github", "code": code, **kw})
+    assert verify(_code(-2)) == {"ok": True, "valid": False}
+    assert verify(_code(-1)) == {"ok": True, "valid": True, "drift": -1}
+    assert verify(_code(1), window=0) == {"ok": True, "valid": False}
+    assert verify(_code(2), window=5) == {"ok": True, "valid": False}  # clamped to the server's 1
+    assert verify(_code(1), window=-3) == {"ok": True, "valid": False}
+    assert verify(_code(1)) == {"ok": True, "valid": True, "drift": 1}
+
+def test_verify_ignores_client_time(clock):
+    svc = _service()
+    old = hotp(KEY, 1000 // 30)
+    assert svc.dispatch({"op": "verify", "account": "github", "code": old, "time": 1000})["valid"] is False
+    assert svc.dispatch({"op": "verify", "account": "github", "code": _code(0), "time": 1000})["valid"] is True
+
+def test_replayed_and_older_codes_are_refused(clock):
+    svc = _service()
+    verify = lambda code, account="github": svc.dispatch({"op": "verify", "account": account, "code": code})
+    assert verify(_code(0))["valid"] is True
+    assert verify(_code(0)) == {"ok": True, "valid": False, "replayed": True}
+    assert verify(_code(-1)) == {"ok": True, "valid": False, "replayed": True}
+    assert verify(_code(1))["valid"] is True
+    assert verify(_code(0, 8, "sha256"), "aws")["valid"] is False  # other account, other parameters
+    assert verify(hotp(KEY, NOW // 60, digits=8, algo="sha256"), "aws")["valid"] is True
+
+@pytest.mark.parametrize("op", ["generate", "verify"])
+def test_load_test(op):
+    report = _serve(lambda port: load_test("github", total=200, concurrency=4, op=op, port=port))
+    assert report["requests"] == 200 and report["errors"] == 0 and report["concurrency"] == 4
+    assert report["p50_ms"] <= report["p99_ms"]
+
+def test_load_test_counts_errors_and_checks_arguments():
+    report = _serve(lambda port: load_test("nobody", total=10, concurrency=2, port=port))
+    assert report["errors"] == 10
+    with pytest.raises(ValueError):
+        asyncio.run(load_test("github", total=0))
+
+def test_unix_socket_is_owner_only(tmp_path):
+    path = str(tmp_path / "otp.sock")
+    async def main():
+        server = await start_server(_service(), unix_path=path)
+        async with server:
+            reader, writer = await open_client(unix_path=path)
+            answer = await request(reader, writer, {"op": "ping"})
+            writer.close()
+            return answer, os.stat(path).st_mode & 0o777
+    assert asyncio.run(asyncio.wait_for(main(), 30)) == ({"ok": True}, 0o600)
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "::", "192.0.2.1", "otp.example"])
+def test_non_loopback_tcp_needs_allow_remote(host, capsys):
+    with pytest.raises(ValueError):
+        asyncio.run(start_server(_service(), host, 0))
+    assert ft_otp_service.main(["serve", "-k", "a=missing.key", "--host", host]) == 2
+    assert "--allow-remote" in capsys.readouterr().err
+    assert service.is_loopback("127.0.0.2") and service.is_loopback("::1") and service.is_loopback("localhost")
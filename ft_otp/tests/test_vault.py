@@ -0,0 +1,86 @@
+"""Multi-account vault: entry encryption, passphrase checks, tampering, migration and rekey."""
+import json
+import pytest
+from cryptography.exceptions import InvalidTag
+from src.crypto_utils import ScryptParams, encrypt_key
+from src.vault import Vault
+import ft_otp_vault
+
+FAST = ScryptParams(n=2**10, r=8, p=1)
+SECRET = bytes.fromhex("3132333435363738393031323334353637383930313233343536373839303132")
+
+def _vault():
+    vault = Vault.create("pw", FAST)
+    vault.put("github", SECRET)
+    vault.put("aws", b"\x01" * 20, digits=8, period=60, algo="SHA256")
+    return vault
+
+def _reopen(blob, passphrase="pw"):
+    vault = Vault.from_bytes(blob)
+    vault.unlock(passphrase)
+    return vault
+
+def test_put_get_roundtrip_through_bytes():
+    vault = _reopen(_vault().to_bytes())
+    assert vault.names() == ["aws", "github"]
+    assert vault.get("github") == SECRET and vault.get("aws") == b"\x01" * 20
+    assert vault.params("aws") == {"digits": 8, "period": 60, "algo": "sha256"}
+    assert vault.params("github") == {"digits": 6, "period": 30, "algo": "sha1"}
+    with pytest.raises(KeyError):
+        vault.get("nobody")
+
+def test_wrong_passphrase_and_locked_vault():
+    vault = Vault.from_bytes(_vault().to_bytes())
+    assert vault.names() == ["aws", "github"]  # the index needs no passphrase
+    with pytest.raises(ValueError):
+        vault.unlock("wrong")
+    with pytest.raises(RuntimeError):
+        vault.get("github")
+    with pytest.raises(RuntimeError):
+        vault.remove("github")
+
+@pytest.mark.parametrize("edit", [
+    lambda e: e["github"].update(ciphertext=e["aws"]["ciphertext"]),
+    lambda e: e["github"].update(digits=8),
+    lambda e: e["github"].update(period=60),
+    lambda e: e["github"].update(algo="sha512"),
+    lambda e: e.update(gitlab=e.pop("github")),
+])
+def test_tampered_or_renamed_entry_is_rejected(edit):
+    obj = json.loads(_vault().to_bytes())
+    edit(obj["entries"])
+    vault = _reopen(json.dumps(obj).encode())
+    name = "gitlab" if "gitlab" in vault.entries else "github"
+    with pytest.raises(InvalidTag):
+        vault.get(name)
+    assert vault.get("aws") == b"\x01" * 20  # other entries are unaffected
+
+def test_import_keyfile():
+    vault = _vault()
+    vault.import_keyfile("legacy", encrypt_key(SECRET.hex(), "keypw", FAST), "keypw")
+    assert _reopen(vault.to_bytes()).get("legacy") == SECRET
+    with pytest.raises(InvalidTag):
+        vault.import_keyfile("other", encrypt_key(SECRET.hex(), "keypw", FAST), "wrong")
+    assert "other" not in vault.entries
+
+def test_rekey_reencrypts_every_entry():
+    vault = _vault()
+    old_entries = json.loads(vault.to_bytes())["entries"]
+    vault.rekey("new", ScryptParams(n=2**11, r=8, p=1))
+    blob = vault.to_bytes()
+    with pytest.raises(ValueError):
+        _reopen(blob, "pw")
+    vault = _reopen(blob, "new")
+    assert vault.kdf["n"] == 2**11
+    assert vault.get("github") == SECRET and vault.params("aws")["digits"] == 8
+    assert all(vault.entries[n]["ciphertext"] != e["ciphertext"] for n, e in old_entries.items())
+
+def test_cli_rm_needs_the_passphrase(tmp_path, monkeypatch):
+    path = tmp_path / "team.vault"
+    path.write_bytes(_vault().to_bytes())
+    monkeypatch.setenv("FT_OTP_PASSPHRASE", "wrong")
+    assert ft_otp_vault.main(["-v", str(path), "rm", "github"]) == 3
+    assert "github" in Vault.from_bytes(path.read_bytes()).entries
+    monkeypatch.setenv("FT_OTP_PASSPHRASE", "pw")
+    assert ft_otp_vault.main(["-v", str(path), "rm", "github"]) == 0
+    assert _reopen(path.read_bytes()).names() == ["aws"]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Startup-time budget check for the command-line tools (spider, scorpion, ft_otp, ft_onion).
+
+Each command runs several times under `python -X importtime`. The import time it adds on top
+of a bare interpreter (`site`, `encodings` and whatever .pth files load are subtracted) is
+compared with its budget. Modules a command must not load on that path (e.g. requests for
+`spider --help`) fail the check outright, whatever the timing.
+
+  ./startup_bench.py                      # table on stderr, exit 1 on any violation
+  ./startup_bench.py --json -o startup.json
+  ./startup_bench.py --only spider --scale 2 --runs 10
+"""
+from __future__ import annotations
+import argparse, json, os, platform, re, subprocess, sys, time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+# name, project dir, argv, import budget (ms, added to the bare interpreter), modules that must stay unloaded
+COMMANDS: List[Tuple[str, str, List[str], float, Tuple[str, ...]]] = [
+    ("spider --help", "arachnida", ["spider", "--help"], 30, ("requests", "bs4", "urllib3", "PIL")),
+    ("scorpion --help", "arachnida", ["scorpion", "--help"], 20, ("PIL", "piexif")),
+    ("scorpion FILE", "arachnida", ["scorpion", "missing.jpg"], 60, ("piexif",)),
+    ("ft_otp --help", "ft_otp", ["ft_otp.py", "--help"], 35, ("cryptography",)),
+    ("ft_otp -k missing", "ft_otp", ["ft_otp.py", "-k", "missing.key"], 35, ("cryptography", "src.vault")),
+    ("ft_otp_qr --help", "ft_otp", ["ft_otp_qr.py", "--help"], 35, ("qrcode", "PIL", "cryptography", "multiprocessing")),
+    ("ft_otp_vault --help", "ft_otp", ["ft_otp_vault.py", "--help"], 80, ("cryptography",)),
+    ("ft_otp_service --help", "ft_otp", ["ft_otp_service.py", "--help"], 120, ()),
+    ("ft_onion --help", "ft_onion", ["ft_onion.py", "--help"], 80, ("multiprocessing", "src.ft_onion.batch", "src.ft_onion.aead",
+                                                                     "cryptography", "zstandard")),
+]
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Top-level modules -> cumulative import time in microseconds."""
+    out = {}
+    for line in stderr.splitlines():
+        m = LINE.match(line)
+        if m and not m.group(3): out[m.group(4)] = out.get(m.group(4), 0) + int(m.group(2))
+    return out
+
+def loaded(stderr: str) -> set:
+    return {m.group(4) for m in map(LINE.match, stderr.splitlines()) if m}
+
+def run(cwd: str, argv: List[str]) -> Tuple[float, str]:
+    env = {k: v for k, v in os.environ.items() if k not in ("PYTHONDONTWRITEBYTECODE", "PYTHONPROFILEIMPORTTIME")}
+    t = time.perf_counter()
+    r = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=60)
+    return time.perf_counter() - t, r.stderr
+
+def measure(cwd: str, argv: List[str], runs: int, base: set) -> dict:
+    """Best of runs: wall time, import time beyond the bare interpreter, heaviest top-level modules."""
+    best = None
+    for _ in range(runs):
+        wall, err = run(cwd, argv)
+        mods = {k: v for k, v in parse_importtime(err).items() if k not in base}
+        total = sum(mods.values())
+        if best is None or total < best["import_us"]:
+            best = {"wall_s": wall, "import_us": total, "top": sorted(mods.items(), key=lambda kv: -kv[1])[:5],
+                    "loaded": loaded(err)}
+        best["wall_s"] = min(best["wall_s"], wall)
+    return best
+
+def matches(mod: str, banned: str) -> bool:
+    return mod == banned or mod.startswith(banned + ".")
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Check CLI startup import time against per-command budgets.")
+    p.add_argument("--runs", type=int, default=5, help="runs per command, best is kept (default %(default)s)")
+    p.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow or loaded machines)")
+    p.add_argument("--only", action="append", help="run commands whose name contains this, repeatable")
+    p.add_argument("--json", action="store_true", help="print the JSON report on stdout")
+    p.add_argument("-o", "--out", help="write the JSON report here")
+    a = p.parse_args(argv)
+    cmds = [c for c in COMMANDS if not a.only or any(o in c[0] for o in a.only)]
+    results = []; failed = 0
+    for name, project, args, budget, banned in cmds:
+        cwd = os.path.join(ROOT, project)
+        base_wall, base_err = min((run(cwd, ["-c", "pass"]) for _ in range(a.runs)), key=lambda r: r[0])
+        r = measure(cwd, args, a.runs, set(parse_importtime(base_err)))
+        limit = budget * a.scale
+        bad = [b for b in banned if any(matches(m, b) for m in r["loaded"])]
+        ok = r["import_us"] / 1000 <= limit and not bad
+        failed += not ok
+        results.append({"command": name, "ok": ok, "import_ms": round(r["import_us"] / 1000, 1), "budget_ms": limit,
+                        "wall_ms": round(r["wall_s"] * 1000, 1), "bare_interpreter_ms": round(base_wall * 1000, 1),
+                        "forbidden_loaded": bad, "heaviest": [[m, round(us / 1000, 1)] for m, us in r["top"]]})
+        res = results[-1]
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24} import {res['import_ms']:>6} ms / {limit:g} ms  "
+              f"wall {res['wall_ms']:>6} ms (bare {res['bare_interpreter_ms']} ms)"
+              + (f"  loaded {', '.join(bad)}" if bad else "")
+              + ("" if ok else f"  heaviest: {', '.join(f'{m} {ms}' for m, ms in res['heaviest'][:3])}"), file=sys.stderr)
+    report = {"python": platform.python_version(), "machine": platform.machine(), "runs": a.runs, "scale": a.scale,
+              "results": results}
+    if a.out:
+        with open(a.out, "w") as f: f.write(json.dumps(report, indent=1) + "\n")
+    if a.json: print(json.dumps(report, indent=1))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())